@@ -22,6 +22,8 @@ from app.core.config import settings
 # Import all models here so Alembic can detect them
 # This ensures autogenerate picks up all table definitions
 from app.models.user import User
+from app.models.transfer_volume import UserTransferVolume
+from app.models.stellar_submission import StellarSubmission
 # TODO: Uncomment when implementing US-004 (Stellar Wallet)
 # from app.models.wallet import Wallet
 # TODO: Uncomment when implementing US-007+ (Transactions)
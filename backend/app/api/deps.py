@@ -5,8 +5,10 @@ This module provides FastAPI dependencies for:
 - Token extraction and validation
 - Current user retrieval
 - Permission checking (active users, KYC levels, roles)
+- Internal endpoints (metrics token)
 """
 
+import secrets
 from typing import Optional
 from uuid import UUID
 
@@ -15,6 +17,7 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
+from app.core.config import settings
 from app.core.database import get_db
 from app.core.security import decode_token
 from app.models.user import User
@@ -359,3 +362,40 @@ async def get_optional_user(
     except Exception:
         # If anything fails, just return None (don't raise exception)
         return None
+
+
+async def require_metrics_token(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False)),
+) -> None:
+    """
+    Guard internal endpoints with the METRICS_TOKEN bearer token.
+
+    Metrics expose hot cache keys, wallet balances and infrastructure
+    state, so they are never public: without METRICS_TOKEN configured
+    the endpoint answers 404 as if it did not exist.
+
+    Raises:
+        HTTPException 404: If METRICS_TOKEN is not configured
+        HTTPException 401: If the bearer token is missing or wrong
+
+    Example:
+        @app.get("/metrics", dependencies=[Depends(require_metrics_token)])
+        async def metrics_endpoint():
+            ...
+    """
+    if not settings.METRICS_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+
+    if credentials is None or not secrets.compare_digest(
+        credentials.credentials.encode(), settings.METRICS_TOKEN.encode()
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail={
+                "success": False,
+                "error": "InvalidToken",
+                "message": "Invalid or missing metrics token",
+                "details": None
+            },
+            headers={"WWW-Authenticate": "Bearer"},
+        )
@@ -4,44 +4,202 @@ Upstash Redis connection for caching and session management
 """
 
 import redis.asyncio as redis
-from typing import Optional, Any
+from redis.asyncio.cluster import RedisCluster
+from redis.asyncio.connection import SSLConnection, parse_url
+from redis.asyncio.sentinel import Sentinel, SentinelManagedSSLConnection
+from redis.typing import EncodableT, KeyT
+from redis.exceptions import (
+    ConnectionError as RedisConnectionError,
+    NoScriptError,
+    TimeoutError as RedisTimeoutError,
+)
+from typing import (
+    Optional, Any, Awaitable, Callable, Dict, Iterable, List, Mapping, Sequence, Set, Tuple, AsyncIterator, cast
+)
+from contextlib import asynccontextmanager
+import asyncio
+import functools
+import hashlib
 import json
 import logging
+import math
+import random
+import time
+import uuid
 from datetime import timedelta
 
 from app.core.config import settings
+from app.core.cache_codec import encode, decode
+from app.core.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.core.local_cache import LocalCache, MISSING
+from app.core.metrics import metrics
+from app.core.single_flight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
 # Global Redis client instance
 redis_client: Optional[redis.Redis] = None
 
+# Connection pool shared by redis_client (sized from settings)
+redis_pool: Optional[redis.ConnectionPool] = None  # standalone/sentinel only
+
+# Serializes lazy initialization from concurrent first callers
+_init_lock = asyncio.Lock()
+
+# Fails cache calls fast while Redis is unreachable (see redis_operation)
+redis_breaker = CircuitBreaker(
+    "redis",
+    failure_threshold=settings.REDIS_BREAKER_FAILURE_THRESHOLD,
+    recovery_timeout=settings.REDIS_BREAKER_RECOVERY_TIMEOUT,
+    success_threshold=settings.REDIS_BREAKER_SUCCESS_THRESHOLD,
+)
+
+# Errors that indicate Redis itself is unhealthy (vs. a bad command/value)
+_CONNECTIVITY_ERRORS = (RedisConnectionError, RedisTimeoutError, OSError, asyncio.TimeoutError)
+
+# In-process cache tier (see "Layered Cache" below)
+local_cache = LocalCache(
+    max_entries=settings.CACHE_LOCAL_MAX_ENTRIES,
+    default_ttl=settings.CACHE_LOCAL_TTL,
+)
+
+# Identifies this worker in invalidation messages so it can skip its own
+_INSTANCE_ID = uuid.uuid4().hex
+
+# Background pub/sub listener that evicts local entries on remote writes
+_invalidation_task: Optional[asyncio.Task] = None
+
+# Bumped on every received invalidation; a Redis read that overlaps an
+# invalidation does not populate the local tier (it may be stale)
+_invalidation_seq = 0
+
+
+def _connection_options() -> Dict[str, Any]:
+    """Connection settings shared by every topology"""
+    return {
+        # Values are bytes; app.core.cache_codec handles (de)serialization
+        "decode_responses": False,
+        "socket_timeout": settings.REDIS_SOCKET_TIMEOUT,
+        "socket_connect_timeout": settings.REDIS_SOCKET_CONNECT_TIMEOUT,
+        "retry_on_timeout": True,
+        "health_check_interval": 30,
+    }
+
+
+def _build_client() -> Any:
+    """
+    Construct the client for settings.REDIS_MODE
+
+    - standalone: one pool to REDIS_URL
+    - sentinel:   master discovered through REDIS_SENTINELS; REDIS_URL
+                  supplies credentials, db and TLS
+    - cluster:    RedisCluster seeded from REDIS_URL; slots are discovered
+                  on initialize()
+
+    Note: BlockingConnectionPool is not used because in redis-py 5.0.x it
+    deadlocks when a new connection fails to connect (release() re-enters
+    the pool condition it is already holding).
+    """
+    global redis_pool
+
+    options = _connection_options()
+
+    if settings.REDIS_MODE == "cluster":
+        # RedisCluster retries on its own (connection_error_retry_attempts)
+        options.pop("retry_on_timeout")
+        return RedisCluster.from_url(
+            settings.REDIS_URL, max_connections=settings.REDIS_MAX_CONNECTIONS, **options
+        )
+
+    if settings.REDIS_MODE == "sentinel":
+        url_options: Dict[str, Any] = dict(parse_url(settings.REDIS_URL))
+        url_options.pop("host", None)
+        url_options.pop("port", None)
+        if url_options.pop("connection_class", None) is SSLConnection:
+            url_options["connection_class"] = SentinelManagedSSLConnection
+
+        sentinel = Sentinel(
+            settings.get_redis_sentinels(),
+            sentinel_kwargs={
+                "password": settings.REDIS_SENTINEL_PASSWORD,
+                "socket_timeout": settings.REDIS_SOCKET_TIMEOUT,
+            },
+        )
+        client = sentinel.master_for(
+            settings.REDIS_SENTINEL_MASTER,
+            redis_class=redis.Redis,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            **options,
+            **url_options,
+        )
+        redis_pool = client.connection_pool
+        return client
+
+    redis_pool = redis.ConnectionPool.from_url(
+        settings.REDIS_URL, max_connections=settings.REDIS_MAX_CONNECTIONS, **options
+    )
+    return redis.Redis(connection_pool=redis_pool)
+
+
+def is_cluster(client: Any = None) -> bool:
+    """True when talking to Redis Cluster (no MULTI, no cross-slot commands)"""
+    return isinstance(client if client is not None else redis_client, RedisCluster)
+
+
+def open_pipeline(client: Any, transaction: bool = True) -> Any:
+    """
+    Pipeline that works on every topology
+
+    Cluster pipelines cannot be transactional, so `transaction` is dropped
+    there. Commands are still sent in one round trip per node.
+    """
+    return client.pipeline(transaction=transaction and not is_cluster(client))
+
 
 async def init_redis() -> redis.Redis:
     """
-    Initialize Redis connection
+    Initialize Redis connection pool
     Called on application startup
+
+    Builds the client for REDIS_MODE with pools bounded at
+    REDIS_MAX_CONNECTIONS and opens REDIS_POOL_WARM_CONNECTIONS connections
+    up front, so the first requests do not pay connection setup.
     """
-    global redis_client
+    global redis_client, redis_pool
 
+    client: Any = None
     try:
-        redis_client = redis.from_url(
-            settings.REDIS_URL,
-            encoding="utf-8",
-            decode_responses=True,
-            socket_timeout=5,
-            socket_connect_timeout=5,
-            retry_on_timeout=True,
-            health_check_interval=30,
-        )
+        client = _build_client()
+        if isinstance(client, RedisCluster):
+            await client.initialize()
+
+        # Test connection and warm the pool (concurrent PINGs each take a connection)
+        warm = max(1, min(settings.REDIS_POOL_WARM_CONNECTIONS, settings.REDIS_MAX_CONNECTIONS))
+        await asyncio.gather(*(client.ping() for _ in range(warm)))
+
+        # RedisCluster shares the command API; cluster-only calls check is_cluster()
+        connected: redis.Redis = client
+        redis_client = connected
+
+        try:
+            await load_scripts(connected)
+        except Exception as e:
+            # Not fatal: EVALSHA falls back to loading on NOSCRIPT
+            logger.warning(f"Redis script preload failed: {e}")
 
-        # Test connection
-        await redis_client.ping()
-        logger.info("✅ Redis connected successfully")
-        return redis_client
+        logger.info(
+            f"✅ Redis connected successfully "
+            f"({settings.REDIS_MODE}, pool: {settings.REDIS_MAX_CONNECTIONS} max, {warm} warmed)"
+        )
+        return connected
 
     except Exception as e:
         logger.error(f"❌ Redis connection failed: {e}")
+        if client is not None:
+            await client.close()
+        if redis_pool is not None:
+            await redis_pool.disconnect()
+            redis_pool = None
         raise
 
 
@@ -50,11 +208,17 @@ async def close_redis() -> None:
     Close Redis connection
     Called on application shutdown
     """
-    global redis_client
+    global redis_client, redis_pool
+
+    await stop_invalidation_listener()
 
     if redis_client:
         await redis_client.close()
+        redis_client = None
         logger.info("🔌 Redis connection closed")
+    if redis_pool:
+        await redis_pool.disconnect()
+        redis_pool = None
 
 
 async def get_redis() -> redis.Redis:
@@ -64,12 +228,50 @@ async def get_redis() -> redis.Redis:
         redis = await get_redis()
         await redis.set("key", "value")
     """
-    global redis_client
+    client = redis_client
+    if client is None:
+        async with _init_lock:
+            client = redis_client or await init_redis()
+    return client
+
+
+@asynccontextmanager
+async def redis_operation() -> AsyncIterator[redis.Redis]:
+    """
+    Run Redis commands under the circuit breaker
+
+    Raises CircuitOpenError immediately while the breaker is open, instead
+    of waiting for socket timeouts. Connectivity errors count as failures
+    and only a block that completes normally counts as success. Anything
+    else raised in the block (a command error, a bug in the caller,
+    cancellation) is re-raised without counting either way.
+
+    Usage:
+        async with redis_operation() as redis:
+            await redis.get("key")
+    """
+    if not redis_breaker.allow_request():
+        raise CircuitOpenError(redis_breaker.name)
+
+    try:
+        client = await get_redis()
+        yield client
+    except _CONNECTIVITY_ERRORS:
+        redis_breaker.record_failure()
+        raise
+    except BaseException:
+        redis_breaker.release()
+        raise
+    else:
+        redis_breaker.record_success()
 
-    if redis_client is None:
-        redis_client = await init_redis()
 
-    return redis_client
+def _log_cache_error(message: str, error: Exception) -> None:
+    """Log a cache failure; rejections by the open breaker are expected noise"""
+    if isinstance(error, CircuitOpenError):
+        logger.debug(f"{message}: {error}")
+    else:
+        logger.error(f"{message}: {error}")
 
 
 async def check_redis_health() -> bool:
@@ -78,14 +280,314 @@ async def check_redis_health() -> bool:
     Returns True if connection is working
     """
     try:
-        redis = await get_redis()
-        await redis.ping()
-        return True
+        async with redis_operation() as redis:
+            await redis.ping()
+            return True
     except Exception as e:
         logger.error(f"Redis health check failed: {e}")
         return False
 
 
+# Server-side Scripts
+#
+# Lua scripts are registered once at import time and invoked with EVALSHA,
+# so only the 40-byte SHA1 crosses the wire per call. Scripts are loaded on
+# startup (init_redis); if the server lost them (restart, failover, SCRIPT
+# FLUSH) the NOSCRIPT reply triggers one SCRIPT LOAD and a retry.
+
+# Latency buckets for script calls (milliseconds)
+_SCRIPT_BUCKETS_MS = (0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+class RedisScript:
+    """
+    A registered Lua script, called by its SHA1
+
+    Usage:
+        RELEASE = register_script("release_lock", "...")
+        released = await RELEASE(keys=[lock_key], args=[token])
+    """
+
+    def __init__(self, name: str, source: str):
+        self.name = name
+        self.source = source
+        self.sha = hashlib.sha1(source.encode()).hexdigest()
+
+    async def __call__(self, keys: Sequence[str] = (), args: Sequence[Any] = ()) -> Any:
+        """
+        Run the script via EVALSHA
+
+        Raises:
+            CircuitOpenError / redis errors: the caller decides how to degrade
+        """
+        started = time.perf_counter()
+        result = "ok"
+        try:
+            async with redis_operation() as redis:
+                try:
+                    return await redis.evalsha(self.sha, len(keys), *keys, *args)
+                except NoScriptError:
+                    result = "reloaded"
+                    await redis.script_load(self.source)
+                    return await redis.evalsha(self.sha, len(keys), *keys, *args)
+        except Exception:
+            result = "error"
+            raise
+        finally:
+            metrics.observe(
+                "redis_script_ms",
+                (time.perf_counter() - started) * 1000,
+                _SCRIPT_BUCKETS_MS,
+                script=self.name,
+            )
+            metrics.increment("redis_script_calls_total", script=self.name, result=result)
+
+
+# Registered scripts by name
+_scripts: Dict[str, RedisScript] = {}
+
+
+def register_script(name: str, source: str) -> RedisScript:
+    """
+    Register a Lua script under a unique name
+
+    Args:
+        name: Script name (metrics label)
+        source: Lua source
+
+    Returns:
+        Callable RedisScript
+    """
+    existing = _scripts.get(name)
+    if existing is not None:
+        if existing.source != source:
+            raise ValueError(f"Redis script '{name}' is already registered with a different body")
+        return existing
+
+    script = _scripts[name] = RedisScript(name, source)
+    return script
+
+
+async def load_scripts(client: Optional[redis.Redis] = None) -> int:
+    """
+    SCRIPT LOAD every registered script
+    Called from init_redis; scripts registered later load on first use
+
+    Returns:
+        Number of scripts loaded
+    """
+    client = client or await get_redis()
+    scripts = list(_scripts.values())
+    if is_cluster(client):
+        # SCRIPT LOAD is broadcast to every primary
+        shas = [await client.script_load(script.source) for script in scripts]
+    else:
+        async with client.pipeline(transaction=False) as pipe:
+            for script in scripts:
+                pipe.script_load(script.source)
+            shas = await pipe.execute()
+
+    for script, sha in zip(scripts, shas):
+        sha = sha.decode() if isinstance(sha, bytes) else sha
+        if sha != script.sha:
+            logger.warning(f"Redis script '{script.name}' loaded with unexpected SHA {sha}")
+
+    return len(scripts)
+
+
+# Delete a lock only if we still own it (compare token, then delete)
+release_lock_script = register_script("release_lock", """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+""")
+
+# INCRBY, and set the TTL whenever the key has none (i.e. it was just created)
+_incr_with_ttl_script = register_script("incr_with_ttl", """
+local value = redis.call("incrby", KEYS[1], ARGV[1])
+if redis.call("ttl", KEYS[1]) == -1 then
+    redis.call("expire", KEYS[1], ARGV[2])
+end
+return value
+""")
+
+# Fixed-window rate limit: returns {allowed (0/1), count, window ms remaining}
+_rate_limit_script = register_script("rate_limit", """
+local count = redis.call("incr", KEYS[1])
+local ttl = redis.call("pttl", KEYS[1])
+if ttl < 0 then
+    redis.call("pexpire", KEYS[1], ARGV[2])
+    ttl = tonumber(ARGV[2])
+end
+if count > tonumber(ARGV[1]) then
+    return {0, count, ttl}
+end
+return {1, count, ttl}
+""")
+
+# Replace a value only if it still equals the expected one (token rotation)
+_compare_and_set_script = register_script("compare_and_set", """
+if redis.call("get", KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+if tonumber(ARGV[3]) > 0 then
+    redis.call("set", KEYS[1], ARGV[2], "EX", ARGV[3])
+else
+    redis.call("set", KEYS[1], ARGV[2], "KEEPTTL")
+end
+return 1
+""")
+
+
+# Instrumentation
+#
+# Every helper below reports, per key prefix (first key segment, e.g.
+# "session", "ratelimit", "otp", "lock"):
+#   cache_ops_total{op,prefix,result}   result = hit/miss for reads, ok/error
+#   cache_op_ms{op,prefix}              latency histogram
+#   cache_value_bytes{op,prefix}        encoded payload size histogram
+# A sampled hot-key report estimates the most frequently accessed keys.
+# Keys embed phone numbers and user ids, so the report identifies them by
+# prefix and digest only (see hot_key_digest).
+
+# Payload size buckets (bytes)
+_SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+# Distinct prefixes tracked before falling back to "other" (bounds cardinality)
+_MAX_PREFIXES = 64
+_known_prefixes: Set[str] = set()
+
+
+def key_prefix(key: str) -> str:
+    """Metrics label for a key: its first segment, without hash tag braces"""
+    prefix = key.split(":", 1)[0].strip("{}") or "other"
+    if prefix in _known_prefixes:
+        return prefix
+    if len(_known_prefixes) >= _MAX_PREFIXES:
+        return "other"
+    _known_prefixes.add(prefix)
+    return prefix
+
+
+def hot_key_digest(key: str) -> str:
+    """Digest identifying a key in the hot-key report without revealing it"""
+    return hashlib.sha256(key.encode()).hexdigest()[:16]
+
+
+class HotKeySampler:
+    """
+    Sampled heavy-hitter tracking (Space-Saving)
+
+    Records roughly `sample_rate` of accesses into at most `capacity`
+    counters. When full, a new key replaces the least counted one and
+    inherits its count, so heavy keys are never under-counted. Estimated
+    totals are sampled counts divided by the sample rate.
+    """
+
+    def __init__(self, capacity: int, sample_rate: float):
+        self.capacity = capacity
+        self.sample_rate = sample_rate
+        self._counts: Dict[str, List[float]] = {}  # key -> [count, bytes]
+
+    def record(self, key: str, size: int = 0) -> None:
+        """Possibly count one access to `key`"""
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return
+
+        entry = self._counts.get(key)
+        if entry is None:
+            if len(self._counts) >= self.capacity:
+                victim = min(self._counts, key=lambda k: self._counts[k][0])
+                floor = self._counts.pop(victim)[0]
+            else:
+                floor = 0
+            entry = self._counts[key] = [floor, 0]
+        entry[0] += 1
+        entry[1] += size
+
+    def top(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Hottest keys (prefix + digest) with estimated access counts and average bytes per access"""
+        ranked = sorted(self._counts.items(), key=lambda item: item[1][0], reverse=True)[:limit]
+        return [
+            {
+                "prefix": key_prefix(key),
+                "digest": hot_key_digest(key),
+                "estimated_accesses": round(count / self.sample_rate),
+                "avg_bytes": round(size / count) if count else 0,
+            }
+            for key, (count, size) in ranked
+        ]
+
+    def reset(self) -> None:
+        self._counts.clear()
+
+
+hot_keys = HotKeySampler(
+    capacity=settings.CACHE_HOTKEY_CAPACITY,
+    sample_rate=settings.CACHE_HOTKEY_SAMPLE_RATE,
+)
+
+
+def _record_op(
+    op: str,
+    key: str,
+    started: float,
+    result: str = "ok",
+    size: Optional[int] = None,
+) -> None:
+    """Report one cache operation on `key`"""
+    prefix = key_prefix(key)
+    metrics.increment("cache_ops_total", op=op, prefix=prefix, result=result)
+    metrics.observe("cache_op_ms", (time.perf_counter() - started) * 1000, op=op, prefix=prefix)
+    if size is not None:
+        metrics.observe("cache_value_bytes", size, _SIZE_BUCKETS, op=op, prefix=prefix)
+    hot_keys.record(key, size or 0)
+
+
+def _record_batch(op: str, keys: List[str], started: float, sizes: Mapping[str, Optional[int]]) -> None:
+    """Report a batched operation; latency is attributed once per prefix"""
+    elapsed = (time.perf_counter() - started) * 1000
+    for prefix in {key_prefix(key) for key in keys}:
+        metrics.observe("cache_op_ms", elapsed, op=op, prefix=prefix)
+    for key in keys:
+        size = sizes.get(key)
+        prefix = key_prefix(key)
+        if op == "get_many":
+            result = "miss" if size is None else "hit"
+        else:
+            result = "ok"
+        metrics.increment("cache_ops_total", op=op, prefix=prefix, result=result)
+        if size is not None:
+            metrics.observe("cache_value_bytes", size, _SIZE_BUCKETS, op=op, prefix=prefix)
+        hot_keys.record(key, size or 0)
+
+
+def get_cache_prefix_stats() -> Dict[str, Any]:
+    """
+    Per-prefix hit ratios plus the sampled hot-key report
+
+    Returns:
+        {"prefixes": {prefix: {hits, misses, hit_ratio}}, "hot_keys": [...]}
+    """
+    reads: Dict[str, Dict[str, float]] = {}
+    for labels, count in metrics.counters.get("cache_ops_total", {}).items():
+        label = dict(labels)
+        if label.get("result") not in ("hit", "miss"):
+            continue
+        stats = reads.setdefault(label["prefix"], {"hits": 0, "misses": 0})
+        stats["hits" if label["result"] == "hit" else "misses"] += count
+
+    for stats in reads.values():
+        total = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / total, 4) if total else 0.0
+
+    return {"prefixes": reads, "hot_keys": hot_keys.top(settings.CACHE_HOTKEY_REPORT_SIZE)}
+
+
+metrics.register_collector("cache_keys", get_cache_prefix_stats)
+
+
 # Cache Helper Functions
 
 async def cache_set(
@@ -98,28 +600,29 @@ async def cache_set(
 
     Args:
         key: Cache key
-        value: Value to cache (will be JSON serialized)
+        value: Value to cache (serialized by app.core.cache_codec; Decimal,
+               UUID and datetime values round-trip with their types)
         expire: Expiration time in seconds (None = no expiration)
 
     Returns:
         True if successful, False otherwise
     """
+    started = time.perf_counter()
     try:
-        redis = await get_redis()
+        async with redis_operation() as redis:
+            data = encode(value)
 
-        # Serialize complex objects to JSON
-        if isinstance(value, (dict, list)):
-            value = json.dumps(value)
+            if expire:
+                await redis.setex(key, expire, data)
+            else:
+                await redis.set(key, data)
 
-        if expire:
-            await redis.setex(key, expire, value)
-        else:
-            await redis.set(key, value)
-
-        return True
+            _record_op("set", key, started, size=len(data))
+            return True
 
     except Exception as e:
-        logger.error(f"Cache set error for key '{key}': {e}")
+        _record_op("set", key, started, result="error")
+        _log_cache_error(f"Cache set error for key '{key}'", e)
         return False
 
 
@@ -133,21 +636,25 @@ async def cache_get(key: str) -> Optional[Any]:
     Returns:
         Cached value or None if not found
     """
+    started = time.perf_counter()
     try:
-        redis = await get_redis()
-        value = await redis.get(key)
+        async with redis_operation() as redis:
+            raw = await redis.get(key)
 
-        if value is None:
-            return None
+    except Exception as e:
+        _record_op("get", key, started, result="error")
+        _log_cache_error(f"Cache get error for key '{key}'", e)
+        return None
 
-        # Try to deserialize JSON
-        try:
-            return json.loads(value)
-        except (json.JSONDecodeError, TypeError):
-            return value
+    if raw is None:
+        _record_op("get", key, started, result="miss")
+        return None
 
+    _record_op("get", key, started, result="hit", size=len(raw))
+    try:
+        return decode(raw)
     except Exception as e:
-        logger.error(f"Cache get error for key '{key}': {e}")
+        _log_cache_error(f"Cache decode error for key '{key}'", e)
         return None
 
 
@@ -161,13 +668,16 @@ async def cache_delete(key: str) -> bool:
     Returns:
         True if successful, False otherwise
     """
+    started = time.perf_counter()
     try:
-        redis = await get_redis()
-        await redis.delete(key)
-        return True
+        async with redis_operation() as redis:
+            await redis.delete(key)
+            _record_op("delete", key, started)
+            return True
 
     except Exception as e:
-        logger.error(f"Cache delete error for key '{key}': {e}")
+        _record_op("delete", key, started, result="error")
+        _log_cache_error(f"Cache delete error for key '{key}'", e)
         return False
 
 
@@ -181,12 +691,16 @@ async def cache_exists(key: str) -> bool:
     Returns:
         True if key exists, False otherwise
     """
+    started = time.perf_counter()
     try:
-        redis = await get_redis()
-        return await redis.exists(key) > 0
+        async with redis_operation() as redis:
+            exists = await redis.exists(key) > 0
+            _record_op("exists", key, started, result="hit" if exists else "miss")
+            return exists
 
     except Exception as e:
-        logger.error(f"Cache exists error for key '{key}': {e}")
+        _record_op("exists", key, started, result="error")
+        _log_cache_error(f"Cache exists error for key '{key}'", e)
         return False
 
 
@@ -194,6 +708,7 @@ async def cache_increment(key: str, amount: int = 1) -> Optional[int]:
     """
     Increment a numeric value in cache
     Useful for rate limiting, counters, etc.
+    For counters that need an expiration use cache_incr_with_ttl()
 
     Args:
         key: Cache key
@@ -202,12 +717,16 @@ async def cache_increment(key: str, amount: int = 1) -> Optional[int]:
     Returns:
         New value after increment, or None on error
     """
+    started = time.perf_counter()
     try:
-        redis = await get_redis()
-        return await redis.incrby(key, amount)
+        async with redis_operation() as redis:
+            value = await redis.incrby(key, amount)
+            _record_op("incr", key, started)
+            return value
 
     except Exception as e:
-        logger.error(f"Cache increment error for key '{key}': {e}")
+        _record_op("incr", key, started, result="error")
+        _log_cache_error(f"Cache increment error for key '{key}'", e)
         return None
 
 
@@ -223,32 +742,736 @@ async def cache_expire(key: str, seconds: int) -> bool:
         True if successful, False otherwise
     """
     try:
-        redis = await get_redis()
-        await redis.expire(key, seconds)
+        async with redis_operation() as redis:
+            await redis.expire(key, seconds)
+            return True
+
+    except Exception as e:
+        _log_cache_error(f"Cache expire error for key '{key}'", e)
+        return False
+
+
+# Batched Operations
+#
+# One network round trip for many keys: MGET/DEL take all keys in a single
+# command, and writes with a TTL are sent as one pipeline.
+
+async def cache_get_many(keys: Iterable[str]) -> Dict[str, Any]:
+    """
+    Get several values with a single MGET
+
+    Args:
+        keys: Cache keys
+
+    Returns:
+        Dict of key -> value for keys that were found (misses are omitted)
+    """
+    keys = list(keys)
+    if not keys:
+        return {}
+
+    started = time.perf_counter()
+    try:
+        async with redis_operation() as redis:
+            if is_cluster(redis):
+                # Groups keys by slot: one MGET per slot, not atomic across slots
+                raw_values = await cast(Any, redis).mget_nonatomic(keys)  # not in types-redis
+            else:
+                raw_values = await redis.mget(keys)
+    except Exception as e:
+        _log_cache_error(f"Cache get_many error for {len(keys)} keys", e)
+        return {}
+
+    _record_batch(
+        "get_many", keys, started, {key: len(raw) for key, raw in zip(keys, raw_values) if raw is not None}
+    )
+
+    values = {}
+    for key, raw in zip(keys, raw_values):
+        if raw is None:
+            continue
+        try:
+            values[key] = decode(raw)
+        except Exception as e:
+            _log_cache_error(f"Cache decode error for key '{key}'", e)
+    return values
+
+
+async def cache_set_many(mapping: Mapping[str, Any], expire: Optional[int] = None) -> bool:
+    """
+    Set several values in one round trip
+
+    Uses MSET when there is no expiration, otherwise a non-transactional
+    pipeline of SET ... EX commands.
+
+    Args:
+        mapping: Dict of key -> value
+        expire: Expiration time in seconds applied to every key (None = no expiration)
+
+    Returns:
+        True if successful, False otherwise
+    """
+    if not mapping:
         return True
 
+    started = time.perf_counter()
+    try:
+        async with redis_operation() as redis:
+            encoded = {key: encode(value) for key, value in mapping.items()}
+
+            if not expire:
+                if is_cluster(redis):
+                    await cast(Any, redis).mset_nonatomic(encoded)  # not in types-redis
+                else:
+                    await redis.mset(cast(Mapping[KeyT, EncodableT], encoded))
+            else:
+                async with redis.pipeline(transaction=False) as pipe:
+                    for key, data in encoded.items():
+                        pipe.set(key, data, ex=expire)
+                    await pipe.execute()
+
+            _record_batch(
+                "set_many", list(encoded), started, {key: len(data) for key, data in encoded.items()}
+            )
+            return True
+
+    except Exception as e:
+        _log_cache_error(f"Cache set_many error for {len(mapping)} keys", e)
+        return False
+
+
+async def cache_delete_many(keys: Iterable[str]) -> Optional[int]:
+    """
+    Delete several keys with a single DEL
+
+    Args:
+        keys: Cache keys
+
+    Returns:
+        Number of keys deleted, or None on error
+    """
+    keys = list(keys)
+    if not keys:
+        return 0
+
+    try:
+        async with redis_operation() as redis:
+            return await redis.delete(*keys)
+
+    except Exception as e:
+        _log_cache_error(f"Cache delete_many error for {len(keys)} keys", e)
+        return None
+
+
+async def cache_incr_with_ttl(key: str, ttl: int, amount: int = 1) -> Optional[int]:
+    """
+    Atomically increment a counter and set its TTL when it is created
+
+    Replaces cache_increment() + cache_expire(): both run in one server-side
+    script, so a crash between them can no longer leave a counter without
+    expiration. The TTL is only set when the key has none (fixed window),
+    later increments keep it.
+
+    Args:
+        key: Cache key
+        ttl: Expiration in seconds, applied when the counter is created
+        amount: Amount to increment by (default: 1)
+
+    Returns:
+        New value after increment, or None on error
+    """
+    try:
+        return int(await _incr_with_ttl_script(keys=[key], args=[amount, ttl]))
+
     except Exception as e:
-        logger.error(f"Cache expire error for key '{key}': {e}")
+        _log_cache_error(f"Cache incr_with_ttl error for key '{key}'", e)
+        return None
+
+
+async def cache_rate_limit(key: str, limit: int, window: float) -> Tuple[bool, int, float]:
+    """
+    Count a hit against a fixed-window rate limit in one round trip
+
+    Fails open: if Redis is unavailable the hit is allowed.
+
+    Args:
+        key: Counter key (see get_rate_limit_key)
+        limit: Max hits per window
+        window: Window length in seconds
+
+    Returns:
+        (allowed, hits in the current window, seconds until the window resets)
+    """
+    try:
+        allowed, count, ttl_ms = await _rate_limit_script(
+            keys=[key], args=[limit, max(int(window * 1000), 1)]
+        )
+        return bool(allowed), int(count), int(ttl_ms) / 1000
+
+    except Exception as e:
+        _log_cache_error(f"Cache rate_limit error for key '{key}'", e)
+        return True, 0, 0.0
+
+
+async def cache_compare_and_set(
+    key: str,
+    expected: Any,
+    value: Any,
+    expire: Optional[int] = None,
+) -> bool:
+    """
+    Replace a cached value only if it still equals `expected`
+
+    Used for token rotation: of two concurrent rotations presenting the
+    same old token, exactly one wins.
+
+    Args:
+        key: Cache key
+        expected: Value that must currently be stored
+        value: New value
+        expire: New expiration in seconds (default: keep the current TTL)
+
+    Returns:
+        True if the value was replaced, False if it did not match or on error
+    """
+    try:
+        swapped = await _compare_and_set_script(
+            keys=[key], args=[encode(expected), encode(value), expire or 0]
+        )
+        return bool(swapped)
+
+    except Exception as e:
+        _log_cache_error(f"Cache compare_and_set error for key '{key}'", e)
         return False
 
 
+class CachePipeline:
+    """
+    Batch of Redis commands sent in one round trip (see cache_pipeline)
+
+    get()/set() go through the cache codec; any other redis-py pipeline
+    command (incrby, expire, hset, ...) is available as-is. After the
+    `async with` block exits, `results` holds one entry per queued command.
+    """
+
+    def __init__(self, pipe: Any):
+        self.pipe = pipe
+        self.results: List[Any] = []
+        self._decode_at: Set[int] = set()
+        # Commands queued so far, counted here: the pipeline's own stack is
+        # private on redis-py's ClusterPipeline
+        self._queued = 0
+
+    def get(self, key: str) -> "CachePipeline":
+        """Queue a codec-aware GET"""
+        self._decode_at.add(self._queued)
+        self.pipe.get(key)
+        self._queued += 1
+        return self
+
+    def set(self, key: str, value: Any, expire: Optional[int] = None) -> "CachePipeline":
+        """Queue a codec-aware SET with optional expiration"""
+        self.pipe.set(key, encode(value), ex=expire)
+        self._queued += 1
+        return self
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self.pipe, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        def call(*args: Any, **kwargs: Any) -> Any:
+            result = attr(*args, **kwargs)
+            if result is self.pipe:
+                # redis-py pipeline commands return the pipeline once queued
+                self._queued += 1
+                return self
+            return result
+
+        return call
+
+    async def _execute(self) -> List[Any]:
+        raw_results = await self.pipe.execute()
+        self.results = [
+            decode(result) if i in self._decode_at else result
+            for i, result in enumerate(raw_results)
+        ]
+        return self.results
+
+
+@asynccontextmanager
+async def cache_pipeline(transaction: bool = False) -> AsyncIterator[CachePipeline]:
+    """
+    Batch arbitrary commands into a single round trip
+
+    Commands queued inside the block are sent when it exits; nothing is
+    sent if the block raises. Unlike the other helpers, Redis errors are
+    raised to the caller, since partial batches need explicit handling.
+
+    Args:
+        transaction: Wrap the batch in MULTI/EXEC (atomic) instead of a
+                     plain pipeline
+
+    Usage:
+        async with cache_pipeline() as pipe:
+            pipe.set("a", {"x": 1}, expire=60)
+            pipe.incrby("counter", 1)
+            pipe.get("b")
+        a_ok, counter, b = pipe.results
+    """
+    async with redis_operation() as redis:
+        async with open_pipeline(redis, transaction) as pipe:
+            batch = CachePipeline(pipe)
+            yield batch
+            await batch._execute()
+
+
+# Layered Cache
+#
+# Reads check the in-process LocalCache first, then Redis. Writes and
+# deletes go to Redis, update this worker's local tier, and publish the
+# key on CACHE_INVALIDATION_CHANNEL so every other worker evicts its copy.
+# Only keys accessed through the *_layered functions are cached locally;
+# keep local TTLs short, since the local tier is not aware of Redis TTLs.
+
+def _record_tier(tier: str, hit: bool) -> None:
+    """Count a layered lookup result for one tier"""
+    metrics.increment("cache_layered_lookups_total", tier=tier, result="hit" if hit else "miss")
+
+
+def get_layered_cache_stats() -> dict:
+    """
+    Per-tier hit ratios for the layered cache
+
+    Returns:
+        Dict with hits, misses and hit_ratio for the local and redis tiers,
+        plus local tier size and eviction count
+    """
+    stats = {}
+    for tier in ("local", "redis"):
+        hits = metrics.get_counter("cache_layered_lookups_total", tier=tier, result="hit")
+        misses = metrics.get_counter("cache_layered_lookups_total", tier=tier, result="miss")
+        total = hits + misses
+        stats[tier] = {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / total, 4) if total else 0.0,
+        }
+    stats["local"]["size"] = len(local_cache)
+    stats["local"]["evictions"] = local_cache.evictions
+    return stats
+
+
+metrics.register_collector("cache_tiers", get_layered_cache_stats)
+
+
+async def _publish_invalidation(keys: Iterable[str]) -> None:
+    """Broadcast keys to evict on other workers (best effort)"""
+    try:
+        async with redis_operation() as redis:
+            message = json.dumps({"origin": _INSTANCE_ID, "keys": list(keys)})
+            await redis.publish(settings.CACHE_INVALIDATION_CHANNEL, message)
+    except Exception as e:
+        _log_cache_error("Cache invalidation publish error", e)
+
+
+def _handle_invalidation(raw: Any) -> None:
+    """Apply an invalidation message received from the pub/sub channel"""
+    global _invalidation_seq
+
+    try:
+        message = json.loads(raw)
+    except (json.JSONDecodeError, TypeError):
+        logger.warning(f"Ignoring malformed cache invalidation message: {raw!r}")
+        return
+
+    if message.get("origin") == _INSTANCE_ID:
+        return
+
+    _invalidation_seq += 1
+    for key in message.get("keys", []):
+        local_cache.delete(key)
+    metrics.increment("cache_invalidations_received_total")
+
+
+async def _listen_for_invalidations() -> None:
+    """
+    Subscribe to the invalidation channel and evict local entries
+
+    Reconnects with exponential backoff. The local tier is cleared whenever
+    the subscription is (re)established, since messages published while we
+    were disconnected are lost.
+    """
+    backoff = 0.5
+    while True:
+        pubsub = None
+        node_client = None
+        try:
+            client = await get_redis()
+            if is_cluster(client):
+                # Cluster PUBLISH reaches every node; subscribe on any one
+                node = cast(RedisCluster, client).get_random_node()
+                client = node_client = redis.Redis(
+                    connection_pool=redis.ConnectionPool(
+                        connection_class=node.connection_class, **node.connection_kwargs
+                    )
+                )
+            pubsub = client.pubsub()
+            await pubsub.subscribe(settings.CACHE_INVALIDATION_CHANNEL)
+            local_cache.clear()
+            backoff = 0.5
+            logger.info("📡 Cache invalidation listener subscribed")
+
+            async for message in pubsub.listen():
+                if message.get("type") == "message":
+                    _handle_invalidation(message.get("data"))
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            local_cache.clear()
+            _log_cache_error(f"Cache invalidation listener error, retrying in {backoff}s", e)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30)
+        finally:
+            if pubsub is not None:
+                try:
+                    await pubsub.close()
+                except Exception:
+                    pass
+            if node_client is not None:
+                await node_client.close(close_connection_pool=True)
+
+
+def _ensure_invalidation_listener() -> None:
+    """Start the invalidation listener on first use of the layered cache"""
+    global _invalidation_task
+
+    if _invalidation_task is None or _invalidation_task.done():
+        _invalidation_task = asyncio.get_running_loop().create_task(
+            _listen_for_invalidations()
+        )
+
+
+async def stop_invalidation_listener() -> None:
+    """Cancel the invalidation listener (called from close_redis)"""
+    global _invalidation_task
+
+    if _invalidation_task is not None:
+        _invalidation_task.cancel()
+        try:
+            await _invalidation_task
+        except (asyncio.CancelledError, Exception):
+            pass
+        _invalidation_task = None
+
+
+async def cache_get_layered(key: str, local_ttl: Optional[int] = None) -> Optional[Any]:
+    """
+    Get a value from the local tier, falling back to Redis
+
+    Args:
+        key: Cache key
+        local_ttl: TTL in seconds for populating the local tier
+                   (default: CACHE_LOCAL_TTL)
+
+    Returns:
+        Cached value or None if not found in either tier
+    """
+    _ensure_invalidation_listener()
+
+    value = local_cache.get(key)
+    if value is not MISSING:
+        _record_tier("local", True)
+        return value
+    _record_tier("local", False)
+
+    seq = _invalidation_seq
+    value = await cache_get(key)
+    _record_tier("redis", value is not None)
+
+    if value is not None and seq == _invalidation_seq:
+        local_cache.set(key, value, local_ttl)
+
+    return value
+
+
+async def cache_set_layered(
+    key: str,
+    value: Any,
+    expire: Optional[int] = None,
+    local_ttl: Optional[int] = None,
+) -> bool:
+    """
+    Set a value in Redis and the local tier, then invalidate other workers
+
+    Args:
+        key: Cache key
+        value: Value to cache
+        expire: Redis expiration in seconds (None = no expiration)
+        local_ttl: Local tier TTL in seconds (default: CACHE_LOCAL_TTL,
+                   capped at `expire`)
+
+    Returns:
+        True if the Redis write succeeded, False otherwise
+    """
+    _ensure_invalidation_listener()
+
+    if not await cache_set(key, value, expire):
+        local_cache.delete(key)
+        return False
+
+    ttl = local_cache.default_ttl if local_ttl is None else local_ttl
+    if expire:
+        ttl = min(ttl, expire)
+    local_cache.set(key, value, ttl)
+
+    await _publish_invalidation([key])
+    return True
+
+
+async def cache_delete_layered(key: str) -> bool:
+    """
+    Delete a value from Redis and every worker's local tier
+
+    Args:
+        key: Cache key
+
+    Returns:
+        True if the Redis delete succeeded, False otherwise
+    """
+    _ensure_invalidation_listener()
+
+    local_cache.delete(key)
+    deleted = await cache_delete(key)
+    await _publish_invalidation([key])
+    return deleted
+
+
+# Stampede Protection
+#
+# cache_get_or_compute() stores an envelope {"v": value, "d": compute_seconds,
+# "e": expires_at} with a Redis TTL of ttl + stale_ttl. Hot keys are refreshed
+# early with probability rising as expiry approaches (XFetch), expired values
+# are served while a single background refresh runs, and recomputes are
+# coalesced in-process (single-flight) and across workers (Redis lock).
+
+# In-process coalescing of recomputes, keyed by cache key
+_compute_flight = SingleFlight()
+
+# Strong references to fire-and-forget refresh tasks
+_background_refreshes: Set[asyncio.Task] = set()
+
+
+def _xfetch_should_refresh(delta: float, expires_at: float, beta: float, now: float) -> bool:
+    """
+    Probabilistic early expiration (XFetch, Vattani et al.)
+
+    Returns True with a probability that grows as expiry approaches and
+    with the cost of the last recompute (delta), so one caller refreshes
+    a hot key shortly before it expires instead of all callers after.
+    """
+    return now - delta * beta * math.log(1.0 - random.random()) >= expires_at
+
+
+async def _read_computed(key: str) -> Optional[Dict[str, Any]]:
+    """Read a cache_get_or_compute envelope (None on miss or foreign value)"""
+    entry = await cache_get(key)
+    if isinstance(entry, dict) and "v" in entry and "e" in entry:
+        return entry
+    return None
+
+
+async def _store_computed(key: str, value: Any, delta: float, ttl: int, stale_ttl: int) -> None:
+    """Write a cache_get_or_compute envelope"""
+    envelope = {"v": value, "d": delta, "e": time.time() + ttl}
+    await cache_set(key, envelope, expire=ttl + stale_ttl)
+
+
+async def _recompute(
+    key: str,
+    loader: Callable[[], Awaitable[Any]],
+    ttl: int,
+    stale_ttl: int,
+    wait: bool,
+) -> Any:
+    """
+    Recompute a value under the cross-worker lock
+
+    If another worker holds the lock: a background refresh gives up
+    (wait=False); a caller with nothing to serve polls for the other
+    worker's result and only computes itself if the lock times out.
+    """
+    lock_key = f"lock:compute:{key}"
+    token = uuid.uuid4().hex
+    lock_timeout = settings.CACHE_COMPUTE_LOCK_TIMEOUT
+    lock_owned = False
+
+    try:
+        async with redis_operation() as redis:
+            acquired = lock_owned = bool(
+                await redis.set(lock_key, token, nx=True, ex=lock_timeout)
+            )
+    except Exception as e:
+        # Redis unavailable: compute locally, single-flight still coalesces
+        _log_cache_error(f"Compute lock error for key '{key}'", e)
+        acquired = True
+
+    if not acquired:
+        metrics.increment("cache_compute_lock_contended_total")
+        if not wait:
+            return None
+
+        deadline = time.monotonic() + lock_timeout
+        delay = 0.05
+        while time.monotonic() < deadline:
+            await asyncio.sleep(delay)
+            entry = await _read_computed(key)
+            if entry is not None and entry["e"] > time.time():
+                return entry["v"]
+            delay = min(delay * 2, 0.5)
+        logger.warning(f"Timed out waiting for recompute of '{key}', computing locally")
+
+    try:
+        started = time.monotonic()
+        value = await loader()
+        delta = time.monotonic() - started
+        metrics.increment("cache_recomputes_total")
+        await _store_computed(key, value, delta, ttl, stale_ttl)
+        return value
+    finally:
+        if lock_owned:
+            try:
+                await release_lock_script(keys=[lock_key], args=[token])
+            except Exception as e:
+                _log_cache_error(f"Compute lock release error for key '{key}'", e)
+
+
+def _schedule_refresh(
+    key: str,
+    loader: Callable[[], Awaitable[Any]],
+    ttl: int,
+    stale_ttl: int,
+) -> None:
+    """Refresh a key in the background (at most once per key per process)"""
+    # Own flight key: a miss must not join a refresh, which returns None
+    # (wait=False) and swallows loader errors
+    flight_key = f"refresh:{key}"
+    if _compute_flight.in_flight(flight_key):
+        return
+
+    async def refresh() -> Any:
+        try:
+            return await _recompute(key, loader, ttl, stale_ttl, wait=False)
+        except Exception as e:
+            logger.error(f"Background refresh failed for key '{key}': {e}")
+            return None
+
+    task = _compute_flight.start(flight_key, refresh)
+    _background_refreshes.add(task)
+    task.add_done_callback(_background_refreshes.discard)
+
+
+async def cache_get_or_compute(
+    key: str,
+    loader: Callable[[], Awaitable[Any]],
+    ttl: int,
+    stale_ttl: Optional[int] = None,
+    beta: float = 1.0,
+    serve_stale: bool = True,
+) -> Any:
+    """
+    Get a value, computing it with `loader` on a miss, with stampede protection
+
+    - Fresh value: returned directly; XFetch may trigger an early refresh
+    - Expired value within the stale window: returned while one background
+      refresh runs (set serve_stale=False to wait for the new value instead)
+    - Miss: concurrent callers in this process share one loader call, and
+      across workers only the lock holder calls the loader
+
+    Values are stored in an envelope, so read them back through this
+    function rather than cache_get().
+
+    Args:
+        key: Cache key
+        loader: Zero-argument coroutine function computing the value
+        ttl: Seconds the value is considered fresh
+        stale_ttl: Extra seconds an expired value may be served
+                   (default: CACHE_STALE_TTL)
+        beta: XFetch aggressiveness (>1 refreshes earlier, 0 disables)
+        serve_stale: Return the current value while refreshing in background
+
+    Returns:
+        Cached or freshly computed value
+
+    Raises:
+        Any exception raised by `loader` when there is no value to serve
+
+    Example:
+        quote = await cache_get_or_compute(
+            "fx:usd:mxn", lambda: fx_client.get_quote("USD", "MXN"), ttl=30
+        )
+    """
+    stale_ttl = settings.CACHE_STALE_TTL if stale_ttl is None else stale_ttl
+
+    entry = await _read_computed(key)
+    if entry is not None:
+        now = time.time()
+        if now < entry["e"] and not _xfetch_should_refresh(entry.get("d", 0), entry["e"], beta, now):
+            metrics.increment("cache_compute_lookups_total", result="fresh")
+            return entry["v"]
+
+        if serve_stale:
+            metrics.increment(
+                "cache_compute_lookups_total",
+                result="early_refresh" if now < entry["e"] else "stale",
+            )
+            _schedule_refresh(key, loader, ttl, stale_ttl)
+            return entry["v"]
+
+    metrics.increment("cache_compute_lookups_total", result="miss")
+    return await _compute_flight.do(
+        key, lambda: _recompute(key, loader, ttl, stale_ttl, wait=True)
+    )
+
+
 # Utility Functions for Common Use Cases
+#
+# Keys embed a Redis Cluster hash tag ({...}): only the tagged part is
+# hashed, so every key for the same user / transaction lands in the same
+# slot and multi-key commands and scripts across them keep working.
+
+def hash_tag(kind: str, identifier: str) -> str:
+    """Hash tag grouping all keys of one entity, e.g. '{user:123}'"""
+    return f"{{{kind}:{identifier}}}"
+
+
+def get_user_key(user_id: str, *parts: str) -> str:
+    """Generate a per-user key, e.g. get_user_key(uid, "profile") -> user:{user:uid}:profile"""
+    return ":".join(("user", hash_tag("user", user_id), *parts))
+
 
 def get_user_session_key(user_id: str) -> str:
     """Generate Redis key for user session"""
-    return f"session:user:{user_id}"
+    return f"session:{hash_tag('user', user_id)}"
 
 
 def get_rate_limit_key(identifier: str, endpoint: str) -> str:
-    """Generate Redis key for rate limiting"""
-    return f"ratelimit:{endpoint}:{identifier}"
+    """Generate Redis key for rate limiting (all endpoints of one caller share a slot)"""
+    return f"ratelimit:{hash_tag('rl', identifier)}:{endpoint}"
 
 
 def get_otp_key(phone: str) -> str:
     """Generate Redis key for OTP storage"""
-    return f"otp:{phone}"
+    return f"otp:{hash_tag('phone', phone)}"
 
 
 def get_transaction_lock_key(transaction_id: str) -> str:
     """Generate Redis key for transaction locking"""
-    return f"lock:transaction:{transaction_id}"
+    return f"lock:{hash_tag('transaction', transaction_id)}"
+
+
+def get_stream_cursor_key(stream: str) -> str:
+    """Generate Redis key holding the last processed Horizon stream cursor"""
+    return f"stellar:stream:{stream}:cursor"
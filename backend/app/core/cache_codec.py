@@ -0,0 +1,303 @@
+"""
+Wani - Cache Codec
+Type-preserving binary serialization for Redis cache values
+
+Wire format (v1):
+
+    +--------+----------------------------+
+    | header | payload (maybe compressed) |
+    +--------+----------------------------+
+
+    header = 0b11111 C II
+        0b11111  format v1 marker (0xF8-0xFF never start valid UTF-8,
+                 so legacy JSON/plain-text values are told apart safely)
+        C        payload is zlib-compressed
+        II       codec id (0 = msgpack, 1 = json)
+
+Plain integers are stored as ASCII digits without a header so Redis
+INCR/INCRBY keep working on values written through cache_set().
+"""
+
+import base64
+import json
+import logging
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, Optional, Union
+from uuid import UUID
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import msgpack
+
+    _MSGPACK_INSTALLED = True
+except ImportError:  # pragma: no cover - depends on environment
+    _MSGPACK_INSTALLED = False
+
+HEADER_MARKER = 0xF8
+FLAG_COMPRESSED = 0x04
+CODEC_ID_MASK = 0x03
+
+
+class CacheCodecError(Exception):
+    """Raised when a cached value cannot be encoded or decoded"""
+
+    pass
+
+
+class Codec:
+    """
+    Base class for cache codecs
+
+    Subclasses set a unique `codec_id` (0-3) and `name`, and implement
+    dumps()/loads(). Register them with register_codec().
+    """
+
+    codec_id: int
+    name: str
+
+    def dumps(self, value: Any) -> bytes:
+        raise NotImplementedError
+
+    def loads(self, data: bytes) -> Any:
+        raise NotImplementedError
+
+
+# msgpack extension type codes
+_EXT_DECIMAL = 1
+_EXT_UUID = 2
+_EXT_DATETIME = 3
+_EXT_DATE = 4
+
+
+class MsgpackCodec(Codec):
+    """
+    msgpack codec with extension types for Decimal, UUID, datetime and date
+
+    Timezone-aware datetimes use msgpack's native Timestamp type (decoded in
+    C, returned in UTC); naive datetimes fall back to an ISO-8601 extension.
+    Tuples are returned as lists (msgpack has a single array type).
+    """
+
+    codec_id = 0
+    name = "msgpack"
+
+    def __init__(self):
+        if not _MSGPACK_INSTALLED:
+            raise ImportError("msgpack is not installed")
+
+    @staticmethod
+    def _default(obj: Any) -> Any:
+        if isinstance(obj, Decimal):
+            return msgpack.ExtType(_EXT_DECIMAL, str(obj).encode())
+        if isinstance(obj, UUID):
+            return msgpack.ExtType(_EXT_UUID, obj.bytes)
+        if isinstance(obj, datetime):
+            return msgpack.ExtType(_EXT_DATETIME, obj.isoformat().encode())
+        if isinstance(obj, date):
+            return msgpack.ExtType(_EXT_DATE, obj.isoformat().encode())
+        raise TypeError(f"Cannot serialize {type(obj).__name__} for cache")
+
+    @staticmethod
+    def _ext_hook(code: int, data: bytes) -> Any:
+        if code == _EXT_DECIMAL:
+            return Decimal(data.decode())
+        if code == _EXT_UUID:
+            return UUID(bytes=data)
+        if code == _EXT_DATETIME:
+            return datetime.fromisoformat(data.decode())
+        if code == _EXT_DATE:
+            return date.fromisoformat(data.decode())
+        return msgpack.ExtType(code, data)
+
+    def dumps(self, value: Any) -> bytes:
+        packed: bytes = msgpack.packb(
+            value, default=self._default, use_bin_type=True, datetime=True
+        )
+        return packed
+
+    def loads(self, data: bytes) -> Any:
+        return msgpack.unpackb(
+            data, ext_hook=self._ext_hook, raw=False, strict_map_key=False, timestamp=3
+        )
+
+
+# JSON type tag key; objects carrying it are decoded back to the original type
+_JSON_TAG = "__t"
+
+
+class JsonCodec(Codec):
+    """
+    Stdlib JSON codec with tagged objects for Decimal, UUID, datetime, date and bytes
+
+    Fallback for environments without msgpack; slower but dependency-free.
+    """
+
+    codec_id = 1
+    name = "json"
+
+    @staticmethod
+    def _default(obj: Any) -> Any:
+        if isinstance(obj, Decimal):
+            return {_JSON_TAG: "dec", "v": str(obj)}
+        if isinstance(obj, UUID):
+            return {_JSON_TAG: "uuid", "v": obj.hex}
+        if isinstance(obj, datetime):
+            return {_JSON_TAG: "dt", "v": obj.isoformat()}
+        if isinstance(obj, date):
+            return {_JSON_TAG: "date", "v": obj.isoformat()}
+        if isinstance(obj, bytes):
+            return {_JSON_TAG: "b64", "v": base64.b64encode(obj).decode()}
+        raise TypeError(f"Cannot serialize {type(obj).__name__} for cache")
+
+    @staticmethod
+    def _object_hook(obj: Dict[str, Any]) -> Any:
+        tag = obj.get(_JSON_TAG)
+        if tag is None or len(obj) != 2:
+            return obj
+        value = obj["v"]
+        if tag == "dec":
+            return Decimal(value)
+        if tag == "uuid":
+            return UUID(value)
+        if tag == "dt":
+            return datetime.fromisoformat(value)
+        if tag == "date":
+            return date.fromisoformat(value)
+        if tag == "b64":
+            return base64.b64decode(value)
+        return obj
+
+    def dumps(self, value: Any) -> bytes:
+        return json.dumps(value, default=self._default, separators=(",", ":")).encode()
+
+    def loads(self, data: bytes) -> Any:
+        return json.loads(data, object_hook=self._object_hook)
+
+
+# Codec registry (by id for decoding, by name for configuration)
+_codecs_by_id: Dict[int, Codec] = {}
+_codecs_by_name: Dict[str, Codec] = {}
+
+
+def register_codec(codec: Codec) -> None:
+    """
+    Register a codec so it can be selected by name and decoded by id
+
+    Args:
+        codec: Codec instance with a unique codec_id in range 0-3
+    """
+    if not 0 <= codec.codec_id <= CODEC_ID_MASK:
+        raise ValueError(f"codec_id must be between 0 and {CODEC_ID_MASK}")
+    _codecs_by_id[codec.codec_id] = codec
+    _codecs_by_name[codec.name] = codec
+
+
+def get_codec(name: Optional[str] = None) -> Codec:
+    """
+    Get a registered codec by name (default: settings.CACHE_CODEC)
+
+    Falls back to the JSON codec if the configured one is unavailable.
+    """
+    name = name or settings.CACHE_CODEC
+    codec = _codecs_by_name.get(name)
+    if codec is None:
+        logger.warning(f"Cache codec '{name}' not available, falling back to json")
+        codec = _codecs_by_name["json"]
+    return codec
+
+
+register_codec(JsonCodec())
+if _MSGPACK_INSTALLED:
+    register_codec(MsgpackCodec())
+
+_default_codec: Optional[Codec] = None
+
+
+def _get_default_codec() -> Codec:
+    global _default_codec
+    if _default_codec is None:
+        _default_codec = get_codec()
+    return _default_codec
+
+
+def encode(value: Any, codec: Optional[Codec] = None) -> bytes:
+    """
+    Serialize a value for storage in Redis
+
+    Args:
+        value: Any value supported by the codec (dict, list, str, int, float,
+               bool, None, Decimal, UUID, datetime, date, bytes)
+        codec: Codec to use (default: settings.CACHE_CODEC)
+
+    Returns:
+        Header byte + (optionally compressed) payload, or ASCII digits for ints
+
+    Raises:
+        CacheCodecError: If the value cannot be serialized
+    """
+    if type(value) is int:
+        return str(value).encode()
+
+    codec = codec or _get_default_codec()
+    try:
+        payload = codec.dumps(value)
+    except (TypeError, ValueError, OverflowError) as e:
+        raise CacheCodecError(str(e)) from e
+
+    header = HEADER_MARKER | codec.codec_id
+    if len(payload) >= settings.CACHE_COMPRESSION_THRESHOLD:
+        compressed = zlib.compress(payload, settings.CACHE_COMPRESSION_LEVEL)
+        if len(compressed) < len(payload):
+            header |= FLAG_COMPRESSED
+            payload = compressed
+
+    return bytes((header,)) + payload
+
+
+def decode(data: Optional[Union[bytes, str]]) -> Any:
+    """
+    Deserialize a value read from Redis
+
+    Values without a v1 header (written before the codec existed, or by
+    INCR) are decoded the legacy way: JSON if it parses, else plain text.
+
+    Args:
+        data: Raw Redis value (bytes or str), or None
+
+    Returns:
+        Decoded value, or None if data is None
+
+    Raises:
+        CacheCodecError: If a v1 value cannot be decoded
+    """
+    if data is None:
+        return None
+    if isinstance(data, str):
+        data = data.encode()
+    if not data:
+        return ""
+
+    header = data[0]
+    if header & HEADER_MARKER != HEADER_MARKER:
+        text = data.decode("utf-8", errors="replace")
+        try:
+            return json.loads(text)
+        except (json.JSONDecodeError, TypeError):
+            return text
+
+    codec = _codecs_by_id.get(header & CODEC_ID_MASK)
+    if codec is None:
+        raise CacheCodecError(f"No codec registered for id {header & CODEC_ID_MASK}")
+
+    payload = data[1:]
+    try:
+        if header & FLAG_COMPRESSED:
+            payload = zlib.decompress(payload)
+        return codec.loads(payload)
+    except Exception as e:
+        raise CacheCodecError(f"Failed to decode cached value: {e}") from e
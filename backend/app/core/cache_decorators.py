@@ -0,0 +1,223 @@
+"""
+Wani - Cache Decorators
+Declarative memoization for async functions with tag-based invalidation
+
+Tags are implemented with version tokens instead of key sets:
+
+    tag:{name}              -> random version token, replaced on invalidation
+    cached:{function key}   -> {"v": value, "t": [tag versions at compute time]}
+
+A read fetches the entry and its tag versions in one MGET; the entry is a
+hit only if every stored version still matches. invalidate_tags() is one
+SET per tag, so invalidating `user:X` never scans or enumerates keys.
+Because versions are read *before* the function runs, an invalidation that
+races with a recompute simply makes the freshly stored entry stale.
+
+Tokens are random rather than counters: a tag key expires
+(CACHE_TAG_TTL) and a counter would restart at 0, so a later increment
+could reproduce a version an old entry still carries. A token never
+comes back, and an absent tag (never invalidated, or expired) only
+matches entries stored while it was absent - which expire first, since
+entry TTLs are capped at CACHE_TAG_TTL.
+"""
+
+import functools
+import hashlib
+import inspect
+import logging
+import uuid
+from datetime import date
+from decimal import Decimal
+from enum import Enum
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    TypeVar,
+    Union,
+)
+
+from app.core.cache import cache_delete, cache_get_many, cache_set, open_pipeline, redis_operation
+from app.core.cache_codec import encode
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+F = TypeVar("F", bound=Callable[..., Awaitable[Any]])
+
+# Arguments that identify context rather than the cached value
+DEFAULT_SKIP_ARGS = ("self", "cls", "db")
+
+# Argument types with a repr() that is stable across processes; anything
+# else (e.g. "<object at 0x...>") would give every call its own key
+_KEY_TYPES = (type(None), bool, int, float, str, bytes, Decimal, uuid.UUID, date, Enum)
+
+
+def get_tag_key(tag: str) -> str:
+    """Generate Redis key holding a tag's version token"""
+    return f"tag:{tag}"
+
+
+async def invalidate_tags(*tags: str) -> bool:
+    """
+    Invalidate every cached entry carrying any of the given tags
+
+    Args:
+        *tags: Tag names, e.g. "user:123"
+
+    Returns:
+        True if successful, False otherwise
+
+    Example:
+        await invalidate_tags(f"user:{user_id}")
+    """
+    if not tags:
+        return True
+
+    try:
+        async with redis_operation() as redis:
+            async with open_pipeline(redis) as pipe:
+                for tag in tags:
+                    pipe.set(get_tag_key(tag), encode(uuid.uuid4().hex), ex=settings.CACHE_TAG_TTL)
+                await pipe.execute()
+        metrics.increment("cache_tag_invalidations_total", len(tags))
+        return True
+
+    except Exception as e:
+        logger.error(f"Cache tag invalidation error for {tags}: {e}")
+        return False
+
+
+def _format(template: str, params: Dict[str, Any]) -> str:
+    """Render a key/tag template such as 'user:{user_id}' from call arguments"""
+    try:
+        return template.format(**params)
+    except (KeyError, IndexError) as e:
+        raise ValueError(f"Cache template '{template}' references unknown argument {e}") from e
+
+
+def _check_key_value(name: str, value: Any) -> None:
+    """Reject arguments whose repr() is not the same in every process"""
+    if isinstance(value, tuple):
+        for item in value:
+            _check_key_value(name, item)
+    elif not isinstance(value, _KEY_TYPES):
+        raise TypeError(
+            f"@cached cannot derive a key from argument '{name}' of type "
+            f"{type(value).__name__}: pass key= or add it to skip_args"
+        )
+
+
+def _default_key(prefix: str, params: Dict[str, Any]) -> str:
+    """
+    Stable key from the function name and a digest of its arguments
+
+    Raises:
+        TypeError: An argument is not a primitive (or tuple of them)
+    """
+    for name, value in params.items():
+        _check_key_value(name, value)
+    digest = hashlib.sha1(repr(sorted(params.items())).encode()).hexdigest()[:16]
+    return f"{prefix}:{digest}"
+
+
+def cached(
+    ttl: int,
+    key: Optional[Union[str, Callable[..., str]]] = None,
+    tags: Sequence[str] = (),
+    namespace: Optional[str] = None,
+    skip_args: Iterable[str] = DEFAULT_SKIP_ARGS,
+    cache_none: bool = False,
+) -> Callable[[F], F]:
+    """
+    Memoize an async function in Redis
+
+    Args:
+        ttl: Expiration in seconds (capped at CACHE_TAG_TTL)
+        key: Key template using argument names (e.g. "user:{user_id}") or a
+             callable receiving the arguments as keywords; default is the
+             function's qualified name plus a digest of its arguments, which
+             must be primitives (str, int, UUID, Decimal, datetime, enums,
+             tuples of them, ...) - other types raise TypeError
+        tags: Tag templates (e.g. ["user:{user_id}"]) for invalidate_tags()
+        namespace: Prefix for default keys (default: module.qualname)
+        skip_args: Argument names excluded from keys (sessions, self, ...)
+        cache_none: Also cache None results
+
+    The decorated function gains:
+        .invalidate(*args, **kwargs)  delete the entry for those arguments
+        .cache_key(*args, **kwargs)   the Redis key for those arguments
+        .uncached                     the original function
+
+    Example:
+        @staticmethod
+        @cached(ttl=300, key="user:{user_id}", tags=["user:{user_id}"])
+        async def get_profile(db: AsyncSession, user_id: str) -> dict:
+            ...
+
+        await invalidate_tags(f"user:{user_id}")
+    """
+    ttl = min(ttl, settings.CACHE_TAG_TTL)
+    skip = frozenset(skip_args)
+
+    def decorator(fn: F) -> F:
+        if not inspect.iscoroutinefunction(fn):
+            raise TypeError("@cached only supports async functions")
+
+        signature = inspect.signature(fn)
+        prefix = namespace or f"{fn.__module__}.{fn.__qualname__}"
+
+        def resolve(args: tuple, kwargs: dict) -> tuple[str, List[str]]:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            params = {name: value for name, value in bound.arguments.items() if name not in skip}
+
+            if key is None:
+                entry_key = _default_key(prefix, params)
+            elif callable(key):
+                entry_key = key(**params)
+            else:
+                entry_key = _format(key, params)
+
+            return f"cached:{entry_key}", [_format(tag, params) for tag in tags]
+
+        @functools.wraps(fn)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            entry_key, tag_names = resolve(args, kwargs)
+            tag_keys = [get_tag_key(tag) for tag in tag_names]
+
+            found = await cache_get_many([entry_key, *tag_keys])
+            versions = [found.get(tag_key) for tag_key in tag_keys]
+
+            entry = found.get(entry_key)
+            if isinstance(entry, dict) and entry.get("t") == versions and "v" in entry:
+                metrics.increment("cache_decorator_lookups_total", function=prefix, result="hit")
+                return entry["v"]
+
+            metrics.increment("cache_decorator_lookups_total", function=prefix, result="miss")
+            result = await fn(*args, **kwargs)
+
+            if result is not None or cache_none:
+                await cache_set(entry_key, {"v": result, "t": versions}, expire=ttl)
+
+            return result
+
+        async def invalidate(*args: Any, **kwargs: Any) -> bool:
+            entry_key, _ = resolve(args, kwargs)
+            return await cache_delete(entry_key)
+
+        def cache_key(*args: Any, **kwargs: Any) -> str:
+            return resolve(args, kwargs)[0]
+
+        wrapper.invalidate = invalidate  # type: ignore[attr-defined]
+        wrapper.cache_key = cache_key  # type: ignore[attr-defined]
+        wrapper.uncached = fn  # type: ignore[attr-defined]
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
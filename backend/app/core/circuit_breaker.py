@@ -0,0 +1,156 @@
+"""
+Wani - Circuit Breaker
+Fail fast while a dependency is unhealthy, recover through half-open probing
+"""
+
+import logging
+import time
+from typing import Dict, List
+
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the circuit is open"""
+
+    def __init__(self, name: str):
+        self.name = name
+        super().__init__(f"Circuit '{name}' is open")
+
+
+class CircuitBreaker:
+    """
+    Three-state circuit breaker
+
+    - closed:    calls pass; `failure_threshold` consecutive failures open it
+    - open:      calls are rejected immediately for `recovery_timeout` seconds
+    - half_open: a limited number of probe calls pass. The allowed
+                 concurrency doubles with each success (1, 2, 4, ...), and
+                 `success_threshold` successes close the circuit. Any failure
+                 re-opens it.
+
+    Usage:
+        if not breaker.allow_request():
+            raise CircuitOpenError(breaker.name)
+        try:
+            result = await call()
+        except TransientError:
+            breaker.record_failure()
+            raise
+        breaker.record_success()
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 15.0,
+        success_threshold: int = 3,
+        max_half_open_calls: int = 4,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.success_threshold = success_threshold
+        self.max_half_open_calls = max_half_open_calls
+
+        self.state = self.CLOSED
+        self.failures = 0
+        self.half_open_successes = 0
+        self.half_open_in_flight = 0
+        self.opened_at = 0.0
+
+        _breakers.append(self)
+
+    def _transition(self, state: str) -> None:
+        if state == self.state:
+            return
+        logger.warning(f"Circuit '{self.name}': {self.state} -> {state}")
+        metrics.increment("circuit_breaker_transitions_total", breaker=self.name, state=state)
+        self.state = state
+        if state == self.OPEN:
+            self.opened_at = time.monotonic()
+        self.failures = 0
+        self.half_open_successes = 0
+        self.half_open_in_flight = 0
+
+    def allow_request(self) -> bool:
+        """
+        Decide whether a call may proceed
+
+        Every allowed call must be followed by record_success(),
+        record_failure() or release(), so half-open probe slots are freed.
+        """
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.recovery_timeout:
+                metrics.increment("circuit_breaker_rejections_total", breaker=self.name)
+                return False
+            self._transition(self.HALF_OPEN)
+
+        if self.state == self.HALF_OPEN:
+            allowed = min(2**self.half_open_successes, self.max_half_open_calls)
+            if self.half_open_in_flight >= allowed:
+                metrics.increment("circuit_breaker_rejections_total", breaker=self.name)
+                return False
+            self.half_open_in_flight += 1
+
+        return True
+
+    def record_success(self) -> None:
+        """Report a successful call"""
+        if self.state == self.HALF_OPEN:
+            self.half_open_in_flight = max(self.half_open_in_flight - 1, 0)
+            self.half_open_successes += 1
+            if self.half_open_successes >= self.success_threshold:
+                self._transition(self.CLOSED)
+        else:
+            self.failures = 0
+
+    def record_failure(self) -> None:
+        """Report a failed call (connection error, timeout, 5xx, ...)"""
+        if self.state == self.HALF_OPEN:
+            self._transition(self.OPEN)
+            return
+
+        self.failures += 1
+        if self.state == self.CLOSED and self.failures >= self.failure_threshold:
+            self._transition(self.OPEN)
+
+    def release(self) -> None:
+        """
+        Report a call that says nothing about the dependency's health
+
+        For calls that were cancelled or failed for their own reasons: the
+        half-open probe slot is freed and nothing else changes.
+        """
+        if self.state == self.HALF_OPEN:
+            self.half_open_in_flight = max(self.half_open_in_flight - 1, 0)
+
+    @property
+    def is_closed(self) -> bool:
+        return self.state == self.CLOSED
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "half_open_successes": self.half_open_successes,
+        }
+
+
+# All breakers created in this process, reported via /metrics
+_breakers: List[CircuitBreaker] = []
+
+
+def get_circuit_breaker_states() -> Dict[str, Dict[str, object]]:
+    """State of every circuit breaker in this process"""
+    return {breaker.name: breaker.to_dict() for breaker in _breakers}
+
+
+metrics.register_collector("circuit_breakers", get_circuit_breaker_states)
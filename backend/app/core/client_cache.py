@@ -0,0 +1,311 @@
+"""
+Wani - Client-Side Cache
+Coherent in-process copies of read-mostly Redis keys via CLIENT TRACKING
+
+Redis 6+ can track which keys a client cares about and push an
+invalidation when any client modifies them. We use broadcasting mode on a
+dedicated connection that redirects invalidations to itself:
+
+    CLIENT TRACKING ON REDIRECT <own id> BCAST PREFIX principal: PREFIX config:
+    SUBSCRIBE __redis__:invalidate
+
+Every write to a key under a tracked prefix (from any client) produces a
+message with that key, so the local copy is evicted without polling and
+without TTL guesswork. Only CACHE_TRACKING_PREFIXES are cached locally.
+
+The RESP2 redirect form is used because redis-py 5.0's asyncio client does
+not expose RESP3 push messages; the invalidation payload is the same.
+
+The tracking connection stays subscribed for the life of the process, so
+it is opened beside the shared pool (same settings and, under Sentinel,
+the same master discovery) rather than taken from it: it never counts
+against REDIS_MAX_CONNECTIONS and never leaves the pool one short.
+
+If the server rejects CLIENT TRACKING (older Redis, some managed offerings)
+or runs as a Cluster, reads transparently fall back to plain Redis GETs.
+While the tracking connection is down the local store is cleared and not
+used, since invalidations sent during the outage are lost.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, List, Optional
+
+from redis.exceptions import ResponseError
+
+from app.core.cache import (
+    _log_cache_error,
+    _record_op,
+    cache_delete,
+    cache_set,
+    get_redis,
+    is_cluster,
+    redis_operation,
+)
+from app.core.cache_codec import decode
+from app.core.config import settings
+from app.core.local_cache import MISSING, LocalCache
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "__redis__:invalidate"
+
+# Bounded store for tracked keys; the TTL is only a safety net
+tracked_cache = LocalCache(
+    max_entries=settings.CACHE_TRACKING_MAX_ENTRIES,
+    default_ttl=settings.CACHE_TRACKING_TTL,
+)
+
+# True while the tracking connection is subscribed (local copies are coherent)
+_tracking_active = False
+
+# False once the server has rejected CLIENT TRACKING
+_tracking_supported = True
+
+# Bumped on every invalidation; a GET that overlaps one is not stored locally
+_tracking_seq = 0
+
+_tracking_task: Optional[asyncio.Task] = None
+
+
+def get_tracking_prefixes() -> List[str]:
+    """Parse CACHE_TRACKING_PREFIXES"""
+    return [p.strip() for p in settings.CACHE_TRACKING_PREFIXES.split(",") if p.strip()]
+
+
+def _is_tracked(key: str) -> bool:
+    return any(key.startswith(prefix) for prefix in get_tracking_prefixes())
+
+
+def _apply_invalidation(data: Any) -> None:
+    """Evict keys named in an invalidation message (None = server flushed)"""
+    global _tracking_seq
+
+    _tracking_seq += 1
+    if data is None:
+        tracked_cache.clear()
+        metrics.increment("cache_tracking_invalidations_total", kind="flush")
+        return
+
+    keys = data if isinstance(data, list) else [data]
+    for key in keys:
+        tracked_cache.delete(key.decode() if isinstance(key, bytes) else key)
+    metrics.increment("cache_tracking_invalidations_total", len(keys), kind="keys")
+
+
+def _set_active(active: bool) -> None:
+    global _tracking_active, _tracking_seq
+
+    if not active:
+        # Invalidations may be missed from here on
+        _tracking_seq += 1
+        tracked_cache.clear()
+    _tracking_active = active
+
+
+async def _run_tracking_connection() -> None:
+    """
+    Hold the tracking connection and apply invalidations until cancelled
+
+    Reconnects with exponential backoff. After CACHE_TRACKING_PING_INTERVAL
+    seconds without traffic a PING is sent; a second silent interval is
+    treated as a dead connection.
+    """
+    global _tracking_supported
+
+    backoff = 0.5
+    while True:
+        connection = None
+        try:
+            client = await get_redis()
+            if is_cluster(client):
+                _tracking_supported = False
+                logger.warning(
+                    "Client-side caching is not supported on Redis Cluster; reading from Redis"
+                )
+                return
+
+            # Dedicated connection, outside the pool's accounting
+            connection = client.connection_pool.make_connection()
+            await connection.connect()
+
+            await connection.send_command("CLIENT", "ID", check_health=False)
+            client_id = await connection.read_response()
+
+            prefixes = [arg for prefix in get_tracking_prefixes() for arg in ("PREFIX", prefix)]
+            await connection.send_command(
+                "CLIENT",
+                "TRACKING",
+                "ON",
+                "REDIRECT",
+                client_id,
+                "BCAST",
+                *prefixes,
+                check_health=False,
+            )
+            try:
+                await connection.read_response()
+            except ResponseError as e:
+                _tracking_supported = False
+                logger.warning(
+                    f"Redis rejected CLIENT TRACKING ({e}); client-side caching disabled"
+                )
+                return
+
+            await connection.send_command("SUBSCRIBE", INVALIDATION_CHANNEL, check_health=False)
+            await connection.read_response()
+
+            _set_active(True)
+            backoff = 0.5
+            logger.info(f"📡 Client-side cache tracking {get_tracking_prefixes()}")
+
+            awaiting_pong = False
+            while True:
+                response = await connection.read_response(
+                    timeout=settings.CACHE_TRACKING_PING_INTERVAL
+                )
+                if response is None:
+                    if awaiting_pong:
+                        raise ConnectionError("Tracking connection did not answer PING")
+                    await connection.send_command("PING", check_health=False)
+                    awaiting_pong = True
+                    continue
+
+                awaiting_pong = False
+                if (
+                    isinstance(response, list)
+                    and len(response) == 3
+                    and response[0] in (b"message", "message")
+                ):
+                    _apply_invalidation(response[2])
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            _set_active(False)
+            logger.warning(f"Client-side cache tracking error, retrying in {backoff}s: {e}")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30)
+        finally:
+            _set_active(False)
+            if connection is not None:
+                await connection.disconnect()
+
+
+def start_client_tracking() -> None:
+    """
+    Start the tracking connection
+    Called on application startup when CACHE_CLIENT_TRACKING is enabled
+    """
+    global _tracking_task
+
+    if _tracking_task is None or _tracking_task.done():
+        _tracking_task = asyncio.get_running_loop().create_task(_run_tracking_connection())
+
+
+async def stop_client_tracking() -> None:
+    """
+    Stop the tracking connection and drop local copies
+    Called on application shutdown
+    """
+    global _tracking_task
+
+    if _tracking_task is not None:
+        _tracking_task.cancel()
+        try:
+            await _tracking_task
+        except asyncio.CancelledError:
+            pass
+        _tracking_task = None
+    _set_active(False)
+
+
+async def cache_get_tracked(key: str) -> Optional[Any]:
+    """
+    Get a value, served from process memory while Redis tracks the key
+
+    Keys outside CACHE_TRACKING_PREFIXES, and all keys while tracking is
+    unavailable, are read from Redis directly.
+
+    Args:
+        key: Cache key (e.g. "principal:{user:123}")
+
+    Returns:
+        Cached value or None if not found
+    """
+    use_local = _tracking_active and _is_tracked(key)
+
+    if use_local:
+        value = tracked_cache.get(key)
+        if value is not MISSING:
+            metrics.increment("cache_tracking_lookups_total", result="hit")
+            return value
+        metrics.increment("cache_tracking_lookups_total", result="miss")
+
+    seq = _tracking_seq
+    started = time.perf_counter()
+    try:
+        async with redis_operation() as redis:
+            raw = await redis.get(key)
+    except Exception as e:
+        _record_op("get", key, started, result="error")
+        _log_cache_error(f"Cache get error for key '{key}'", e)
+        return None
+
+    if raw is None:
+        _record_op("get", key, started, result="miss")
+        return None
+
+    _record_op("get", key, started, result="hit", size=len(raw))
+    try:
+        value = decode(raw)
+    except Exception as e:
+        _log_cache_error(f"Cache decode error for key '{key}'", e)
+        # Undecodable (e.g. written by an incompatible codec): evict it
+        await cache_delete_tracked(key)
+        return None
+
+    # Skip the store if an invalidation (or disconnect) raced with the GET
+    if use_local and value is not None and seq == _tracking_seq and _tracking_active:
+        tracked_cache.set(key, value)
+    return value
+
+
+async def cache_set_tracked(key: str, value: Any, expire: Optional[int] = None) -> bool:
+    """
+    Set a tracked key
+
+    Evicts this worker's copy immediately; other workers (and this one,
+    again) are invalidated by the server.
+    """
+    tracked_cache.delete(key)
+    return await cache_set(key, value, expire)
+
+
+async def cache_delete_tracked(key: str) -> bool:
+    """Delete a tracked key (see cache_set_tracked)"""
+    tracked_cache.delete(key)
+    return await cache_delete(key)
+
+
+def get_client_cache_stats() -> dict:
+    """Client-side cache state and hit ratio"""
+    hits = metrics.get_counter("cache_tracking_lookups_total", result="hit")
+    misses = metrics.get_counter("cache_tracking_lookups_total", result="miss")
+    total = hits + misses
+    return {
+        "enabled": settings.CACHE_CLIENT_TRACKING,
+        "supported": _tracking_supported,
+        "active": _tracking_active,
+        "prefixes": get_tracking_prefixes(),
+        "size": len(tracked_cache),
+        "evictions": tracked_cache.evictions,
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / total, 4) if total else 0.0,
+    }
+
+
+metrics.register_collector("client_cache", get_client_cache_stats)
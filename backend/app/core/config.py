@@ -28,6 +28,94 @@ class Settings(BaseSettings):
 
     # Redis Configuration
     REDIS_URL: str = Field(default="redis://localhost:6379/0", description="Redis connection URL")
+    REDIS_MODE: str = Field(
+        default="standalone",
+        description="Redis topology: standalone, sentinel or cluster (REDIS_URL is a seed node)"
+    )
+    REDIS_SENTINELS: Optional[str] = Field(
+        default=None,
+        description="Comma-separated sentinel host:port list (REDIS_MODE=sentinel)"
+    )
+    REDIS_SENTINEL_MASTER: str = Field(default="mymaster", description="Sentinel master service name")
+    REDIS_SENTINEL_PASSWORD: Optional[str] = Field(default=None, description="Password for the sentinels themselves")
+    REDIS_MAX_CONNECTIONS: int = Field(default=20, description="Max connections in the Redis pool")
+    REDIS_POOL_WARM_CONNECTIONS: int = Field(default=5, description="Redis connections opened at startup")
+    REDIS_SOCKET_TIMEOUT: float = Field(default=5.0, description="Redis socket read/write timeout (seconds)")
+    REDIS_SOCKET_CONNECT_TIMEOUT: float = Field(default=5.0, description="Redis connect timeout (seconds)")
+    REDIS_BREAKER_FAILURE_THRESHOLD: int = Field(
+        default=5,
+        description="Consecutive Redis connectivity failures before cache calls fail fast"
+    )
+    REDIS_BREAKER_RECOVERY_TIMEOUT: float = Field(
+        default=15.0,
+        description="Seconds the Redis breaker stays open before half-open probing"
+    )
+    REDIS_BREAKER_SUCCESS_THRESHOLD: int = Field(
+        default=3,
+        description="Successful half-open probes needed to close the Redis breaker"
+    )
+
+    # Layered Cache (in-process tier in front of Redis)
+    CACHE_LOCAL_MAX_ENTRIES: int = Field(default=10000, description="Max entries in the in-process cache tier")
+    CACHE_LOCAL_TTL: int = Field(default=30, description="Default TTL (seconds) for the in-process cache tier")
+    CACHE_INVALIDATION_CHANNEL: str = Field(
+        default="cache:invalidate",
+        description="Redis pub/sub channel used to broadcast local cache invalidations"
+    )
+
+    # Cache Observability
+    CACHE_HOTKEY_SAMPLE_RATE: float = Field(
+        default=0.01,
+        description="Fraction of cache accesses sampled for the hot-key report (0 disables)"
+    )
+    CACHE_HOTKEY_CAPACITY: int = Field(default=500, description="Max distinct keys tracked by the hot-key sampler")
+    CACHE_HOTKEY_REPORT_SIZE: int = Field(default=20, description="Hot keys listed under /metrics")
+
+    # Client-Side Cache (app.core.client_cache, Redis CLIENT TRACKING)
+    CACHE_CLIENT_TRACKING: bool = Field(default=False, description="Enable the client-side cache for tracked prefixes")
+    CACHE_TRACKING_PREFIXES: str = Field(
+        default="principal:,config:",
+        description="Comma-separated key prefixes cached in-process and invalidated by Redis"
+    )
+    CACHE_TRACKING_MAX_ENTRIES: int = Field(default=5000, description="Max keys held by the client-side cache")
+    CACHE_TRACKING_TTL: int = Field(
+        default=300,
+        description="Safety-net TTL (seconds) for client-side entries; invalidation normally evicts first"
+    )
+    CACHE_TRACKING_PING_INTERVAL: float = Field(
+        default=15.0,
+        description="Idle seconds before the tracking connection is PINGed"
+    )
+
+    # Cache Stampede Protection (cache_get_or_compute)
+    CACHE_STALE_TTL: int = Field(
+        default=60,
+        description="Seconds an expired computed value may still be served while it is refreshed"
+    )
+    CACHE_COMPUTE_LOCK_TIMEOUT: int = Field(
+        default=10,
+        description="Max seconds one worker holds the recompute lock for a key"
+    )
+
+    # Distributed Locks (app.core.distributed_lock)
+    LOCK_TTL: float = Field(default=30.0, description="Lock lifetime (seconds); renewed while held")
+    LOCK_WAIT_TIMEOUT: float = Field(default=10.0, description="Max seconds to wait for a contended lock")
+    LOCK_RETRY_BASE_DELAY: float = Field(default=0.05, description="Initial lock retry backoff (seconds)")
+    LOCK_RETRY_MAX_DELAY: float = Field(default=1.0, description="Max lock retry backoff (seconds)")
+
+    # Cache Decorator (@cached)
+    CACHE_TAG_TTL: int = Field(
+        default=7 * 24 * 3600,
+        description="Lifetime (seconds) of tag version tokens; also the max @cached TTL"
+    )
+
+    # Cache Serialization
+    CACHE_CODEC: str = Field(default="msgpack", description="Cache value codec: msgpack or json")
+    CACHE_COMPRESSION_THRESHOLD: int = Field(
+        default=1024,
+        description="Compress cache values whose encoded size is at least this many bytes"
+    )
+    CACHE_COMPRESSION_LEVEL: int = Field(default=1, description="zlib level for compressed cache values (1-9)")
 
     # Authentication Configuration
     JWT_SECRET: str = Field(..., description="Secret key for JWT token generation")
@@ -41,6 +129,26 @@ class Settings(BaseSettings):
         default="https://horizon-testnet.stellar.org",
         description="Stellar Horizon API URL"
     )
+    STELLAR_HORIZON_URLS: str = Field(
+        default="",
+        description="Additional Horizon instances, comma-separated (requests go to the fastest healthy one)"
+    )
+    STELLAR_HORIZON_EWMA_ALPHA: float = Field(
+        default=0.2,
+        description="Weight of the newest sample in each Horizon endpoint's latency average"
+    )
+    STELLAR_HORIZON_EXPLORE_RATE: float = Field(
+        default=0.05,
+        description="Share of Horizon requests sent to a random healthy endpoint to keep latencies current"
+    )
+    STELLAR_HORIZON_BREAKER_FAILURES: int = Field(
+        default=5,
+        description="Consecutive failures that take a Horizon endpoint out of rotation"
+    )
+    STELLAR_HORIZON_BREAKER_RECOVERY: float = Field(
+        default=30.0,
+        description="Seconds before a failed Horizon endpoint is probed again"
+    )
     STELLAR_HOT_WALLET_SECRET: str = Field(..., description="Hot wallet secret key (ENCRYPTED)")
     STELLAR_COLD_WALLET_PUBLIC: str = Field(..., description="Cold wallet public key")
     STELLAR_USDC_ISSUER: str = Field(
@@ -48,6 +156,143 @@ class Settings(BaseSettings):
         description="USDC issuer on Stellar"
     )
 
+    # Testnet Funding (StellarService.fund_testnet_account, app.services.stellar_fixtures)
+    STELLAR_FRIENDBOT_URL: str = Field(
+        default="https://friendbot.stellar.org",
+        description="Friendbot endpoint (point at a local stand-in to run fixtures offline)"
+    )
+    STELLAR_FRIENDBOT_RETRIES: int = Field(
+        default=4,
+        description="Retries per account when Friendbot is rate limited, times out or fails with 5xx"
+    )
+
+    # Transaction Building
+    STELLAR_BASE_FEE: int = Field(
+        default=100,
+        description="Fee per operation in stroops when fee_stats are unavailable"
+    )
+    STELLAR_TX_TIMEOUT: int = Field(default=60, description="Seconds a built transaction stays valid (timebounds)")
+    STELLAR_MAX_FEE: int = Field(
+        default=10000,
+        description="Highest fee per operation (stroops) the fee oracle will bid, including fee bumps"
+    )
+    STELLAR_FEE_POLL_INTERVAL: float = Field(default=5.0, description="Seconds between Horizon fee_stats polls")
+    STELLAR_FEE_STALE_AFTER: float = Field(
+        default=30.0,
+        description="Fall back to STELLAR_BASE_FEE when fee_stats are older than this"
+    )
+    STELLAR_FEE_BUMP_ATTEMPTS: int = Field(default=2, description="Fee bumps tried for a stuck transaction")
+    STELLAR_SEQUENCE_IDLE_TIMEOUT: float = Field(
+        default=300.0,
+        description="Reload a source account's sequence from Horizon after this many idle seconds"
+    )
+
+    # Channel Accounts (app.services.stellar_channels)
+    STELLAR_CHANNEL_SECRETS: str = Field(
+        default="",
+        description="Comma-separated channel account secrets used as transaction sources (empty = hot wallet only)"
+    )
+    STELLAR_CHANNEL_MIN_XLM: float = Field(default=5.0, description="Top up a channel below this XLM balance")
+    STELLAR_CHANNEL_TOP_UP_XLM: float = Field(default=20.0, description="XLM sent from the hot wallet per top-up")
+    STELLAR_CHANNEL_LEASE_TIMEOUT: float = Field(default=30.0, description="Max seconds to wait for a free channel")
+    STELLAR_CHANNEL_TOP_UP_RETRY: float = Field(
+        default=30.0,
+        description="Seconds before retrying a failed top-up of a channel that cannot pay fees (doubles, up to 10x)"
+    )
+    STELLAR_CHANNEL_WORKER_INDEX: int = Field(
+        default=0,
+        description="This process's slot among processes sharing STELLAR_CHANNEL_SECRETS (distinct per replica/worker)"
+    )
+    STELLAR_CHANNEL_WORKER_COUNT: int = Field(
+        default=1,
+        description="Processes sharing STELLAR_CHANNEL_SECRETS; each uses every N-th channel from its index"
+    )
+
+    # Payment Batching (app.services.stellar_batcher)
+    STELLAR_BATCH_MAX_OPS: int = Field(default=100, description="Payments per batched transaction (max 100)")
+    STELLAR_BATCH_WINDOW: float = Field(
+        default=0.25,
+        description="Seconds a queued payment waits for others to share its transaction"
+    )
+
+    # Submission Pipeline (app.services.stellar_submission)
+    STELLAR_SUBMIT_CONCURRENCY: int = Field(default=10, description="Max submissions in flight at once")
+    STELLAR_SUBMIT_POLL_INTERVAL: float = Field(
+        default=2.0,
+        description="Seconds between transaction lookups while a timed-out submission is unresolved"
+    )
+    STELLAR_SUBMIT_EXPIRY_MARGIN: float = Field(
+        default=10.0,
+        description="Seconds past a transaction's max_time before it is treated as expired (ledger close lag)"
+    )
+    STELLAR_SUBMIT_MAX_ATTEMPTS: int = Field(
+        default=3,
+        description="Transactions built per payment intent (each only after the previous one expired)"
+    )
+    STELLAR_SUBMIT_CLAIM_TIMEOUT: float = Field(
+        default=60.0,
+        description="Seconds before another process may take over a submission claimed but not yet submitted"
+    )
+
+    # Account Snapshot Cache (StellarService.get_account_snapshot)
+    STELLAR_SNAPSHOT_TTL: float = Field(default=5.0, description="Seconds an account snapshot is reused")
+    STELLAR_SNAPSHOT_MAX_ENTRIES: int = Field(default=10000, description="Max cached account snapshots")
+
+    # Balance Streaming (app.services.stellar_stream)
+    STELLAR_STREAM_ENABLED: bool = Field(
+        default=False,
+        description="Keep watched account snapshots current from the Horizon effects stream"
+    )
+    STELLAR_STREAM_SNAPSHOT_TTL: float = Field(
+        default=300.0,
+        description="Seconds a snapshot of a streamed account is reused (bounds drift from unseen fees)"
+    )
+    STELLAR_STREAM_CURSOR_FLUSH_INTERVAL: float = Field(
+        default=5.0,
+        description="Seconds between persisting the stream cursor to Redis"
+    )
+    STELLAR_STREAM_MAX_BACKOFF: float = Field(default=30.0, description="Max seconds between stream reconnects")
+
+    # Horizon HTTP Client (app.integrations.horizon_client)
+    STELLAR_HTTP_POOL_SIZE: int = Field(default=20, description="Max concurrent connections to Horizon")
+    STELLAR_HTTP_KEEPALIVE: int = Field(default=10, description="Idle Horizon connections kept for reuse")
+    STELLAR_HTTP_KEEPALIVE_EXPIRY: float = Field(default=30.0, description="Seconds an idle connection stays open")
+    STELLAR_HTTP_CONNECT_TIMEOUT: float = Field(default=5.0, description="Horizon connect/pool timeout (seconds)")
+    STELLAR_HTTP_REQUEST_TIMEOUT: float = Field(default=10.0, description="Horizon GET read timeout (seconds)")
+    STELLAR_HTTP_POST_TIMEOUT: float = Field(
+        default=35.0,
+        description="Horizon POST read timeout (seconds); Horizon itself times out submissions at 30s"
+    )
+    STELLAR_HTTP2: bool = Field(default=True, description="Use HTTP/2 for Horizon when h2 is installed")
+    STELLAR_HTTP_RATE_LIMIT: Optional[float] = Field(
+        default=None,
+        description=(
+            "Horizon requests per second per host and process, submissions excepted; "
+            "0 = unlimited (default: STELLAR_HTTP_RATE_BUDGET split across STELLAR_HTTP_RATE_PROCESSES)"
+        )
+    )
+    STELLAR_HTTP_RATE_BUDGET: int = Field(
+        default=3600,
+        description="Horizon requests per hour per client IP (SDF's public instances allow 3600)"
+    )
+    STELLAR_HTTP_RATE_PROCESSES: int = Field(
+        default=1,
+        description="Processes sharing one egress IP to Horizon (replicas x workers)"
+    )
+    STELLAR_HTTP_RATE_BURST: int = Field(default=20, description="Horizon requests allowed back to back")
+    STELLAR_HTTP_RATE_MAX_WAIT: float = Field(
+        default=5.0,
+        description="Seconds a Horizon request may wait for the rate limit before failing"
+    )
+    STELLAR_BULK_CONCURRENCY: int = Field(
+        default=10,
+        description="Concurrent Horizon requests for bulk balance lookups (get_balances_many)"
+    )
+    STELLAR_STREAM_IDLE_TIMEOUT: float = Field(
+        default=60.0,
+        description="Reconnect a Horizon stream after this many seconds without data"
+    )
+
     # Circle API Configuration (USD → USDC)
     CIRCLE_API_KEY: Optional[str] = Field(default=None, description="Circle API key")
     CIRCLE_ACCOUNT_ID: Optional[str] = Field(default=None, description="Circle account ID")
@@ -88,9 +333,19 @@ class Settings(BaseSettings):
     SENTRY_DSN: Optional[str] = Field(default=None, description="Sentry DSN for error tracking")
     SENTRY_ENVIRONMENT: str = Field(default="development", description="Sentry environment tag")
 
+    # Metrics endpoint (internal)
+    METRICS_TOKEN: Optional[str] = Field(
+        default=None,
+        description="Bearer token required by /metrics (unset = endpoint disabled)"
+    )
+
     # Telegram Bot (Alerts)
     TELEGRAM_BOT_TOKEN: Optional[str] = Field(default=None, description="Telegram bot token")
     TELEGRAM_CHAT_ID: Optional[str] = Field(default=None, description="Telegram chat ID for alerts")
+    TELEGRAM_API_URL: str = Field(
+        default="https://api.telegram.org",
+        description="Telegram Bot API base URL (point at a stand-in for testing)"
+    )
 
     # Rate Limiting
     RATE_LIMIT_PER_MINUTE: int = Field(default=60, description="Max requests per minute")
@@ -100,6 +355,19 @@ class Settings(BaseSettings):
     HOT_WALLET_MIN_BALANCE: int = Field(default=20000, description="Minimum hot wallet balance ($)")
     HOT_WALLET_MAX_BALANCE: int = Field(default=100000, description="Maximum hot wallet balance ($)")
     HOT_WALLET_ALERT_THRESHOLD: float = Field(default=0.3, description="Alert at 30% capacity")
+    HOT_WALLET_ALERT_HYSTERESIS: float = Field(
+        default=0.02,
+        description="Fraction of HOT_WALLET_MAX_BALANCE a balance must clear a threshold by before the level changes back"
+    )
+    HOT_WALLET_MIN_XLM: float = Field(default=100.0, description="Alert when hot wallet XLM (fees, top-ups) drops below this")
+    HOT_WALLET_MONITOR_ENABLED: Optional[bool] = Field(
+        default=None,
+        description="Run the hot wallet balance monitor (default: only when TELEGRAM_BOT_TOKEN is set)"
+    )
+    HOT_WALLET_MONITOR_INTERVAL: float = Field(
+        default=15.0,
+        description="Seconds between hot wallet balance checks (served from the snapshot cache when streamed)"
+    )
 
     # KYC Limits (USDC)
     KYC_PENDING_DAILY_LIMIT: int = Field(default=100, description="Daily limit for non-KYC users")
@@ -144,6 +412,15 @@ class Settings(BaseSettings):
             raise ValueError(f"STELLAR_NETWORK must be one of {allowed}")
         return v
 
+    @field_validator("REDIS_MODE")
+    @classmethod
+    def validate_redis_mode(cls, v):
+        """Validate Redis topology"""
+        allowed = ["standalone", "sentinel", "cluster"]
+        if v not in allowed:
+            raise ValueError(f"REDIS_MODE must be one of {allowed}")
+        return v
+
     @field_validator("JWT_ALGORITHM")
     @classmethod
     def validate_jwt_algorithm(cls, v):
@@ -165,6 +442,41 @@ class Settings(BaseSettings):
             return [ft.strip() for ft in self.ALLOWED_FILE_TYPES.split(",") if ft.strip()]
         return self.ALLOWED_FILE_TYPES
 
+    def get_stellar_channel_secrets(self) -> List[str]:
+        """Parse STELLAR_CHANNEL_SECRETS"""
+        return [secret.strip() for secret in self.STELLAR_CHANNEL_SECRETS.split(",") if secret.strip()]
+
+    def get_stellar_http_rate_limit(self) -> float:
+        """This process's share of the Horizon request budget (requests per second)"""
+        if self.STELLAR_HTTP_RATE_LIMIT is not None:
+            return self.STELLAR_HTTP_RATE_LIMIT
+        return self.STELLAR_HTTP_RATE_BUDGET / 3600 / max(self.STELLAR_HTTP_RATE_PROCESSES, 1)
+
+    def is_hot_wallet_monitor_enabled(self) -> bool:
+        """HOT_WALLET_MONITOR_ENABLED, defaulting to on only when alerts can reach Telegram"""
+        if self.HOT_WALLET_MONITOR_ENABLED is not None:
+            return self.HOT_WALLET_MONITOR_ENABLED
+        return bool(self.TELEGRAM_BOT_TOKEN and self.TELEGRAM_CHAT_ID)
+
+    def get_stellar_horizon_urls(self) -> List[str]:
+        """STELLAR_HORIZON_URL followed by STELLAR_HORIZON_URLS, without duplicates"""
+        urls = []
+        for url in [self.STELLAR_HORIZON_URL, *self.STELLAR_HORIZON_URLS.split(",")]:
+            url = url.strip().rstrip("/")
+            if url and url not in urls:
+                urls.append(url)
+        return urls
+
+    def get_redis_sentinels(self) -> List[tuple]:
+        """Parse REDIS_SENTINELS into (host, port) pairs"""
+        sentinels = []
+        for entry in (self.REDIS_SENTINELS or "").split(","):
+            entry = entry.strip()
+            if entry:
+                host, _, port = entry.rpartition(":")
+                sentinels.append((host, int(port)))
+        return sentinels
+
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
@@ -4,7 +4,7 @@ PostgreSQL connection via Supabase with SQLAlchemy
 """
 
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
-from sqlalchemy.orm import declarative_base
+from sqlalchemy.orm import DeclarativeBase
 from sqlalchemy.pool import NullPool
 from sqlalchemy import text
 from typing import AsyncGenerator
@@ -24,7 +24,8 @@ if sys.platform == 'win32':
 logger = logging.getLogger(__name__)
 
 # Create SQLAlchemy Base for models
-Base = declarative_base()
+class Base(DeclarativeBase):
+    pass
 
 # Global variables for engine and session factory (lazy initialization)
 engine = None
@@ -106,6 +107,8 @@ async def init_db():
             # Import all models here to ensure they're registered
             # Import user model
             from app.models import user  # noqa: F401
+            from app.models import transfer_volume  # noqa: F401
+            from app.models import stellar_submission  # noqa: F401
 
             # Create tables (for development only, use Alembic in production)
             if settings.DEBUG:
@@ -0,0 +1,310 @@
+"""
+Wani - Distributed Lock
+Redis mutex with auto-renewal and fencing tokens for multi-worker processing
+
+    lock:{resource}         -> owner token, PX ttl (SET NX semantics)
+    fence:lock:{resource}   -> integer, INCR'd on every successful acquisition
+                               (no TTL)
+
+Both keys share the {resource} hash tag, so the acquire script's two keys
+live in one Redis Cluster slot.
+
+A lock alone cannot protect a write: a worker that stalls (GC pause, slow
+network) past its TTL may still believe it holds the lock after another
+worker took over. Each acquisition therefore also returns a fencing token
+that only ever grows. Writes guarded by the lock carry the token and the
+database rejects any token lower than the last one it accepted (see
+fenced_update()).
+
+The fence counter never expires: one that restarted at 1 would issue
+tokens that rows fenced before reject. That costs one small key per
+resource ever locked, and Redis must not evict it (volatile-* maxmemory
+policies only evict keys with a TTL).
+"""
+
+import asyncio
+import logging
+import random
+import time
+import uuid
+from typing import Any, Optional
+
+from sqlalchemy import or_
+from sqlalchemy.sql import Update
+
+from app.core.cache import get_transaction_lock_key, register_script, release_lock_script
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Acquire atomically: take the lock and, only if taken, issue the next fence
+_acquire_script = register_script(
+    "lock_acquire",
+    """
+if redis.call("set", KEYS[1], ARGV[1], "NX", "PX", ARGV[2]) then
+    return redis.call("incr", KEYS[2])
+end
+return 0
+""",
+)
+
+# Extend the TTL only if we still own the lock
+_renew_script = register_script(
+    "lock_renew",
+    """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("pexpire", KEYS[1], ARGV[2])
+end
+return 0
+""",
+)
+
+# Wait-time buckets (milliseconds)
+_WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+class LockError(Exception):
+    """Base exception for distributed lock errors"""
+
+    pass
+
+
+class LockAcquireTimeout(LockError):
+    """Raised when the lock could not be acquired within the wait timeout"""
+
+    pass
+
+
+class LockLostError(LockError):
+    """Raised when ownership was lost (expired or taken) while held"""
+
+    pass
+
+
+def get_fence_key(lock_key: str) -> str:
+    """Generate Redis key holding the fencing counter for a lock"""
+    return f"fence:{lock_key}"
+
+
+class DistributedLock:
+    """
+    Async context manager around a Redis lock
+
+    Args:
+        key: Lock key (e.g. get_transaction_lock_key(tx_id))
+        ttl: Lock lifetime in seconds; renewed by the watchdog while held
+        wait_timeout: Max seconds to wait for the lock (0 = try once)
+        auto_renew: Run the watchdog that extends the TTL every ttl/3
+        name: Metrics label (defaults to the key prefix, e.g. "transaction")
+
+    Usage:
+        async with DistributedLock(get_transaction_lock_key(tx_id)) as lock:
+            ...
+            lock.ensure_held()
+            await db.execute(fenced_update(stmt, Transaction.lock_fence, lock.fence))
+    """
+
+    def __init__(
+        self,
+        key: str,
+        ttl: Optional[float] = None,
+        wait_timeout: Optional[float] = None,
+        auto_renew: bool = True,
+        name: Optional[str] = None,
+    ):
+        self.key = key
+        self.ttl = ttl if ttl is not None else settings.LOCK_TTL
+        self.wait_timeout = wait_timeout if wait_timeout is not None else settings.LOCK_WAIT_TIMEOUT
+        self.auto_renew = auto_renew
+        self.name = name or key.split(":")[1 if key.startswith("lock:") else 0].strip("{}")
+
+        self.token = uuid.uuid4().hex
+        self.fence: Optional[int] = None
+        self.lost = False
+
+        self._acquired_at = 0.0
+        self._watchdog: Optional[asyncio.Task] = None
+
+    @property
+    def _ttl_ms(self) -> int:
+        return max(int(self.ttl * 1000), 1)
+
+    async def _try_acquire(self) -> Optional[int]:
+        fence = await _acquire_script(
+            keys=[self.key, get_fence_key(self.key)],
+            args=[self.token, self._ttl_ms],
+        )
+        return int(fence) or None
+
+    async def acquire(self) -> int:
+        """
+        Acquire the lock, retrying with jittered exponential backoff
+
+        Returns:
+            The fencing token for this acquisition
+
+        Raises:
+            LockAcquireTimeout: Lock still held by someone else at the deadline
+            CircuitOpenError / redis errors: Redis unavailable
+        """
+        start = time.monotonic()
+        deadline = start + self.wait_timeout
+        delay = settings.LOCK_RETRY_BASE_DELAY
+        attempts = 0
+
+        while True:
+            attempts += 1
+            fence = await self._try_acquire()
+            if fence is not None:
+                break
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                metrics.increment("lock_acquire_total", lock=self.name, result="timeout")
+                metrics.observe(
+                    "lock_wait_ms",
+                    (time.monotonic() - start) * 1000,
+                    _WAIT_BUCKETS_MS,
+                    lock=self.name,
+                )
+                raise LockAcquireTimeout(
+                    f"Could not acquire '{self.key}' within {self.wait_timeout}s ({attempts} attempts)"
+                )
+
+            # Full jitter: spreads retries so waiters do not wake in lockstep
+            metrics.increment("lock_contention_total", lock=self.name)
+            await asyncio.sleep(min(random.uniform(0, delay), remaining))
+            delay = min(delay * 2, settings.LOCK_RETRY_MAX_DELAY)
+
+        self.fence = fence
+        self.lost = False
+        self._acquired_at = time.monotonic()
+
+        metrics.increment("lock_acquire_total", lock=self.name, result="acquired")
+        metrics.observe(
+            "lock_wait_ms", (self._acquired_at - start) * 1000, _WAIT_BUCKETS_MS, lock=self.name
+        )
+
+        if self.auto_renew:
+            self._watchdog = asyncio.create_task(self._renew_loop())
+
+        return fence
+
+    async def _renew_loop(self) -> None:
+        """Extend the TTL every ttl/3 until released or ownership is lost"""
+        interval = self.ttl / 3
+        renewed_at = self._acquired_at
+        while True:
+            await asyncio.sleep(interval)
+            attempted_at = time.monotonic()
+            try:
+                renewed = await _renew_script(keys=[self.key], args=[self.token, self._ttl_ms])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if time.monotonic() - renewed_at < self.ttl:
+                    # Keep trying: the lock is still ours until the TTL runs out
+                    logger.warning(f"Lock renew error for '{self.key}': {e}")
+                    continue
+                # Not renewed within a TTL: it has expired, someone else may hold it
+                logger.error(f"Lock renew error for '{self.key}' past its TTL: {e}")
+                renewed = 0
+
+            if not renewed:
+                self.lost = True
+                metrics.increment("lock_lost_total", lock=self.name)
+                logger.error(f"Lock '{self.key}' lost (fence {self.fence})")
+                return
+            renewed_at = attempted_at
+
+    async def release(self) -> bool:
+        """
+        Release the lock if still owned
+
+        Returns:
+            True if this call deleted the lock, False if it had already
+            expired or been taken over
+        """
+        if self._watchdog is not None:
+            self._watchdog.cancel()
+            try:
+                await self._watchdog
+            except asyncio.CancelledError:
+                pass
+            self._watchdog = None
+
+        if self.fence is None:
+            return False
+
+        metrics.observe(
+            "lock_hold_ms",
+            (time.monotonic() - self._acquired_at) * 1000,
+            _WAIT_BUCKETS_MS,
+            lock=self.name,
+        )
+
+        try:
+            released = bool(await release_lock_script(keys=[self.key], args=[self.token]))
+        except Exception as e:
+            # The TTL will free it; nothing else to do
+            logger.error(f"Lock release error for '{self.key}': {e}")
+            released = False
+
+        if not released and not self.lost:
+            self.lost = True
+            metrics.increment("lock_lost_total", lock=self.name)
+            logger.warning(f"Lock '{self.key}' expired before release (fence {self.fence})")
+
+        self.fence = None
+        return released
+
+    def ensure_held(self) -> None:
+        """
+        Raise if the watchdog detected that ownership was lost
+
+        Cheap local check before a side effect. It does not replace the
+        fencing token check in the database.
+        """
+        if self.lost:
+            raise LockLostError(f"Lock '{self.key}' is no longer held")
+
+    async def __aenter__(self) -> "DistributedLock":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.release()
+
+
+def transaction_lock(transaction_id: str, **kwargs: Any) -> DistributedLock:
+    """
+    Lock a transaction for processing
+
+    Usage:
+        async with transaction_lock(str(tx.id)) as lock:
+            ...
+    """
+    return DistributedLock(get_transaction_lock_key(transaction_id), name="transaction", **kwargs)
+
+
+def fenced_update(stmt: Update, fence_column: Any, fence: int) -> Update:
+    """
+    Make an UPDATE conditional on the fencing token
+
+    The row is only updated if its stored fence is NULL or not greater
+    than `fence`, and the new fence is written with it. Once a newer holder
+    has written, a stale holder's write matches zero rows; check
+    `result.rowcount`.
+
+    Args:
+        stmt: update(Model).where(...).values(...)
+        fence_column: Integer column storing the last accepted fence
+        fence: lock.fence of the current holder
+
+    Returns:
+        The guarded statement
+    """
+    return stmt.where(or_(fence_column.is_(None), fence_column <= fence)).values(
+        {fence_column.key: fence}
+    )
@@ -0,0 +1,98 @@
+"""
+Wani - In-Process Cache
+Bounded TTL + LRU cache used as the first tier in front of Redis
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+# Sentinel returned on a miss, so that falsy values can be cached
+MISSING: Any = object()
+
+
+class LocalCache:
+    """
+    Size-bounded TTL cache with least-recently-used eviction
+
+    - get() moves the entry to the most-recently-used end
+    - set() evicts the least recently used entry once max_entries is reached
+    - expired entries are dropped lazily on access
+
+    Not thread-safe; intended for use from a single event loop.
+    """
+
+    def __init__(self, max_entries: int = 10000, default_ttl: float = 30.0):
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive")
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        """
+        Get a value if present and not expired
+
+        Args:
+            key: Cache key
+            default: Value returned on a miss (default: MISSING)
+
+        Returns:
+            Cached value, or `default` if missing/expired
+        """
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return default
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Store a value
+
+        Args:
+            key: Cache key
+            value: Value to store
+            ttl: Time to live in seconds (default: default_ttl)
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl <= 0:
+            self._data.pop(key, None)
+            return
+
+        if key in self._data:
+            self._data.move_to_end(key)
+        self._data[key] = (time.monotonic() + ttl, value)
+
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def ttl(self, key: Hashable) -> Optional[float]:
+        """Remaining time to live in seconds, or None if missing/expired"""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        remaining = entry[0] - time.monotonic()
+        return remaining if remaining > 0 else None
+
+    def delete(self, key: Hashable) -> bool:
+        """Remove a key; returns True if it was present"""
+        return self._data.pop(key, None) is not None
+
+    def clear(self) -> None:
+        """Remove all entries"""
+        self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key) is not MISSING
+
+    def __len__(self) -> int:
+        return len(self._data)
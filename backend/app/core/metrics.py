@@ -0,0 +1,166 @@
+"""
+Wani - In-Process Metrics
+Lightweight counters, gauges and histograms exposed via the /metrics endpoint
+"""
+
+import bisect
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+# Default latency buckets in milliseconds
+DEFAULT_BUCKETS_MS: Tuple[float, ...] = (
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    25,
+    50,
+    100,
+    250,
+    500,
+    1000,
+    2500,
+    5000,
+    10000,
+)
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    """Normalize labels into a hashable, order-independent key"""
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey) -> str:
+    """Render labels as `a=1,b=2` (empty string when there are none)"""
+    return ",".join(f"{k}={v}" for k, v in key)
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram
+
+    Keeps bucket counts plus count/sum; percentiles are estimated from
+    the bucket upper bounds, which is enough for dashboards and alerts.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS_MS):
+        self.buckets: List[float] = sorted(buckets)
+        self.counts: List[int] = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        """Record a single observation"""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q: float) -> float:
+        """Estimate the q-th percentile (0-100) from bucket upper bounds"""
+        if self.count == 0:
+            return 0.0
+        target = self.count * q / 100
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= target:
+                return self.buckets[i] if i < len(self.buckets) else self.max
+        return self.max
+
+    def to_dict(self) -> Dict[str, float]:
+        """Summary used by snapshot()"""
+        return {
+            "count": self.count,
+            "sum": round(self.total, 3),
+            "avg": round(self.total / self.count, 3) if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": round(self.max, 3),
+        }
+
+
+class MetricsRegistry:
+    """
+    Process-local metrics registry
+
+    All mutation happens on the event loop thread, so no locking is needed.
+    Metrics are per worker process; aggregate across workers upstream.
+    """
+
+    def __init__(self):
+        self.counters: Dict[str, Dict[LabelKey, float]] = {}
+        self.gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self.histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self.collectors: Dict[str, Callable[[], Dict]] = {}
+
+    def increment(self, name: str, amount: float = 1, **labels) -> None:
+        """Increase a counter"""
+        series = self.counters.setdefault(name, {})
+        key = _label_key(labels)
+        series[key] = series.get(key, 0) + amount
+
+    def set_gauge(self, name: str, value: float, **labels) -> None:
+        """Set a gauge to an absolute value"""
+        self.gauges.setdefault(name, {})[_label_key(labels)] = value
+
+    def observe(
+        self,
+        name: str,
+        value: float,
+        buckets: Optional[Sequence[float]] = None,
+        **labels,
+    ) -> None:
+        """Record a histogram observation"""
+        series = self.histograms.setdefault(name, {})
+        key = _label_key(labels)
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = Histogram(buckets or DEFAULT_BUCKETS_MS)
+        histogram.observe(value)
+
+    def get_counter(self, name: str, **labels) -> float:
+        """Read a counter value (0 if never incremented)"""
+        return self.counters.get(name, {}).get(_label_key(labels), 0)
+
+    def register_collector(self, name: str, collector: Callable[[], Dict]) -> None:
+        """
+        Register a callable whose result is included in snapshot()
+
+        Used for derived values (hit ratios, breaker state) that are
+        cheaper to compute on read than to maintain on every call.
+        """
+        self.collectors[name] = collector
+
+    def snapshot(self) -> Dict:
+        """Return all metrics as a JSON-serializable dict"""
+        return {
+            "counters": {
+                name: {_format_labels(k): v for k, v in series.items()}
+                for name, series in self.counters.items()
+            },
+            "gauges": {
+                name: {_format_labels(k): v for k, v in series.items()}
+                for name, series in self.gauges.items()
+            },
+            "histograms": {
+                name: {_format_labels(k): h.to_dict() for k, h in series.items()}
+                for name, series in self.histograms.items()
+            },
+            **{name: collector() for name, collector in self.collectors.items()},
+        }
+
+    def reset(self) -> None:
+        """Clear all recorded values (collectors are kept)"""
+        self.counters.clear()
+        self.gauges.clear()
+        self.histograms.clear()
+
+
+# Global registry instance
+metrics = MetricsRegistry()
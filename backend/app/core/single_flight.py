@@ -0,0 +1,68 @@
+"""
+Wani - Single-Flight
+Coalesce concurrent calls for the same key into one in-flight execution
+"""
+
+import asyncio
+import functools
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    In-process request coalescing
+
+    The first caller for a key starts the work; callers arriving while it
+    is in flight await the same result (or exception). The work runs in
+    its own task, so cancelling one waiter does not cancel it for the others.
+
+    Usage:
+        flight = SingleFlight()
+        value = await flight.do(key, lambda: load_value(key))
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, "asyncio.Task[Any]"] = {}
+
+    def in_flight(self, key: Hashable) -> bool:
+        """True if work for `key` is currently running"""
+        return key in self._calls
+
+    def start(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> "asyncio.Task[T]":
+        """
+        Start work for `key` unless already running, without waiting for it
+
+        Returns:
+            The task executing the work (new or existing)
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(functools.partial(self._forget, key))
+        return task
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run `fn` once for all concurrent callers of `key`
+
+        Args:
+            key: Coalescing key
+            fn: Zero-argument coroutine function producing the value
+
+        Returns:
+            The value produced by the single execution
+        """
+        return await asyncio.shield(self.start(key, fn))
+
+    def _forget(self, key: Hashable, task: "asyncio.Task[Any]") -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the exception as retrieved when every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def __len__(self) -> int:
+        return len(self._calls)
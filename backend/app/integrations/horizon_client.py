@@ -0,0 +1,601 @@
+"""
+Wani - Horizon HTTP Client
+Pooled async HTTP client for stellar-sdk's ServerAsync, built on httpx
+
+stellar-sdk ships an aiohttp client; this one uses httpx (already a
+dependency) so Horizon traffic gets:
+- one shared connection pool with keep-alive across all requests
+- HTTP/2 multiplexing when the `h2` package is installed
+- separate connect/read/pool timeouts, and a longer one for submissions
+- a per-host token bucket matching Horizon's request rate limit (not
+  applied to transaction submissions)
+- a Server-Sent Events reader that resumes from the last event id
+- optional routing across several Horizon instances (horizon_pool)
+"""
+
+import asyncio
+import json
+import logging
+import time
+from typing import Any, AsyncGenerator, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+from stellar_sdk.__version__ import __version__ as stellar_sdk_version
+from stellar_sdk.client.base_async_client import BaseAsyncClient
+from stellar_sdk.client.response import Response
+from stellar_sdk.exceptions import BadRequestError, ConnectionError, StreamClientError
+from stellar_sdk.xdr import OperationResult, OperationResultCode, TransactionResult
+
+from app.core.config import settings
+from app.integrations.horizon_pool import HorizonEndpoint, HorizonEndpointPool
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401  (enables httpx HTTP/2 support)
+
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+IDENTIFICATION_HEADERS = {
+    "X-Client-Name": "py-stellar-base",
+    "X-Client-Version": stellar_sdk_version,
+}
+
+# Horizon greets and closes streams with these non-JSON-object payloads
+_STREAM_CONTROL_MESSAGES = ('"hello"', '"byebye"')
+
+
+class HorizonStreamError(StreamClientError):
+    """StreamClientError that keeps the HTTP status Horizon answered with"""
+
+    def __init__(self, current_cursor: str, message: str, status_code: int):
+        super().__init__(current_cursor, message)
+        self.status_code = status_code
+
+
+class HorizonRateLimitError(ConnectionError):
+    """A request would wait longer than allowed for the local rate limit (not sent)"""
+
+    pass
+
+
+class HostRateLimiter:
+    """
+    Token bucket per host, shared by every request through the client
+
+    Horizon limits requests per client IP (SDF's public instances allow
+    3600 per hour) and answers 429 beyond that. Spending tokens locally
+    spreads bulk work out instead of tripping the limit. Horizon's
+    X-Ratelimit-* headers and Retry-After additionally pause the host
+    until its window resets.
+
+    Each request reserves its token up front (the bucket may go into
+    debt) and then sleeps off its own wait, so waiters keep their order
+    without holding anything while they sleep, and a throttled host
+    never delays requests to other hosts. The debt is bounded: a request
+    that would wait more than `max_wait` takes no token and fails with
+    HorizonRateLimitError, so sustained overload surfaces as errors
+    instead of ever-growing latency.
+
+    The bucket is per process while Horizon counts per IP: the default
+    rate is the budget split across the processes sharing an IP (see
+    Settings.get_stellar_http_rate_limit).
+
+    Args:
+        rate: Requests per second per host (0 = unlimited)
+        burst: Requests allowed back to back before throttling
+        max_wait: Seconds a request may wait for its token
+    """
+
+    def __init__(self, rate: float, burst: int, max_wait: float):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.max_wait = max_wait
+        # host -> [tokens, updated_at, paused_until]
+        self._buckets: Dict[str, List[float]] = {}
+
+    def _bucket(self, host: str) -> List[float]:
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = [float(self.burst), time.monotonic(), 0.0]
+        return bucket
+
+    def _reserve(self, host: str) -> float:
+        """
+        Take a token for `host`; seconds until it may be used
+
+        Raises:
+            HorizonRateLimitError: The wait would exceed max_wait (no token taken)
+        """
+        # No await in here: on the event loop this is atomic per bucket
+        bucket = self._bucket(host)
+        now = time.monotonic()
+        bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+        tokens = bucket[0] - 1
+        wait = max(-tokens / self.rate if tokens < 0 else 0.0, bucket[2] - now)
+        if wait > self.max_wait:
+            raise HorizonRateLimitError(
+                f"Horizon rate limit for {host}: request would wait {wait:.1f}s "
+                f"(max {self.max_wait}s)"
+            )
+        bucket[0] = tokens
+        return wait
+
+    async def acquire(self, url: str) -> None:
+        """
+        Wait until a request to url's host is allowed
+
+        Raises:
+            HorizonRateLimitError: The host is saturated for longer than max_wait
+        """
+        if self.rate <= 0:
+            return
+        host = urlsplit(url).netloc
+        wait = self._reserve(host)
+        deadline = time.monotonic() + self.max_wait
+        while wait > 0:
+            await asyncio.sleep(wait)
+            # The host may have been paused (429) while this request waited
+            paused_until = self._bucket(host)[2]
+            if paused_until > deadline:
+                raise HorizonRateLimitError(
+                    f"Horizon rate limit for {host}: paused beyond max wait ({self.max_wait}s)"
+                )
+            wait = paused_until - time.monotonic()
+
+    def observe(self, url: str, response: httpx.Response) -> None:
+        """Pause the host if Horizon reports the limit as exhausted"""
+        if self.rate <= 0:
+            return
+
+        headers = response.headers
+        pause = None
+        if response.status_code == 429:
+            pause = (
+                _header_seconds(headers.get("Retry-After"))
+                or _header_seconds(headers.get("X-Ratelimit-Reset"))
+                or 1.0
+            )
+        elif headers.get("X-Ratelimit-Remaining") == "0":
+            pause = _header_seconds(headers.get("X-Ratelimit-Reset"))
+
+        if pause:
+            bucket = self._bucket(urlsplit(url).netloc)
+            bucket[0] = min(bucket[0], 0.0)
+            bucket[2] = max(bucket[2], time.monotonic() + pause)
+            logger.warning(
+                f"Horizon rate limit reached for {urlsplit(url).netloc}, pausing {pause}s"
+            )
+
+
+def _is_submission(method: str, url: str) -> bool:
+    """POST /transactions: exempt from the local rate limit"""
+    return method == "POST" and urlsplit(url).path.rstrip("/").endswith("/transactions")
+
+
+class TransactionFailedError(Exception):
+    """
+    A transaction whose submission timed out turned out to be in a ledger, failed
+
+    Carries the record's result codes in Horizon's submission format, so
+    callers handle it like the 400 a submission that did not time out
+    would have returned.
+    """
+
+    def __init__(self, record: Dict[str, Any]):
+        self.record = record
+        self.result_codes = transaction_result_codes(record)
+        super().__init__(
+            f"Transaction {record.get('hash')} failed in ledger {record.get('ledger')} "
+            f"({self.result_codes['transaction']})"
+        )
+
+
+def _operation_result_code(result: OperationResult) -> str:
+    """Horizon's name for an operation result, e.g. "op_underfunded" """
+    if result.code != OperationResultCode.opINNER:
+        name = result.code.name[2:].lower()
+        return "op_no_source_account" if name == "no_account" else f"op_{name}"
+    tr = result.tr
+    inner = next(value for field, value in vars(tr).items() if field != "type" and value)
+    name = inner.code.name
+    prefix = f"{tr.type.name}_"
+    return f"op_{(name[len(prefix):] if name.startswith(prefix) else name).lower()}"
+
+
+def transaction_result_codes(record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Result codes of a transaction record, as Horizon reports a rejected submission
+
+    Decoded from the record's result_xdr; a record without one is a plain
+    "tx_failed" with no operation codes.
+    """
+    if not record.get("result_xdr"):
+        return {"transaction": "tx_failed"}
+    result = TransactionResult.from_xdr(record["result_xdr"]).result
+    codes: Dict[str, Any] = {"transaction": f"tx_{result.code.name[2:].lower()}"}
+    results = result.results
+    if result.inner_result_pair is not None:
+        inner = result.inner_result_pair.result.result
+        codes["inner_transaction"] = f"tx_{inner.code.name[2:].lower()}"
+        results = inner.results
+    if results is not None:
+        codes["operations"] = [_operation_result_code(op) for op in results]
+    return codes
+
+
+def _result_codes(error: Exception) -> Dict[str, Any]:
+    if isinstance(error, TransactionFailedError):
+        return error.result_codes
+    if isinstance(error, BadRequestError):
+        return (error.extras or {}).get("result_codes") or {}
+    return {}
+
+
+def submission_result_code(error: Exception) -> Optional[str]:
+    """
+    Transaction result code of a rejected submission, e.g. "tx_bad_seq"
+
+    Returns:
+        The code, or None if Horizon did not report one (network error,
+        timeout, 5xx): the transaction may or may not have been applied
+    """
+    return _result_codes(error).get("transaction")
+
+
+def operation_result_codes(error: Exception) -> List[str]:
+    """Per-operation result codes of a rejected submission (empty if none)"""
+    return list(_result_codes(error).get("operations") or [])
+
+
+def _header_seconds(value: Optional[str]) -> Optional[float]:
+    try:
+        return max(float(value), 0.0) if value is not None else None
+    except ValueError:
+        return None
+
+
+class HttpxClient(BaseAsyncClient):
+    """
+    httpx-based implementation of stellar-sdk's BaseAsyncClient
+
+    Args:
+        pool_size: Max concurrent connections to Horizon
+        keepalive: Idle connections kept open for reuse
+        connect_timeout: Seconds to establish a connection
+        request_timeout: Seconds to read a GET response
+        post_timeout: Seconds to read a POST response (transaction submission)
+        http2: Negotiate HTTP/2 (ignored if `h2` is not installed)
+        rate_limit: Requests per second per host (0 = unlimited)
+        endpoints: Route Horizon requests across these instances; URLs must
+                   be built on the pool's first endpoint
+
+    Usage:
+        client = HttpxClient()
+        server = ServerAsync(settings.STELLAR_HORIZON_URL, client=client)
+        ...
+        await client.close()
+    """
+
+    def __init__(
+        self,
+        pool_size: Optional[int] = None,
+        keepalive: Optional[int] = None,
+        connect_timeout: Optional[float] = None,
+        request_timeout: Optional[float] = None,
+        post_timeout: Optional[float] = None,
+        http2: Optional[bool] = None,
+        rate_limit: Optional[float] = None,
+        endpoints: Optional[HorizonEndpointPool] = None,
+    ):
+        self.pool_size = pool_size or settings.STELLAR_HTTP_POOL_SIZE
+        self.keepalive = keepalive or settings.STELLAR_HTTP_KEEPALIVE
+        self.connect_timeout = connect_timeout or settings.STELLAR_HTTP_CONNECT_TIMEOUT
+        self.request_timeout = request_timeout or settings.STELLAR_HTTP_REQUEST_TIMEOUT
+        self.post_timeout = post_timeout or settings.STELLAR_HTTP_POST_TIMEOUT
+        self.http2 = (settings.STELLAR_HTTP2 if http2 is None else http2) and HTTP2_AVAILABLE
+        self.rate_limiter = HostRateLimiter(
+            settings.get_stellar_http_rate_limit() if rate_limit is None else rate_limit,
+            settings.STELLAR_HTTP_RATE_BURST,
+            settings.STELLAR_HTTP_RATE_MAX_WAIT,
+        )
+        self.endpoints = endpoints
+
+        self.headers = {
+            **IDENTIFICATION_HEADERS,
+            "User-Agent": f"wani/1.0 py-stellar-base/{stellar_sdk_version}",
+        }
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._stream_client: Optional[httpx.AsyncClient] = None
+
+    def _build(
+        self, read_timeout: Optional[float], pool_size: int, keepalive: int
+    ) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            http2=self.http2,
+            headers=self.headers,
+            limits=httpx.Limits(
+                max_connections=pool_size,
+                max_keepalive_connections=keepalive,
+                keepalive_expiry=settings.STELLAR_HTTP_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(
+                connect=self.connect_timeout,
+                read=read_timeout,
+                write=self.connect_timeout,
+                pool=self.connect_timeout,
+            ),
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Shared request client (created on first use)"""
+        if self._client is None or self._client.is_closed:
+            self._client = self._build(self.request_timeout, self.pool_size, self.keepalive)
+        return self._client
+
+    async def open(self) -> None:
+        """Create the connection pool up front (called on startup)"""
+        _ = self.client
+        logger.info(
+            f"Horizon HTTP client ready (pool: {self.pool_size}, "
+            f"keep-alive: {self.keepalive}, http2: {self.http2})"
+        )
+
+    async def get(self, url: str, params: Optional[Dict[str, str]] = None) -> Response:
+        """
+        Perform HTTP GET request
+
+        Raises:
+            stellar_sdk.exceptions.ConnectionError: network failure or timeout
+            HorizonRateLimitError: the local rate limit would wait too long
+        """
+        response = await self._send("GET", url, params=params)
+        return self._to_response(response)
+
+    async def post(
+        self,
+        url: str,
+        data: Optional[Dict[str, str]] = None,
+        json_data: Optional[Dict[str, Any]] = None,
+    ) -> Response:
+        """
+        Perform HTTP POST request (longer read timeout than GET)
+
+        Raises:
+            stellar_sdk.exceptions.ConnectionError: network failure or timeout
+        """
+        response = await self._send(
+            "POST",
+            url,
+            data=data,
+            json=json_data,
+            timeout=httpx.Timeout(
+                connect=self.connect_timeout,
+                read=self.post_timeout,
+                write=self.connect_timeout,
+                pool=self.connect_timeout,
+            ),
+        )
+        return self._to_response(response)
+
+    async def _request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        # Submissions are not throttled: they are few, already batched and
+        # spread over channels, and a late one risks expiring
+        if not _is_submission(method, url):
+            await self.rate_limiter.acquire(url)
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError as e:
+            raise ConnectionError(e) from e
+        self.rate_limiter.observe(url, response)
+        return response
+
+    async def _send(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        """
+        Send through the endpoint pool (if any)
+
+        GETs that fail (connection error, 5xx, 429) are retried on the next
+        endpoint; once every endpoint has failed, the last error is raised
+        (or the last response returned). POSTs are submissions and go to
+        one endpoint only - the pinned one inside HorizonEndpointPool.pinned().
+        """
+        if self.endpoints is None or not self.endpoints.routes(url):
+            return await self._request(method, url, **kwargs)
+
+        failover = method == "GET"
+        tried: List[HorizonEndpoint] = []
+        last_error: Optional[ConnectionError] = None
+        last_response: Optional[httpx.Response] = None
+        while True:
+            endpoint = self.endpoints.choose(exclude=tried)
+            if endpoint is None:
+                if last_response is not None:
+                    return last_response
+                raise last_error or ConnectionError(
+                    "No Horizon endpoint available (all circuit breakers open)"
+                )
+            tried.append(endpoint)
+
+            started = time.monotonic()
+            try:
+                response = await self._request(
+                    method, self.endpoints.resolve(url, endpoint), **kwargs
+                )
+            except HorizonRateLimitError as e:
+                # Throttled locally, never sent: says nothing about the endpoint
+                self.endpoints.release(endpoint)
+                if not failover:
+                    raise
+                last_error = e
+                continue
+            except ConnectionError as e:
+                self.endpoints.record(endpoint, ok=False)
+                if not failover:
+                    raise
+                logger.warning(f"Horizon endpoint {endpoint.url} failed ({e}), trying next")
+                last_error = e
+                continue
+            except BaseException:
+                self.endpoints.release(endpoint)
+                raise
+
+            # A 504 on submission means the transaction missed its ledger,
+            # not that the endpoint is broken
+            if response.status_code == 429 or (
+                response.status_code >= 500
+                and not (method == "POST" and response.status_code == 504)
+            ):
+                self.endpoints.record(endpoint, ok=False)
+                if not failover:
+                    return response
+                last_response = response
+                continue
+
+            # Only GETs feed the latency estimate: submissions wait for a ledger
+            self.endpoints.record(
+                endpoint, ok=True, seconds=time.monotonic() - started if failover else None
+            )
+            return response
+
+    async def stream(
+        self, url: str, params: Optional[Dict[str, str]] = None, reconnect: bool = True
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Yield Horizon Server-Sent Events as dicts, reconnecting as needed
+
+        The cursor follows the last event id, so a reconnect resumes where
+        the previous connection stopped. Connection drops and idle timeouts
+        reconnect after the server-advertised retry delay.
+
+        Args:
+            url: Stream endpoint
+            params: Query parameters (e.g. cursor)
+            reconnect: False to end the generator when the connection
+                       closes and raise ConnectionError when it fails, for
+                       callers that run their own reconnect loop
+
+        Raises:
+            HorizonStreamError: Horizon rejected the stream request (4xx/5xx)
+            stellar_sdk.exceptions.ConnectionError: stream failed (reconnect=False)
+        """
+        if self._stream_client is None or self._stream_client.is_closed:
+            # Streams are long-lived: one connection each, no read timeout
+            # beyond STELLAR_STREAM_IDLE_TIMEOUT (Horizon sends keep-alives)
+            self._stream_client = self._build(
+                settings.STELLAR_STREAM_IDLE_TIMEOUT, self.pool_size, 0
+            )
+
+        query_params = {**params} if params else {}
+        retry = 1.0
+        endpoints = self.endpoints
+
+        while True:
+            # Each (re)connect goes to the best endpoint at that moment; the
+            # cursor is a paging token, valid on every instance
+            endpoint = None
+            target = url
+            if endpoints is not None and endpoints.routes(url):
+                endpoint = endpoints.choose()
+                if endpoint is not None:
+                    target = endpoints.resolve(url, endpoint)
+            try:
+                async with self._stream_client.stream(
+                    "GET", target, params=query_params, headers={"Accept": "text/event-stream"}
+                ) as response:
+                    if endpoints is not None and endpoint is not None:
+                        endpoints.record(endpoint, ok=response.status_code < 500)
+                        endpoint = None
+                    if response.status_code >= 400:
+                        await response.aread()
+                        raise HorizonStreamError(
+                            query_params.get("cursor", ""),
+                            f"Failed to get stream message ({response.status_code}): {response.text}",
+                            response.status_code,
+                        )
+
+                    event_id = None
+                    data_lines: List[str] = []
+                    async for line in response.aiter_lines():
+                        if line == "":
+                            # Blank line dispatches the event
+                            if event_id:
+                                query_params["cursor"] = event_id
+                            data = "\n".join(data_lines)
+                            event_id, data_lines = None, []
+                            if data and data not in _STREAM_CONTROL_MESSAGES:
+                                try:
+                                    yield json.loads(data)
+                                except json.JSONDecodeError:
+                                    pass
+                            continue
+
+                        if line.startswith(":"):
+                            continue  # comment / keep-alive
+
+                        field, _, value = line.partition(":")
+                        value = value[1:] if value.startswith(" ") else value
+                        if field == "data":
+                            data_lines.append(value)
+                        elif field == "id":
+                            event_id = value
+                        elif field == "retry" and value.isdigit():
+                            retry = int(value) / 1000
+
+            except StreamClientError:
+                raise
+            except httpx.HTTPError as e:
+                if endpoints is not None and endpoint is not None:
+                    # Failed before the response arrived
+                    endpoints.record(endpoint, ok=False)
+                if not reconnect:
+                    raise ConnectionError(e) from e
+                logger.warning(
+                    f"Horizon stream interrupted ({type(e).__name__}), reconnecting in {retry}s, "
+                    f"cursor = {query_params.get('cursor')}"
+                )
+            except BaseException:
+                if endpoints is not None and endpoint is not None:
+                    endpoints.release(endpoint)
+                raise
+
+            if not reconnect:
+                return
+
+            # Server closed the stream (or it failed): resume from the cursor
+            await asyncio.sleep(retry)
+
+    @staticmethod
+    def _to_response(response: httpx.Response) -> Response:
+        return Response(
+            status_code=response.status_code,
+            text=response.text,
+            headers=dict(response.headers),
+            url=str(response.url),
+        )
+
+    async def close(self) -> None:
+        """Close all pooled connections"""
+        for client in (self._client, self._stream_client):
+            if client is not None:
+                await client.aclose()
+        self._client = None
+        self._stream_client = None
+
+    async def __aenter__(self) -> "HttpxClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.close()
+
+    def __str__(self) -> str:
+        return (
+            f"<HttpxClient [pool_size={self.pool_size}, keepalive={self.keepalive}, "
+            f"request_timeout={self.request_timeout}, post_timeout={self.post_timeout}, "
+            f"http2={self.http2}]>"
+        )
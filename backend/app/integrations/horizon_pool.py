@@ -0,0 +1,197 @@
+"""
+Wani - Horizon Endpoint Pool
+Latency-aware routing and failover across several Horizon instances
+
+ServerAsync builds every URL from STELLAR_HORIZON_URL. With
+STELLAR_HORIZON_URLS set, HttpxClient rewrites that prefix per request to
+the endpoint picked here:
+
+- each endpoint tracks an EWMA of its GET latency and has its own
+  CircuitBreaker (connection errors and 5xx count as failures)
+- requests go to the fastest endpoint whose breaker allows them;
+  endpoints without measurements are tried first, and a small share of
+  requests (STELLAR_HORIZON_EXPLORE_RATE) goes to a random healthy one
+  so a recovered endpoint gets measured again
+- a failed GET is retried on the next endpoint
+
+Submissions do not fail over. Instances can lag each other by a ledger
+or two, so everything about one transaction (submit, fee bumps, status
+lookups) goes to the endpoint it was pinned to:
+
+    with pool.pinned(transaction_hash):
+        await server.submit_transaction(envelope)
+
+Pins live for STELLAR_TX_TIMEOUT plus a minute. A pinned endpoint whose
+breaker is open is replaced; resending the same signed transaction
+elsewhere cannot apply it twice.
+"""
+
+import logging
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from app.core.circuit_breaker import CircuitBreaker
+from app.core.config import settings
+from app.core.local_cache import LocalCache
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Pin key of the transaction the current task is working on
+_current_pin: ContextVar[Optional[str]] = ContextVar("horizon_pin", default=None)
+
+
+class HorizonEndpoint:
+    """
+    One Horizon instance and its health
+
+    Args:
+        url: Base URL (no trailing slash)
+        breaker: Circuit breaker for this endpoint
+    """
+
+    def __init__(self, url: str, breaker: CircuitBreaker):
+        self.url = url
+        self.breaker = breaker
+        self.latency: Optional[float] = None  # EWMA, seconds
+        self.requests = 0
+        self.failures = 0
+
+    @property
+    def available(self) -> bool:
+        """Breaker not open (says nothing about half-open probe slots)"""
+        return self.breaker.state != CircuitBreaker.OPEN
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "url": self.url,
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "requests": self.requests,
+            "failures": self.failures,
+            "breaker": self.breaker.state,
+        }
+
+
+class HorizonEndpointPool:
+    """
+    Pick a Horizon endpoint per request
+
+    Args:
+        urls: Endpoint base URLs; the first is the one ServerAsync is built with
+        alpha: EWMA weight of the newest latency sample
+        explore_rate: Share of requests sent to a random healthy endpoint
+    """
+
+    def __init__(
+        self,
+        urls: Sequence[str],
+        alpha: Optional[float] = None,
+        explore_rate: Optional[float] = None,
+    ):
+        if not urls:
+            raise ValueError("HorizonEndpointPool needs at least one URL")
+        self.alpha = settings.STELLAR_HORIZON_EWMA_ALPHA if alpha is None else alpha
+        self.explore_rate = (
+            settings.STELLAR_HORIZON_EXPLORE_RATE if explore_rate is None else explore_rate
+        )
+        self.endpoints = [
+            HorizonEndpoint(
+                url.rstrip("/"),
+                CircuitBreaker(
+                    f"horizon:{url.rstrip('/')}",
+                    failure_threshold=settings.STELLAR_HORIZON_BREAKER_FAILURES,
+                    recovery_timeout=settings.STELLAR_HORIZON_BREAKER_RECOVERY,
+                ),
+            )
+            for url in urls
+        ]
+        self.primary = self.endpoints[0].url
+        self._pins = LocalCache(max_entries=10000, default_ttl=settings.STELLAR_TX_TIMEOUT + 60)
+
+    def routes(self, url: str) -> bool:
+        """Whether a URL is a Horizon URL this pool routes"""
+        return url.startswith(self.primary)
+
+    def resolve(self, url: str, endpoint: HorizonEndpoint) -> str:
+        """A routed URL rewritten onto `endpoint`"""
+        return endpoint.url + url[len(self.primary) :]
+
+    def _ranked(self, exclude: Sequence[HorizonEndpoint] = ()) -> List[HorizonEndpoint]:
+        """Candidates, preferred first: unmeasured, then by EWMA latency"""
+        candidates = [endpoint for endpoint in self.endpoints if endpoint not in exclude]
+        candidates.sort(key=lambda e: (e.latency is not None, e.latency or 0.0))
+        if len(candidates) > 1 and random.random() < self.explore_rate:
+            healthy = [endpoint for endpoint in candidates if endpoint.available]
+            if healthy:
+                pick = random.choice(healthy)
+                candidates.remove(pick)
+                candidates.insert(0, pick)
+        return candidates
+
+    def choose(self, exclude: Sequence[HorizonEndpoint] = ()) -> Optional[HorizonEndpoint]:
+        """
+        Endpoint for the next request (None = all excluded or open)
+
+        The returned endpoint's breaker has admitted the request: report
+        the outcome with record(), or release() it if there is none.
+        """
+        pin = _current_pin.get()
+        repin = False
+        if pin is not None:
+            endpoint: Optional[HorizonEndpoint] = self._pins.get(pin, None)
+            if endpoint is None:
+                repin = True
+            elif endpoint not in exclude:
+                if endpoint.breaker.allow_request():
+                    return endpoint
+                logger.warning(f"Horizon endpoint {endpoint.url} unavailable, re-pinning {pin}")
+                repin = True
+            # Excluded (a GET just failed there): fail over for this request only
+
+        for endpoint in self._ranked(exclude):
+            if endpoint.breaker.allow_request():
+                if repin:
+                    self._pins.set(pin, endpoint)
+                return endpoint
+        return None
+
+    def record(self, endpoint: HorizonEndpoint, ok: bool, seconds: Optional[float] = None) -> None:
+        """Report a request outcome; `seconds` feeds the latency EWMA"""
+        endpoint.requests += 1
+        if ok:
+            endpoint.breaker.record_success()
+            if seconds is not None:
+                if endpoint.latency is None:
+                    endpoint.latency = seconds
+                else:
+                    endpoint.latency = self.alpha * seconds + (1 - self.alpha) * endpoint.latency
+        else:
+            endpoint.failures += 1
+            endpoint.breaker.record_failure()
+        metrics.increment(
+            "horizon_endpoint_requests_total", endpoint=endpoint.url, result="ok" if ok else "error"
+        )
+
+    def release(self, endpoint: HorizonEndpoint) -> None:
+        """Hand back an admitted request that ended without an outcome (cancelled, throttled)"""
+        endpoint.breaker.release()
+
+    @contextmanager
+    def pinned(self, key: str) -> Iterator[HorizonEndpoint]:
+        """Send this task's Horizon requests for `key` (a transaction hash) to one endpoint"""
+        endpoint: Optional[HorizonEndpoint] = self._pins.get(key, None)
+        if endpoint is None:
+            ranked = [e for e in self._ranked() if e.available] or self.endpoints
+            endpoint = ranked[0]
+            self._pins.set(key, endpoint)
+        token = _current_pin.set(key)
+        try:
+            yield endpoint
+        finally:
+            _current_pin.reset(token)
+
+    def get_stats(self) -> dict:
+        """Endpoint health for the metrics snapshot"""
+        return {"endpoints": [endpoint.to_dict() for endpoint in self.endpoints]}
@@ -0,0 +1,84 @@
+"""
+Wani - Telegram Alerts
+Operational alerts to a Telegram chat through the Bot API
+
+Without TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID, alerts are only logged,
+so development and CI need no bot. TELEGRAM_API_URL can point at a local
+stand-in.
+"""
+
+import logging
+from typing import Optional
+
+import httpx
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class TelegramAlerter:
+    """
+    Send alert messages to the configured chat
+
+    Args:
+        token: Bot token (default: TELEGRAM_BOT_TOKEN)
+        chat_id: Chat to post to (default: TELEGRAM_CHAT_ID)
+        api_url: Bot API base URL (default: TELEGRAM_API_URL)
+        timeout: Request timeout in seconds
+    """
+
+    def __init__(
+        self,
+        token: Optional[str] = None,
+        chat_id: Optional[str] = None,
+        api_url: Optional[str] = None,
+        timeout: float = 5.0,
+    ):
+        self.token = token or settings.TELEGRAM_BOT_TOKEN
+        self.chat_id = chat_id or settings.TELEGRAM_CHAT_ID
+        self.api_url = (api_url or settings.TELEGRAM_API_URL).rstrip("/")
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.token and self.chat_id)
+
+    async def send(self, text: str) -> bool:
+        """
+        Post a message (logged either way)
+
+        Returns:
+            True if Telegram accepted it; False if disabled or it failed
+        """
+        logger.warning(f"ALERT: {text}")
+        if not self.enabled:
+            metrics.increment("telegram_alerts_total", result="log_only")
+            return False
+
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        try:
+            response = await self._client.post(
+                f"{self.api_url}/bot{self.token}/sendMessage",
+                json={"chat_id": self.chat_id, "text": text, "disable_web_page_preview": True},
+            )
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            # Not str(e): the request URL contains the bot token
+            reason = (
+                e.response.status_code if isinstance(e, httpx.HTTPStatusError) else type(e).__name__
+            )
+            metrics.increment("telegram_alerts_total", result="error")
+            logger.error(f"Telegram alert failed: {reason}")
+            return False
+
+        metrics.increment("telegram_alerts_total", result="sent")
+        return True
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
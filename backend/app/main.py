@@ -3,7 +3,7 @@ Wani - FastAPI Main Application
 Entry point for the FastAPI backend server
 """
 
-from fastapi import FastAPI, Request
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from datetime import datetime
@@ -23,10 +23,19 @@ if sys.platform == 'win32':
 from app.core.config import settings
 from app.core.logger import get_logger
 from app.core.database import init_db, close_db, check_db_health
+from app.core.cache import init_redis, close_redis, check_redis_health
+from app.core.client_cache import start_client_tracking, stop_client_tracking
+
+from app.services.stellar_service import stellar_service
+from app.services.stellar_stream import balance_streamer
+from app.services.stellar_submission import submission_pipeline
+from app.services.hot_wallet_monitor import hot_wallet_monitor
 from app.core.rate_limit import limiter
+from app.core.metrics import metrics
 from app.middleware import setup_exception_handlers
 
 # Import API routers
+from app.api.deps import require_metrics_token
 from app.api.v1 import router as api_v1_router
 
 # Initialize logger
@@ -78,20 +87,22 @@ app.include_router(api_v1_router, prefix="/api")
 async def health_check():
     """
     Health check endpoint to verify API is running
-    Returns server status, database health, and timestamp
+    Returns server status, database/cache health, and timestamp
     """
-    # Check database health
+    # Check database and cache health
     db_healthy = await check_db_health()
+    redis_healthy = await check_redis_health()
 
     return JSONResponse(
         status_code=200,
         content={
             "success": True,
             "data": {
-                "status": "healthy" if db_healthy else "degraded",
+                "status": "healthy" if db_healthy and redis_healthy else "degraded",
                 "service": "wani-api",
                 "version": "1.0.0",
                 "database": "healthy" if db_healthy else "unhealthy",
+                "cache": "healthy" if redis_healthy else "unhealthy",
                 "environment": settings.NODE_ENV,
                 "timestamp": datetime.utcnow().isoformat() + "Z"
             },
@@ -101,6 +112,24 @@ async def health_check():
     )
 
 
+@app.get("/metrics", tags=["Health"], dependencies=[Depends(require_metrics_token)])
+async def metrics_endpoint():
+    """
+    In-process metrics for this worker
+    Returns counters, gauges, histograms and derived stats (e.g. cache hit ratios)
+    Requires the METRICS_TOKEN bearer token
+    """
+    return JSONResponse(
+        status_code=200,
+        content={
+            "success": True,
+            "data": metrics.snapshot(),
+            "error": None,
+            "timestamp": datetime.utcnow().isoformat() + "Z"
+        }
+    )
+
+
 @app.get("/", tags=["Root"])
 async def root():
     """
@@ -145,6 +174,34 @@ async def startup_event():
         logger.error(f"Failed to initialize database: {str(e)}", exc_info=True)
         logger.warning("⚠️  Server starting without database connection")
 
+    # Initialize Redis connection pool
+    try:
+        await init_redis()
+    except Exception as e:
+        logger.error(f"Failed to initialize Redis: {str(e)}", exc_info=True)
+        logger.warning("⚠️  Server starting without Redis connection")
+
+    # Client-side cache (reconnects on its own if Redis is not up yet)
+    if settings.CACHE_CLIENT_TRACKING:
+        start_client_tracking()
+
+    # Open the pooled Horizon HTTP client
+    await stellar_service.startup()
+
+    # Keep watched balances current from Horizon's effects stream
+    if settings.STELLAR_STREAM_ENABLED:
+        balance_streamer.start()
+
+    # Keep the hot wallet balance in memory and alert on thresholds
+    if settings.is_hot_wallet_monitor_enabled():
+        hot_wallet_monitor.start()
+
+    # Finish payments a previous process left unresolved
+    try:
+        await submission_pipeline.recover()
+    except Exception as e:
+        logger.error(f"Failed to resume Stellar submissions: {str(e)}", exc_info=True)
+
 
 # Shutdown event
 @app.on_event("shutdown")
@@ -156,9 +213,25 @@ async def shutdown_event():
     logger.info("🛑 Wani API Server Shutting Down...")
     logger.info("=" * 60)
 
+    # Stop payment submissions (open ones resume on next startup)
+    await submission_pipeline.close()
+
     # Close database connection
     await close_db()
 
+    # Stop the hot wallet monitor (lets pending alerts go out)
+    await hot_wallet_monitor.stop()
+
+    # Stop the balance stream (persists its cursor to Redis)
+    await balance_streamer.stop()
+
+    # Close Redis connection pool
+    await stop_client_tracking()
+    await close_redis()
+
+    # Close Horizon HTTP client
+    await stellar_service.close()
+
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,152 @@
+"""
+Wani - Stellar Submission Model
+Persisted intent for an outgoing Stellar payment and its current attempt
+"""
+
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import BigInteger, DateTime, Integer, Numeric, String, Text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+# Submission statuses
+SUBMISSION_PENDING = "pending"  # intent stored, no transaction built yet
+SUBMISSION_BUILDING = "building"  # claimed by one process, which builds and signs
+SUBMISSION_SUBMITTED = "submitted"  # signed, hash known, sent (or about to be)
+SUBMISSION_SUCCEEDED = "succeeded"  # in a ledger, successful
+SUBMISSION_FAILED = "failed"  # rejected, or in a ledger and failed
+
+# Statuses that still need work (picked up again after a restart)
+OPEN_SUBMISSION_STATUSES = (SUBMISSION_PENDING, SUBMISSION_BUILDING, SUBMISSION_SUBMITTED)
+
+
+class StellarSubmission(Base):
+    """
+    One outgoing payment, from intent to final outcome
+
+    The row is written before anything reaches Horizon, and the signed
+    envelope and its hash are written before the transaction is
+    submitted. If the submission times out, or the process dies, the hash
+    is what decides the outcome: the transaction either shows up under
+    `transactions/{tx_hash}` or its time bounds (`max_time`) pass and it
+    can never be applied. Only then is a new transaction (new sequence,
+    new hash) built for the same intent (see SubmissionPipeline).
+
+    `idempotency_key` is chosen by the caller (e.g. the transfer id), so
+    asking twice for the same payment returns the same row.
+    """
+
+    __tablename__ = "stellar_submissions"
+
+    # Primary Key
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+        index=True,
+        comment="Unique submission identifier",
+    )
+
+    idempotency_key: Mapped[str] = mapped_column(
+        String(128),
+        unique=True,
+        nullable=False,
+        index=True,
+        comment="Caller-chosen key; one submission per key",
+    )
+
+    # Intent (enough to rebuild the transaction)
+    destination: Mapped[str] = mapped_column(
+        String(56), nullable=False, comment="Recipient Stellar public key"
+    )
+
+    amount: Mapped[Decimal] = mapped_column(Numeric(18, 6), nullable=False, comment="USDC amount")
+
+    memo: Mapped[Optional[str]] = mapped_column(
+        String(28), nullable=True, comment="Optional text memo"
+    )
+
+    urgency: Mapped[str] = mapped_column(
+        String(10), nullable=False, default="normal", comment="Fee class: low, normal, high, urgent"
+    )
+
+    # Current attempt
+    status: Mapped[str] = mapped_column(
+        String(20),
+        nullable=False,
+        default=SUBMISSION_PENDING,
+        index=True,
+        comment="pending, building, submitted, succeeded or failed",
+    )
+
+    tx_hash: Mapped[Optional[str]] = mapped_column(
+        String(64),
+        unique=True,
+        nullable=True,
+        index=True,
+        comment="Hash of the current attempt's (inner) transaction",
+    )
+
+    envelope_xdr: Mapped[Optional[str]] = mapped_column(
+        Text, nullable=True, comment="Signed envelope of the current attempt"
+    )
+
+    source_account: Mapped[Optional[str]] = mapped_column(
+        String(56),
+        nullable=True,
+        comment="Transaction source (channel account) of the current attempt",
+    )
+
+    sequence: Mapped[Optional[int]] = mapped_column(
+        BigInteger, nullable=True, comment="Sequence number of the current attempt"
+    )
+
+    max_time: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True,
+        comment="Upper time bound of the current attempt; after it the transaction cannot land",
+    )
+
+    attempts: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, comment="Transactions built for this intent"
+    )
+
+    # Outcome
+    ledger: Mapped[Optional[int]] = mapped_column(
+        Integer, nullable=True, comment="Ledger the transaction landed in"
+    )
+
+    result_code: Mapped[Optional[str]] = mapped_column(
+        String(64), nullable=True, comment="Transaction/operation result code of a failure"
+    )
+
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True, comment="Last error message")
+
+    # Timestamps
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False,
+        comment="Intent creation timestamp",
+    )
+
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False,
+        comment="Last status change timestamp",
+    )
+
+    def __repr__(self):
+        """String representation for debugging"""
+        return (
+            f"<StellarSubmission(id={self.id}, key={self.idempotency_key}, "
+            f"status={self.status}, tx_hash={self.tx_hash})>"
+        )
@@ -0,0 +1,81 @@
+"""
+Wani - Transfer Volume Model
+Incrementally maintained per-user daily/monthly outgoing volume for KYC limits
+"""
+
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import Date, DateTime, ForeignKey, Integer, Numeric
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class UserTransferVolume(Base):
+    """
+    Running outgoing transfer volume for a single user
+
+    One row per user holds both the current UTC day and the current UTC
+    month, so a limit check is a single primary-key lookup instead of a
+    SUM() over the user's transaction history.
+
+    Rows are written with an upsert in the same database transaction as
+    the transfer itself (see LimitService.record_transfer). When a new
+    day/month starts, the stale counter is reset by that same upsert.
+    """
+
+    __tablename__ = "user_transfer_volumes"
+
+    # Primary Key (one row per user)
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True,
+        comment="Owner of the volume counters",
+    )
+
+    # Daily window
+    day: Mapped[date] = mapped_column(
+        Date, nullable=False, comment="UTC day the daily counters refer to"
+    )
+
+    daily_amount: Mapped[Decimal] = mapped_column(
+        Numeric(18, 6), nullable=False, default=0, comment="Outgoing USDC volume for `day`"
+    )
+
+    daily_count: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, comment="Number of outgoing transfers for `day`"
+    )
+
+    # Monthly window
+    month: Mapped[date] = mapped_column(
+        Date, nullable=False, comment="First UTC day of the month the monthly counters refer to"
+    )
+
+    monthly_amount: Mapped[Decimal] = mapped_column(
+        Numeric(18, 6), nullable=False, default=0, comment="Outgoing USDC volume for `month`"
+    )
+
+    monthly_count: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, comment="Number of outgoing transfers for `month`"
+    )
+
+    # Timestamps
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False,
+        comment="Last counter update timestamp",
+    )
+
+    def __repr__(self):
+        """String representation for debugging"""
+        return (
+            f"<UserTransferVolume(user_id={self.user_id}, day={self.day}, "
+            f"daily_amount={self.daily_amount}, monthly_amount={self.monthly_amount})>"
+        )
@@ -12,6 +12,12 @@ from app.services.user_service import (
     AccountInactiveError
 )
 
+from app.services.limit_service import (
+    LimitService,
+    LimitServiceError,
+    TransferLimitExceededError,
+)
+
 from app.services.email_service import (
     EmailService,
     EmailServiceError,
@@ -28,6 +34,9 @@ __all__ = [
     "UserNotFoundError",
     "InvalidCredentialsError",
     "AccountInactiveError",
+    "LimitService",
+    "LimitServiceError",
+    "TransferLimitExceededError",
     "EmailService",
     "EmailServiceError",
     "EmailConfigurationError",
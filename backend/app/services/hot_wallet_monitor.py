@@ -0,0 +1,253 @@
+"""
+Wani - Hot Wallet Monitor
+Cached hot wallet balances and threshold alerts
+
+Payment code needs to know whether the hot wallet can cover a payout, but
+a Horizon lookup per request is too slow and eats the rate limit. The
+monitor refreshes the hot wallet's USDC and XLM balances in the background
+every HOT_WALLET_MONITOR_INTERVAL seconds and keeps the last values in
+memory, so usdc_balance / can_pay() cost no I/O. The refresh goes through
+StellarService.get_account_snapshot: while the balance stream follows the
+hot wallet, it is served from the stream-maintained snapshot; otherwise
+it polls Horizon.
+
+USDC levels (HOT_WALLET_* settings):
+
+    critical  below HOT_WALLET_MIN_BALANCE         refill from cold wallet
+    low       below ALERT_THRESHOLD x MAX_BALANCE  refill soon
+    ok
+    high      above HOT_WALLET_MAX_BALANCE         sweep to cold wallet
+
+XLM (fees, channel top-ups) is critical below HOT_WALLET_MIN_XLM.
+
+Every level change sends an alert (Telegram, or the log without a bot
+token), including the recovery back to "ok". A balance must clear a
+threshold by HOT_WALLET_ALERT_HYSTERESIS x MAX_BALANCE (10% of the XLM
+threshold) before its level changes back, so a balance hovering at a
+threshold does not alert on every payment.
+
+The monitor runs when HOT_WALLET_MONITOR_ENABLED is set or, by default,
+when Telegram is configured: without it alerts would only reach the log.
+While it is not running, can_pay() answers False.
+"""
+
+import asyncio
+import logging
+import time
+from decimal import Decimal
+from typing import Dict, List, Optional, Set
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.integrations.telegram import TelegramAlerter
+from app.services.stellar_service import StellarService, stellar_service
+
+logger = logging.getLogger(__name__)
+
+# Balance levels, lowest balance first
+LEVEL_CRITICAL = "critical"
+LEVEL_LOW = "low"
+LEVEL_OK = "ok"
+LEVEL_HIGH = "high"
+
+_ALERT_ICONS = {LEVEL_CRITICAL: "🔴", LEVEL_LOW: "🟠", LEVEL_OK: "🟢", LEVEL_HIGH: "🔵"}
+_ALERT_ACTIONS = {
+    LEVEL_CRITICAL: "refill from the cold wallet now",
+    LEVEL_LOW: "refill from the cold wallet soon",
+    LEVEL_HIGH: "sweep the excess to the cold wallet",
+}
+
+
+class ThresholdBand:
+    """
+    Maps a balance to a level, with hysteresis
+
+    Moving away from "ok" happens as soon as a threshold is crossed;
+    moving back towards it needs the balance to clear the threshold by
+    `margin`.
+
+    Args:
+        levels: Level names, lowest balance first (one of them LEVEL_OK)
+        thresholds: Ascending boundaries between consecutive levels
+                    (len(levels) - 1 of them)
+        margin: Distance past a threshold required to move back towards ok
+    """
+
+    def __init__(self, levels: List[str], thresholds: List[Decimal], margin: Decimal):
+        self.levels = levels
+        self.thresholds = thresholds
+        self.margin = margin
+        self.ok = levels.index(LEVEL_OK)
+        self.level: Optional[str] = None
+
+    def _index(self, balance: Decimal) -> int:
+        return sum(1 for threshold in self.thresholds if balance >= threshold)
+
+    def update(self, balance: Decimal) -> Optional[str]:
+        """
+        Record a balance
+
+        Returns:
+            The previous level if the level changed (None on no change;
+            "" for the very first reading)
+        """
+        target = self._index(balance)
+        if self.level is not None:
+            current = self.levels.index(self.level)
+            if target > current and current < self.ok:
+                target = max(self._index(balance - self.margin), current)
+            elif target < current and current > self.ok:
+                target = min(self._index(balance + self.margin), current)
+            if target == current:
+                return None
+
+        previous = self.level or ""
+        self.level = self.levels[target]
+        return previous
+
+
+class HotWalletMonitor:
+    """
+    Keeps the hot wallet's balances in memory and alerts on level changes
+
+    Args:
+        service: StellarService used for the balance lookups
+        alerter: Alert sink (default: TelegramAlerter from settings)
+        interval: Seconds between refreshes
+
+    Usage:
+        if not hot_wallet_monitor.can_pay(amount):
+            ...  # queue the payout until the wallet is refilled
+    """
+
+    def __init__(
+        self,
+        service: StellarService,
+        alerter: Optional[TelegramAlerter] = None,
+        interval: Optional[float] = None,
+    ):
+        self.service = service
+        self.alerter = alerter or TelegramAlerter()
+        self.interval = settings.HOT_WALLET_MONITOR_INTERVAL if interval is None else interval
+
+        max_balance = Decimal(settings.HOT_WALLET_MAX_BALANCE)
+        min_xlm = Decimal(str(settings.HOT_WALLET_MIN_XLM))
+        self.bands: Dict[str, ThresholdBand] = {
+            "USDC": ThresholdBand(
+                [LEVEL_CRITICAL, LEVEL_LOW, LEVEL_OK, LEVEL_HIGH],
+                [
+                    Decimal(settings.HOT_WALLET_MIN_BALANCE),
+                    max_balance * Decimal(str(settings.HOT_WALLET_ALERT_THRESHOLD)),
+                    max_balance,
+                ],
+                max_balance * Decimal(str(settings.HOT_WALLET_ALERT_HYSTERESIS)),
+            ),
+            "XLM": ThresholdBand([LEVEL_CRITICAL, LEVEL_OK], [min_xlm], min_xlm / 10),
+        }
+
+        self.usdc_balance: Optional[Decimal] = None
+        self.xlm_balance: Optional[Decimal] = None
+        self.updated_at: Optional[float] = None
+
+        self._task: Optional[asyncio.Task] = None
+        self._alerts: Set[asyncio.Task] = set()
+
+    @property
+    def stale(self) -> bool:
+        """No reading within three refresh intervals"""
+        return self.updated_at is None or time.monotonic() - self.updated_at > self.interval * 3
+
+    @property
+    def levels(self) -> Dict[str, Optional[str]]:
+        return {asset: band.level for asset, band in self.bands.items()}
+
+    def can_pay(self, amount: Decimal) -> bool:
+        """Whether the last known USDC balance covers `amount` (no I/O; False if unknown)"""
+        return (
+            self.usdc_balance is not None
+            and not self.stale
+            and self.usdc_balance >= Decimal(amount)
+        )
+
+    async def refresh(self) -> None:
+        """Read the hot wallet snapshot once and update levels"""
+        snapshot = await self.service.get_account_snapshot(self.service.hot_wallet.public_key)
+        if not snapshot.exists:
+            raise RuntimeError(f"Hot wallet {snapshot.public_key} does not exist on the network")
+        self.observe(snapshot.usdc_balance, snapshot.xlm_balance)
+
+    def observe(self, usdc_balance: Decimal, xlm_balance: Decimal) -> None:
+        """Record balances, alerting on any level change"""
+        self.usdc_balance = usdc_balance
+        self.xlm_balance = xlm_balance
+        self.updated_at = time.monotonic()
+
+        for asset, balance in (("USDC", usdc_balance), ("XLM", xlm_balance)):
+            band = self.bands[asset]
+            previous = band.update(balance)
+            level = band.level
+            if previous is None or level is None or (previous == "" and level == LEVEL_OK):
+                continue  # Unchanged, or healthy from the start
+            metrics.increment("hot_wallet_alerts_total", asset=asset, level=level)
+            self._alert(self._message(asset, balance, previous, level))
+
+    def _message(self, asset: str, balance: Decimal, previous: str, level: str) -> str:
+        text = f"{_ALERT_ICONS[level]} Hot wallet {asset} {level}: {balance:,.2f}"
+        if previous:
+            text += f" (was {previous})"
+        if level in _ALERT_ACTIONS:
+            text += f" - {_ALERT_ACTIONS[level]}"
+        return text
+
+    def _alert(self, text: str) -> None:
+        """Send without holding up the refresh loop"""
+        task = asyncio.get_running_loop().create_task(self.alerter.send(text))
+        self._alerts.add(task)
+        task.add_done_callback(self._alerts.discard)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Hot wallet balance check failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        """Start background refreshes (called on startup)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            logger.info(f"💰 Monitoring hot wallet balance every {self.interval}s")
+
+    async def stop(self) -> None:
+        """Stop refreshing and let pending alerts finish (called on shutdown)"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._alerts:
+            await asyncio.gather(*self._alerts, return_exceptions=True)
+        await self.alerter.close()
+
+    def get_stats(self) -> dict:
+        """Balances and levels for the metrics snapshot"""
+        return {
+            "usdc_balance": float(self.usdc_balance) if self.usdc_balance is not None else None,
+            "xlm_balance": float(self.xlm_balance) if self.xlm_balance is not None else None,
+            "levels": self.levels,
+            "stale": self.stale,
+            "seconds_since_update": (
+                round(time.monotonic() - self.updated_at, 1) if self.updated_at else None
+            ),
+            "alerting": "telegram" if self.alerter.enabled else "log",
+        }
+
+
+hot_wallet_monitor = HotWalletMonitor(stellar_service)
+
+metrics.register_collector("hot_wallet", hot_wallet_monitor.get_stats)
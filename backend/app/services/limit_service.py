@@ -0,0 +1,332 @@
+"""
+Limit Service - KYC transfer limit enforcement.
+
+This service handles:
+- Incremental per-user daily/monthly volume counters (one row per user)
+- KYC limit checks that read a single row instead of scanning transactions
+- Recording and reversing transfer volume inside the transfer's DB transaction
+"""
+
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Optional, Union, cast
+from uuid import UUID
+
+from sqlalchemy import case, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.transfer_volume import UserTransferVolume
+from app.models.user import User
+
+
+class LimitServiceError(Exception):
+    """Base exception for limit service errors."""
+
+    pass
+
+
+class TransferLimitExceededError(LimitServiceError):
+    """Exception raised when a transfer would exceed the user's KYC limits."""
+
+    def __init__(self, period: str, limit: Decimal, used: Decimal, requested: Decimal):
+        self.period = period
+        self.limit = limit
+        self.used = used
+        self.requested = requested
+        super().__init__(
+            f"Transfer of {requested} USDC exceeds {period} limit "
+            f"({used} of {limit} USDC already used)"
+        )
+
+
+@dataclass(frozen=True)
+class TransferLimits:
+    """Daily and monthly USDC limits that apply to a user."""
+
+    daily: Decimal
+    monthly: Decimal
+
+
+@dataclass(frozen=True)
+class VolumeUsage:
+    """Current volume usage for a user within the active day/month."""
+
+    daily_amount: Decimal
+    daily_count: int
+    monthly_amount: Decimal
+    monthly_count: int
+
+
+def utc_periods(occurred_at: Optional[datetime] = None) -> tuple[date, date]:
+    """Return (day, first-day-of-month) in UTC for a timestamp (default: now)."""
+    moment = occurred_at or datetime.now(timezone.utc)
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc)
+    day = moment.date()
+    return day, day.replace(day=1)
+
+
+class LimitService:
+    """
+    Service class for KYC transfer limit operations.
+
+    Volume counters live in `user_transfer_volumes` and are maintained
+    incrementally: every outgoing transfer upserts the user's row in the
+    same DB transaction that creates the transfer, so the counters commit
+    or roll back together with it.
+    """
+
+    @staticmethod
+    def get_limits(user: User) -> TransferLimits:
+        """
+        Resolve the KYC limits that apply to a user.
+
+        Users with kyc_level 0 are treated as KYC pending; any approved
+        level (1+) gets the approved limits.
+
+        Args:
+            user: User model instance
+
+        Returns:
+            TransferLimits with daily and monthly USDC caps
+        """
+        if (user.kyc_level or 0) >= 1:
+            return TransferLimits(
+                daily=Decimal(settings.KYC_APPROVED_DAILY_LIMIT),
+                monthly=Decimal(settings.KYC_APPROVED_MONTHLY_LIMIT),
+            )
+        return TransferLimits(
+            daily=Decimal(settings.KYC_PENDING_DAILY_LIMIT),
+            monthly=Decimal(settings.KYC_PENDING_MONTHLY_LIMIT),
+        )
+
+    @staticmethod
+    async def get_usage(db: AsyncSession, user_id: Union[UUID, str]) -> VolumeUsage:
+        """
+        Read the user's current day/month volume (single row lookup).
+
+        Counters belonging to a previous day or month are reported as zero,
+        since the row is only rolled over on the next write.
+
+        Args:
+            db: SQLAlchemy async database session
+            user_id: User's UUID
+
+        Returns:
+            VolumeUsage for the current UTC day and month
+        """
+        result = await db.execute(
+            select(UserTransferVolume).filter(UserTransferVolume.user_id == user_id)
+        )
+        row = result.scalar_one_or_none()
+
+        if row is None:
+            return VolumeUsage(Decimal("0"), 0, Decimal("0"), 0)
+
+        today, month = utc_periods()
+        same_day = row.day == today
+        same_month = row.month == month
+
+        return VolumeUsage(
+            daily_amount=Decimal(row.daily_amount) if same_day else Decimal("0"),
+            daily_count=row.daily_count if same_day else 0,
+            monthly_amount=Decimal(row.monthly_amount) if same_month else Decimal("0"),
+            monthly_count=row.monthly_count if same_month else 0,
+        )
+
+    @staticmethod
+    async def check_transfer_allowed(
+        db: AsyncSession,
+        user: User,
+        amount: Decimal,
+    ) -> VolumeUsage:
+        """
+        Check whether a transfer fits within the user's KYC limits.
+
+        This is a read-only pre-check (e.g. for quoting). The authoritative
+        check happens atomically in record_transfer().
+
+        Args:
+            db: SQLAlchemy async database session
+            user: User model instance (sender)
+            amount: Transfer amount in USDC
+
+        Returns:
+            Current VolumeUsage if the transfer is allowed
+
+        Raises:
+            TransferLimitExceededError: If daily or monthly limit would be exceeded
+        """
+        usage = await LimitService.get_usage(db, cast(UUID, user.id))
+        LimitService._enforce(
+            LimitService.get_limits(user),
+            usage.daily_amount + amount,
+            usage.monthly_amount + amount,
+            amount,
+        )
+        return usage
+
+    @staticmethod
+    async def record_transfer(
+        db: AsyncSession,
+        user: User,
+        amount: Decimal,
+        occurred_at: Optional[datetime] = None,
+        enforce_limits: bool = True,
+    ) -> VolumeUsage:
+        """
+        Add an outgoing transfer to the user's volume counters.
+
+        Must be called inside the same DB transaction that persists the
+        transfer; it does NOT commit. The upsert locks the user's row until
+        commit, so concurrent transfers for the same user are serialized and
+        the returned totals are authoritative. If a limit is exceeded the
+        error is raised after the upsert and the caller must roll back.
+
+        Args:
+            db: SQLAlchemy async database session
+            user: User model instance (sender)
+            amount: Transfer amount in USDC (positive)
+            occurred_at: Transfer timestamp (default: now, UTC)
+            enforce_limits: Raise if the new totals exceed KYC limits
+
+        Returns:
+            VolumeUsage after applying the transfer
+
+        Raises:
+            ValueError: If amount is not positive
+            TransferLimitExceededError: If the new totals exceed KYC limits
+
+        Example:
+            >>> async with session.begin():
+            ...     session.add(transaction)
+            ...     await LimitService.record_transfer(session, user, Decimal("25"))
+        """
+        if amount <= 0:
+            raise ValueError("Transfer amount must be positive")
+
+        usage = await LimitService._apply_delta(db, cast(UUID, user.id), amount, 1, occurred_at)
+
+        if enforce_limits:
+            LimitService._enforce(
+                LimitService.get_limits(user),
+                usage.daily_amount,
+                usage.monthly_amount,
+                amount,
+            )
+
+        return usage
+
+    @staticmethod
+    async def reverse_transfer(
+        db: AsyncSession,
+        user_id: Union[UUID, str],
+        amount: Decimal,
+        occurred_at: datetime,
+    ) -> VolumeUsage:
+        """
+        Remove a failed/cancelled transfer from the user's volume counters.
+
+        Only counters that still refer to the transfer's day/month are
+        decremented; older windows have already rolled over.
+
+        Args:
+            db: SQLAlchemy async database session
+            user_id: Sender's UUID
+            amount: Original transfer amount in USDC (positive)
+            occurred_at: Original transfer timestamp
+
+        Returns:
+            VolumeUsage after the reversal
+        """
+        if amount <= 0:
+            raise ValueError("Transfer amount must be positive")
+
+        return await LimitService._apply_delta(db, user_id, -amount, -1, occurred_at)
+
+    @staticmethod
+    async def _apply_delta(
+        db: AsyncSession,
+        user_id: Union[UUID, str],
+        amount: Decimal,
+        count: int,
+        occurred_at: Optional[datetime],
+    ) -> VolumeUsage:
+        """
+        Upsert the user's counters with a single INSERT ... ON CONFLICT.
+
+        Per window: same period -> add; stored period is newer -> keep
+        (late event for an already rolled-over window); otherwise reset to
+        the delta (new day/month).
+        """
+        day, month = utc_periods(occurred_at)
+        table = UserTransferVolume.__table__
+
+        insert_stmt = pg_insert(UserTransferVolume).values(
+            user_id=user_id,
+            day=day,
+            daily_amount=max(amount, Decimal("0")),
+            daily_count=max(count, 0),
+            month=month,
+            monthly_amount=max(amount, Decimal("0")),
+            monthly_count=max(count, 0),
+        )
+
+        def window(stored_period, new_period, stored_value, delta, floor):
+            return case(
+                (stored_period == new_period, func.greatest(stored_value + delta, floor)),
+                (stored_period > new_period, stored_value),
+                else_=func.greatest(delta, floor),
+            )
+
+        zero_amount = Decimal("0")
+        stmt = insert_stmt.on_conflict_do_update(
+            index_elements=[table.c.user_id],
+            set_={
+                "daily_amount": window(table.c.day, day, table.c.daily_amount, amount, zero_amount),
+                "daily_count": window(table.c.day, day, table.c.daily_count, count, 0),
+                "day": func.greatest(table.c.day, day),
+                "monthly_amount": window(
+                    table.c.month, month, table.c.monthly_amount, amount, zero_amount
+                ),
+                "monthly_count": window(table.c.month, month, table.c.monthly_count, count, 0),
+                "month": func.greatest(table.c.month, month),
+                "updated_at": func.now(),
+            },
+        ).returning(
+            table.c.day,
+            table.c.daily_amount,
+            table.c.daily_count,
+            table.c.month,
+            table.c.monthly_amount,
+            table.c.monthly_count,
+        )
+
+        result = await db.execute(stmt)
+        row = result.one()
+
+        today, this_month = utc_periods()
+        return VolumeUsage(
+            daily_amount=Decimal(row.daily_amount) if row.day == today else Decimal("0"),
+            daily_count=row.daily_count if row.day == today else 0,
+            monthly_amount=Decimal(row.monthly_amount) if row.month == this_month else Decimal("0"),
+            monthly_count=row.monthly_count if row.month == this_month else 0,
+        )
+
+    @staticmethod
+    def _enforce(
+        limits: TransferLimits,
+        daily_total: Decimal,
+        monthly_total: Decimal,
+        amount: Decimal,
+    ) -> None:
+        """Raise TransferLimitExceededError if either total is over its limit."""
+        if daily_total > limits.daily:
+            raise TransferLimitExceededError("daily", limits.daily, daily_total - amount, amount)
+        if monthly_total > limits.monthly:
+            raise TransferLimitExceededError(
+                "monthly", limits.monthly, monthly_total - amount, amount
+            )
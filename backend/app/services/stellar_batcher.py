@@ -0,0 +1,338 @@
+"""
+Wani - Payment Batching
+Micro-batches USDC payments into multi-operation Stellar transactions
+
+A transaction carries up to 100 operations for the same per-transaction
+latency, so payments queued within STELLAR_BATCH_WINDOW seconds (or until
+STELLAR_BATCH_MAX_OPS are waiting) go out together:
+
+    pay(A, 10) ─┐
+    pay(B, 25) ─┼─> one transaction, 3 payment ops -> each caller gets
+    pay(C, 5)  ─┘   its own PaymentResult (or exception)
+
+A failed transaction is atomic: if any op fails, none are applied. Horizon
+reports a result code per op, so the failing payments are rejected with
+their code and the surviving ones are resubmitted in a new transaction.
+
+A submission that times out (or gets a 5xx or connection error) without
+turning up in a ledger has an unknown outcome: it may still land. Its
+payments fail with PaymentOutcomeUnknownError carrying the transaction
+hash; look it up before paying again.
+
+Destinations are checked against cached account snapshots before
+building, so a payment to an unfunded account, one without a USDC
+trustline, or one requiring a memo (SEP-29) is rejected without costing
+the batch a failed transaction. Payments that need a memo cannot share a
+transaction; use StellarService.send_usdc_payment for those.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import TYPE_CHECKING, List, Optional, Set, Tuple
+
+from stellar_sdk import TransactionBuilder
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.integrations.horizon_client import operation_result_codes, submission_result_code
+
+if TYPE_CHECKING:
+    from app.services.stellar_service import StellarService
+
+logger = logging.getLogger(__name__)
+
+# Protocol limit on operations per transaction
+MAX_OPERATIONS_PER_TRANSACTION = 100
+
+_BATCH_SIZE_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+
+
+class PaymentError(Exception):
+    """Base exception for batched payment errors"""
+
+    pass
+
+
+class PaymentRejectedError(PaymentError):
+    """
+    Raised for a payment that cannot succeed as requested
+
+    Attributes:
+        code: Operation result code (e.g. "op_no_trust") or local reason
+    """
+
+    def __init__(self, message: str, code: str):
+        super().__init__(message)
+        self.code = code
+
+
+class PaymentOutcomeUnknownError(PaymentError):
+    """
+    Raised when the payment's transaction may or may not have landed
+
+    Do not pay again before the transaction is known to have failed or
+    expired (StellarService.get_transaction).
+
+    Attributes:
+        transaction_hash: Hash of the transaction carrying the payment
+    """
+
+    def __init__(self, message: str, transaction_hash: str):
+        super().__init__(message)
+        self.transaction_hash = transaction_hash
+
+
+@dataclass(frozen=True)
+class PaymentResult:
+    """Where a batched payment landed"""
+
+    hash: str
+    ledger: Optional[int]
+    operation_index: int
+    batch_size: int
+
+
+@dataclass
+class _QueuedPayment:
+    destination: str
+    amount: Decimal
+    future: "asyncio.Future[PaymentResult]"
+
+
+class PaymentBatcher:
+    """
+    Queue payments and submit them in batches
+
+    Args:
+        service: StellarService providing channels, sequences and submission
+        max_ops: Operations per transaction (capped at 100)
+        window: Seconds the first queued payment waits for company
+
+    Usage:
+        result = await batcher.pay(destination, Decimal("12.50"))
+        result.hash, result.operation_index
+    """
+
+    def __init__(
+        self,
+        service: "StellarService",
+        max_ops: Optional[int] = None,
+        window: Optional[float] = None,
+    ):
+        self.service = service
+        self.max_ops = min(
+            max_ops or settings.STELLAR_BATCH_MAX_OPS, MAX_OPERATIONS_PER_TRANSACTION
+        )
+        self.window = settings.STELLAR_BATCH_WINDOW if window is None else window
+
+        self._queue: List[_QueuedPayment] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._batches: Set[asyncio.Task] = set()
+
+    async def pay(self, destination: str, amount: Decimal) -> PaymentResult:
+        """
+        Send USDC from the hot wallet as part of the next batch
+
+        Args:
+            destination: Recipient public key (must trust USDC)
+            amount: USDC amount
+
+        Returns:
+            PaymentResult with the transaction hash and the payment's op index
+
+        Raises:
+            PaymentRejectedError: This payment failed (others may have succeeded)
+            PaymentOutcomeUnknownError: The batch's transaction may still land
+            stellar_sdk / channel pool exceptions: the whole batch failed
+        """
+        amount = Decimal(amount)
+        if amount <= 0:
+            raise PaymentRejectedError(f"Invalid payment amount {amount}", "invalid_amount")
+
+        loop = asyncio.get_running_loop()
+        payment = _QueuedPayment(destination, amount, loop.create_future())
+        self._queue.append(payment)
+
+        if len(self._queue) >= self.max_ops:
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self.flush)
+
+        # Shielded: a cancelled caller must not cancel a payment that may land
+        return await asyncio.shield(payment.future)
+
+    def flush(self) -> None:
+        """Submit everything queued now (called by the window timer)"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._queue:
+            batch, self._queue = self._queue[: self.max_ops], self._queue[self.max_ops :]
+            task = asyncio.get_running_loop().create_task(self._submit_batch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _screen(self, batch: List[_QueuedPayment]) -> List[_QueuedPayment]:
+        """Reject payments whose destination cannot receive them"""
+        destinations = list(dict.fromkeys(payment.destination for payment in batch))
+        snapshots = {}
+        async for result in self.service.iter_balances_many(destinations):
+            snapshots[result.public_key] = result
+
+        accepted = []
+        for payment in batch:
+            result = snapshots[payment.destination]
+            snapshot = result.snapshot
+            if result.error is not None or snapshot is None:
+                reason = ("destination_lookup_failed", result.error or "no snapshot")
+            elif not snapshot.exists:
+                reason = ("op_no_destination", "destination account does not exist")
+            elif not snapshot.has_usdc_trustline:
+                reason = ("op_no_trust", "destination has no USDC trustline")
+            elif snapshot.memo_required:
+                reason = ("memo_required", "destination requires a memo; use send_usdc_payment")
+            else:
+                accepted.append(payment)
+                continue
+            self._reject(payment, *reason)
+        return accepted
+
+    def _reject(self, payment: _QueuedPayment, code: str, detail: str) -> None:
+        metrics.increment("stellar_batch_payments_total", result="rejected")
+        if not payment.future.done():
+            payment.future.set_exception(
+                PaymentRejectedError(
+                    f"Payment of {payment.amount} USDC to {payment.destination} rejected: {detail}",
+                    code,
+                )
+            )
+
+    def _fail(self, batch: List[_QueuedPayment], error: Exception) -> None:
+        result = "unknown" if isinstance(error, PaymentOutcomeUnknownError) else "failed"
+        metrics.increment("stellar_batch_payments_total", len(batch), result=result)
+        for payment in batch:
+            if not payment.future.done():
+                payment.future.set_exception(error)
+
+    async def _submit_batch(self, batch: List[_QueuedPayment]) -> None:
+        try:
+            batch = await self._screen(batch)
+            if not batch:
+                return
+            pool = self.service.channel_pool
+            hot_wallet = self.service.hot_wallet.public_key
+
+            async with pool.lease() as channel:
+                bad_seq_retried = False
+                while batch:
+                    builder = TransactionBuilder(
+                        await pool.source_account(channel),
+                        self.service.network_passphrase,
+                        base_fee=self.service.fee_oracle.fee_for("normal"),
+                    )
+                    for payment in batch:
+                        builder.append_payment_op(
+                            payment.destination,
+                            self.service.usdc_asset,
+                            str(payment.amount),
+                            source=hot_wallet,
+                        )
+                    transaction = builder.set_timeout(settings.STELLAR_TX_TIMEOUT).build()
+                    pool.sign(channel, transaction)
+
+                    try:
+                        response = await pool.submit(
+                            channel, transaction, skip_memo_required_check=True
+                        )
+                    except Exception as e:
+                        batch, bad_seq_retried = self._after_failure(
+                            batch, transaction.hash_hex(), e, bad_seq_retried
+                        )
+                        continue
+
+                    metrics.increment("stellar_batch_submissions_total", result="success")
+                    metrics.observe("stellar_batch_size", len(batch), _BATCH_SIZE_BUCKETS)
+                    metrics.increment("stellar_batch_payments_total", len(batch), result="sent")
+                    for index, payment in enumerate(batch):
+                        if not payment.future.done():
+                            payment.future.set_result(
+                                PaymentResult(
+                                    response["hash"], response.get("ledger"), index, len(batch)
+                                )
+                            )
+                    logger.info(f"Sent {len(batch)} USDC payments in tx {response['hash']}")
+                    batch = []
+
+        except asyncio.CancelledError:
+            self._fail(batch, PaymentError("Payment batcher stopped before submission"))
+            raise
+        except Exception as e:
+            logger.error(f"Payment batch of {len(batch)} failed: {e}")
+            self._fail(batch, e)
+
+    def _after_failure(
+        self,
+        batch: List[_QueuedPayment],
+        transaction_hash: str,
+        error: Exception,
+        bad_seq_retried: bool,
+    ) -> Tuple[List[_QueuedPayment], bool]:
+        """
+        Decide what to resubmit after a rejected transaction
+
+        Returns:
+            (payments to retry, whether the bad-sequence retry is used up)
+
+        Raises:
+            PaymentOutcomeUnknownError: No result code (timeout, 5xx, connection)
+            The error, if the batch as a whole cannot be retried
+        """
+        code = submission_result_code(error)
+        if code is None:
+            metrics.increment("stellar_batch_submissions_total", result="unknown")
+            raise PaymentOutcomeUnknownError(
+                f"Outcome of payment batch tx {transaction_hash} unknown: {error}", transaction_hash
+            ) from error
+        metrics.increment("stellar_batch_submissions_total", result=code)
+
+        if code == "tx_bad_seq" and not bad_seq_retried:
+            return batch, True
+
+        op_codes = operation_result_codes(error)
+        if code == "tx_failed" and len(op_codes) == len(batch):
+            survivors = []
+            for payment, op_code in zip(batch, op_codes):
+                if op_code == "op_success":
+                    survivors.append(payment)
+                else:
+                    self._reject(payment, op_code, op_code)
+            if len(survivors) < len(batch):
+                logger.warning(
+                    f"Payment batch failed on {len(batch) - len(survivors)} op(s); "
+                    f"retrying {len(survivors)}"
+                )
+                return survivors, bad_seq_retried
+
+        raise error
+
+    async def close(self) -> None:
+        """Submit anything queued and wait for in-flight batches (called on shutdown)"""
+        self.flush()
+        if self._batches:
+            await asyncio.gather(*self._batches, return_exceptions=True)
+
+    def get_stats(self) -> dict:
+        """Queue state for the metrics snapshot"""
+        return {
+            "queued": len(self._queue),
+            "in_flight_batches": len(self._batches),
+            "max_ops": self.max_ops,
+            "window": self.window,
+            "sent": metrics.get_counter("stellar_batch_payments_total", result="sent"),
+            "rejected": metrics.get_counter("stellar_batch_payments_total", result="rejected"),
+            "failed": metrics.get_counter("stellar_batch_payments_total", result="failed"),
+            "unknown": metrics.get_counter("stellar_batch_payments_total", result="unknown"),
+        }
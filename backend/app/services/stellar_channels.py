@@ -0,0 +1,384 @@
+"""
+Wani - Channel Accounts
+Parallel payment submission from the hot wallet through channel accounts
+
+A Stellar transaction consumes its source account's sequence number, so
+every transaction sourced from the hot wallet has to wait for the previous
+one. Channel accounts break that dependency:
+
+    transaction source   channel account   (sequence number, fee)
+    payment op source    hot wallet        (funds)
+
+Each channel is leased to one submission at a time and signs as the
+transaction source; the hot wallet signs for its payment operation. With N
+channels, N payments can be in the same ledger.
+
+Channels must already exist on the network (create them from the hot
+wallet with create_account). They pay fees, so when a channel's estimated
+XLM drops below STELLAR_CHANNEL_MIN_XLM it tops itself up from the hot
+wallet before going back into the pool. A channel that can no longer pay
+its own fees stays out of the pool, retrying the top-up (fee paid by the
+hot wallet), until one succeeds.
+
+Without STELLAR_CHANNEL_SECRETS the pool holds only the hot wallet, which
+then sources its own transactions one at a time.
+
+Leases are local to the process, so processes must not share channels:
+two processes building on one channel reuse its sequence numbers. Every
+process (replica, worker, Celery worker) that submits gets a distinct
+STELLAR_CHANNEL_WORKER_INDEX out of STELLAR_CHANNEL_WORKER_COUNT and
+uses every WORKER_COUNT-th channel from that index. Without channels,
+only worker 0 sources transactions from the hot wallet.
+
+Sequence numbers come from the service's SequenceManager, so a lease does
+not cost a Horizon round trip.
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Optional
+
+from stellar_sdk import Account, Asset, Keypair, TransactionBuilder, TransactionEnvelope
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.integrations.horizon_client import submission_result_code
+from app.services.stellar_sequence import SEQUENCE_CONSUMED_CODES, SequenceManager
+
+if TYPE_CHECKING:
+    from app.services.stellar_service import StellarService
+
+logger = logging.getLogger(__name__)
+
+# Lease wait buckets (milliseconds)
+_LEASE_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+STROOPS_PER_XLM = Decimal("10000000")
+
+# Minimum balance of a plain account (two base reserves): at or below it a
+# channel cannot pay fees
+_RESERVE_XLM = Decimal("1")
+
+# Transaction result code: the fee source cannot pay the fee
+_INSUFFICIENT_BALANCE = "tx_insufficient_balance"
+
+
+class ChannelPoolError(Exception):
+    """Base exception for channel account pool errors"""
+
+    pass
+
+
+class ChannelLeaseTimeout(ChannelPoolError):
+    """Raised when no channel became free within the lease timeout"""
+
+    pass
+
+
+@dataclass
+class ChannelAccount:
+    """
+    A transaction-source account and what we know about it
+
+    xlm_balance is an estimate (None until loaded) kept current by
+    subtracting the fees charged.
+    """
+
+    keypair: Keypair
+    is_hot_wallet: bool = False
+    xlm_balance: Optional[Decimal] = None
+    disabled: bool = False
+    transactions: int = 0
+    leased_at: Optional[float] = None
+
+    @property
+    def public_key(self) -> str:
+        return self.keypair.public_key
+
+
+class ChannelAccountPool:
+    """
+    Lease channel accounts as transaction sources
+
+    Args:
+        service: StellarService used for account lookups and submission
+        hot_wallet: Keypair funding payments and top-ups
+        secrets: Channel account secret seeds (empty = hot wallet only)
+        sequences: Sequence manager for the channels
+        worker_index: This process's slot (default: STELLAR_CHANNEL_WORKER_INDEX)
+        worker_count: Processes sharing the secrets (default: STELLAR_CHANNEL_WORKER_COUNT)
+
+    Usage:
+        async with pool.lease() as channel:
+            tx = TransactionBuilder(await pool.source_account(channel), ...)...build()
+            pool.sign(channel, tx)
+            response = await pool.submit(channel, tx)
+    """
+
+    def __init__(
+        self,
+        service: "StellarService",
+        hot_wallet: Keypair,
+        secrets: List[str],
+        sequences: SequenceManager,
+        worker_index: Optional[int] = None,
+        worker_count: Optional[int] = None,
+    ):
+        self.service = service
+        self.hot_wallet = hot_wallet
+        self.sequences = sequences
+        self.worker_index = (
+            settings.STELLAR_CHANNEL_WORKER_INDEX if worker_index is None else worker_index
+        )
+        self.worker_count = (
+            settings.STELLAR_CHANNEL_WORKER_COUNT if worker_count is None else worker_count
+        )
+        if not 0 <= self.worker_index < self.worker_count:
+            raise ValueError(
+                f"Channel worker index {self.worker_index} out of range for {self.worker_count} worker(s)"
+            )
+
+        if secrets:
+            keypairs = [Keypair.from_secret(secret) for secret in secrets]
+            self.channels = [
+                ChannelAccount(keypair)
+                for keypair in keypairs[self.worker_index :: self.worker_count]
+            ]
+            owned = {channel.public_key for channel in self.channels}
+            sequences.exclude(
+                keypair.public_key for keypair in keypairs if keypair.public_key not in owned
+            )
+        else:
+            self.channels = (
+                [ChannelAccount(hot_wallet, is_hot_wallet=True)] if self.worker_index == 0 else []
+            )
+            if not self.channels:
+                sequences.exclude([hot_wallet.public_key])
+        if not self.channels:
+            logger.warning(
+                f"No channel accounts for worker {self.worker_index} of {self.worker_count}: "
+                f"this process cannot submit hot wallet payments"
+            )
+
+        self._idle: asyncio.Queue = asyncio.Queue()
+        for channel in self.channels:
+            self._idle.put_nowait(channel)
+
+        self._top_ups: Dict[str, asyncio.Task] = {}
+
+    @asynccontextmanager
+    async def lease(self, timeout: Optional[float] = None) -> AsyncIterator[ChannelAccount]:
+        """
+        Hold a channel for one transaction
+
+        The channel's balance is loaded on first use. On exit it goes back
+        to the pool, or tops up first if it is running low on XLM.
+
+        Raises:
+            ChannelPoolError: This process has no channels (see worker_index)
+            ChannelLeaseTimeout: Every channel stayed busy for `timeout` seconds
+        """
+        if not self.channels:
+            raise ChannelPoolError(
+                f"No channel accounts assigned to worker {self.worker_index} of {self.worker_count}"
+            )
+        timeout = settings.STELLAR_CHANNEL_LEASE_TIMEOUT if timeout is None else timeout
+        started = time.monotonic()
+        try:
+            channel = await asyncio.wait_for(self._idle.get(), timeout)
+        except asyncio.TimeoutError:
+            metrics.increment("stellar_channel_leases_total", result="timeout")
+            raise ChannelLeaseTimeout(
+                f"No channel account free within {timeout}s ({len(self.channels)} channels)"
+            ) from None
+
+        metrics.increment("stellar_channel_leases_total", result="leased")
+        metrics.observe(
+            "stellar_channel_lease_wait_ms", (time.monotonic() - started) * 1000, _LEASE_BUCKETS_MS
+        )
+        channel.leased_at = time.monotonic()
+
+        try:
+            if channel.xlm_balance is None:
+                await self._load(channel)
+            yield channel
+        finally:
+            channel.leased_at = None
+            self._return(channel)
+
+    async def _load(self, channel: ChannelAccount) -> None:
+        """Read the channel's balance from Horizon"""
+        snapshot = await self.service.get_account_snapshot(channel.public_key)
+        if not snapshot.exists:
+            channel.disabled = True
+            raise ChannelPoolError(
+                f"Channel account {channel.public_key} does not exist on the network"
+            )
+        channel.xlm_balance = snapshot.xlm_balance
+
+    async def source_account(self, channel: ChannelAccount) -> Account:
+        """Transaction source for a leased channel, with its next sequence reserved"""
+        return await self.sequences.source_account(channel.public_key)
+
+    def _return(self, channel: ChannelAccount) -> None:
+        if channel.disabled:
+            return
+        if self._needs_top_up(channel):
+            task = asyncio.get_running_loop().create_task(self._top_up_and_return(channel))
+            self._top_ups[channel.public_key] = task
+            return
+        self._idle.put_nowait(channel)
+
+    def _needs_top_up(self, channel: ChannelAccount) -> bool:
+        return (
+            not channel.is_hot_wallet
+            and channel.xlm_balance is not None
+            and channel.xlm_balance < Decimal(str(settings.STELLAR_CHANNEL_MIN_XLM))
+        )
+
+    def _can_pay_fees(self, channel: ChannelAccount) -> bool:
+        return channel.xlm_balance is None or channel.xlm_balance > _RESERVE_XLM
+
+    async def _top_up_and_return(self, channel: ChannelAccount) -> None:
+        """Top the channel up, then return it to the pool"""
+        delay = settings.STELLAR_CHANNEL_TOP_UP_RETRY
+        try:
+            while True:
+                try:
+                    await self._top_up(channel)
+                    break
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    metrics.increment("stellar_channel_top_ups_total", result="error")
+                    logger.error(f"Channel top-up failed for {channel.public_key}: {e}")
+                    if self._can_pay_fees(channel):
+                        break  # Back into rotation anyway: it can still pay fees for a while
+                # Cannot pay its own fees: out of rotation until a top-up succeeds
+                logger.warning(
+                    f"Channel {channel.public_key} out of XLM, retrying top-up in {delay}s"
+                )
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, settings.STELLAR_CHANNEL_TOP_UP_RETRY * 10)
+        finally:
+            self._top_ups.pop(channel.public_key, None)
+            if not channel.disabled:
+                self._idle.put_nowait(channel)
+
+    async def _top_up(self, channel: ChannelAccount) -> None:
+        """Pay the channel XLM from the hot wallet, sourced by the channel itself"""
+        amount = Decimal(str(settings.STELLAR_CHANNEL_TOP_UP_XLM))
+        fee = self.service.fee_oracle.fee_for("low")
+        transaction = (
+            TransactionBuilder(
+                await self.source_account(channel), self.service.network_passphrase, base_fee=fee
+            )
+            .append_payment_op(
+                channel.public_key, Asset.native(), str(amount), source=self.hot_wallet.public_key
+            )
+            .set_timeout(settings.STELLAR_TX_TIMEOUT)
+            .build()
+        )
+        self.sign(channel, transaction)
+        if self._can_pay_fees(channel):
+            await self.submit(channel, transaction, skip_memo_required_check=True)
+        else:
+            # Too little XLM for its own fee: the hot wallet pays it
+            envelope = self.service.fee_oracle.fee_bump(transaction, self.hot_wallet, fee)
+            try:
+                await self.service.submit_with_fee_bumps(envelope, skip_memo_required_check=True)
+            except Exception as e:
+                self.sequences.report(channel.public_key, transaction.transaction.sequence, e)
+                raise
+        channel.xlm_balance = (channel.xlm_balance or Decimal("0")) + amount
+        metrics.increment("stellar_channel_top_ups_total", result="ok")
+        logger.info(f"Topped up channel {channel.public_key} with {amount} XLM")
+
+    def sign(self, channel: ChannelAccount, envelope: TransactionEnvelope) -> None:
+        """Sign as the transaction source and, for channels, as the payment source"""
+        envelope.sign(channel.keypair)
+        if not channel.is_hot_wallet:
+            envelope.sign(self.hot_wallet)
+
+    async def submit(
+        self,
+        channel: ChannelAccount,
+        envelope: TransactionEnvelope,
+        skip_memo_required_check: bool = False,
+    ) -> Dict:
+        """
+        Submit a transaction sourced from a leased channel
+
+        Stuck submissions are fee-bumped by the hot wallet (see
+        StellarService.submit_with_fee_bumps). Reports the outcome to the
+        sequence manager and tracks the channel's XLM from the fee charged.
+
+        Returns:
+            Horizon submission response
+
+        Raises:
+            stellar_sdk exceptions from the submission
+        """
+        sequence = envelope.transaction.sequence
+        try:
+            response = await self.service.submit_with_fee_bumps(envelope, skip_memo_required_check)
+        except Exception as e:
+            self.sequences.report(channel.public_key, sequence, e)
+            code = submission_result_code(e)
+            if code == _INSUFFICIENT_BALANCE and not channel.is_hot_wallet:
+                # Cannot pay fees: topped up (hot wallet paying) before its next lease
+                channel.xlm_balance = Decimal("0")
+            elif code in SEQUENCE_CONSUMED_CODES and channel.xlm_balance is not None:
+                # Failed in the ledger: fee charged (at most the max fee)
+                channel.xlm_balance -= Decimal(envelope.transaction.fee) / STROOPS_PER_XLM
+            raise
+
+        channel.transactions += 1
+        # A fee bump is paid by the hot wallet, not the channel
+        if (
+            channel.xlm_balance is not None
+            and response.get("fee_account", channel.public_key) == channel.public_key
+        ):
+            channel.xlm_balance -= Decimal(str(response.get("fee_charged", 0))) / STROOPS_PER_XLM
+        return response
+
+    async def close(self) -> None:
+        """
+        Cancel in-flight top-ups (called on shutdown)
+
+        A top-up may be cancelled after its payment was sent; that is safe
+        because nothing about it outlives the process: the next start
+        reloads each channel's balance and sequence from Horizon on first
+        use, so a top-up that landed is counted and one that did not is
+        simply retried when the channel runs low again.
+        """
+        tasks = list(self._top_ups.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def get_stats(self) -> dict:
+        """Pool state for the metrics snapshot"""
+        return {
+            "worker": f"{self.worker_index}/{self.worker_count}",
+            "size": len(self.channels),
+            "idle": self._idle.qsize(),
+            "topping_up": len(self._top_ups),
+            "hot_wallet_only": bool(self.channels) and self.channels[0].is_hot_wallet,
+            "channels": [
+                {
+                    "public_key": channel.public_key,
+                    "leased": channel.leased_at is not None,
+                    "sequence": self.sequences.last_reserved(channel.public_key),
+                    "xlm_balance": float(channel.xlm_balance)
+                    if channel.xlm_balance is not None
+                    else None,
+                    "transactions": channel.transactions,
+                }
+                for channel in self.channels
+            ],
+        }
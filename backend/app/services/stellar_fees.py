@@ -0,0 +1,215 @@
+"""
+Wani - Fee Oracle
+Per-operation fees from Horizon fee_stats, and fee-bump escalation
+
+The minimum base fee only clears when ledgers are not full. Under surge
+pricing, transactions offering less than the going rate sit in the queue
+and then expire, while always bidding high wastes money the rest of the
+time. The oracle polls /fee_stats in the background and maps an urgency
+class to a percentile of recently charged fees:
+
+    low     p10    top-ups, housekeeping
+    normal  p50    payments
+    high    p90    user is waiting
+    urgent  p99    must land in the next ledger
+
+Each fee is floored at the last ledger's base fee and capped at
+STELLAR_MAX_FEE. If the stats are stale the oracle falls back to
+STELLAR_BASE_FEE.
+
+A transaction whose fee turns out too low does not need rebuilding: a
+fee-bump envelope wraps the same signed inner transaction (same sequence,
+same signatures) with a higher fee paid by another account. Stellar Core
+only replaces a queued transaction with a fee bump offering at least 10x
+its fee, so escalate() bids that much whenever the original may still be
+queued, capped at STELLAR_MAX_FEE: a capped bump cannot replace a queued
+original, but still lands once the original drops out of the queue.
+"""
+
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING, Dict, Optional, Union
+
+from stellar_sdk import FeeBumpTransactionEnvelope, Keypair, TransactionBuilder, TransactionEnvelope
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+if TYPE_CHECKING:
+    from app.services.stellar_service import StellarService
+
+logger = logging.getLogger(__name__)
+
+# Urgency class -> fee_stats percentile of fees charged
+URGENCY_PERCENTILES: Dict[str, str] = {
+    "low": "p10",
+    "normal": "p50",
+    "high": "p90",
+    "urgent": "p99",
+}
+
+# Stellar Core requires a replacing fee bump to offer 10x the queued fee
+FEE_BUMP_REPLACEMENT_FACTOR = 10
+
+
+def inner_envelope(
+    envelope: Union[TransactionEnvelope, FeeBumpTransactionEnvelope]
+) -> TransactionEnvelope:
+    """The transaction carrying the sequence number and operations"""
+    if isinstance(envelope, FeeBumpTransactionEnvelope):
+        return envelope.transaction.inner_transaction_envelope
+    return envelope
+
+
+def inner_fee_per_op(envelope: Union[TransactionEnvelope, FeeBumpTransactionEnvelope]) -> int:
+    """Fee per operation a (possibly fee-bumped) transaction currently offers"""
+    if isinstance(envelope, FeeBumpTransactionEnvelope):
+        return envelope.transaction.base_fee
+    return envelope.transaction.fee // max(len(envelope.transaction.operations), 1)
+
+
+class FeeOracle:
+    """
+    Cached fee percentiles, refreshed from Horizon in the background
+
+    Args:
+        service: StellarService whose Horizon server is polled
+
+    Usage:
+        base_fee = fee_oracle.fee_for("normal")
+        TransactionBuilder(source, passphrase, base_fee=base_fee)
+    """
+
+    def __init__(self, service: "StellarService"):
+        self.service = service
+        self.base_fee = settings.STELLAR_BASE_FEE
+        self.percentiles: Dict[str, int] = {}
+        self.capacity_usage: Optional[float] = None
+        self.updated_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def stale(self) -> bool:
+        return (
+            self.updated_at is None
+            or time.monotonic() - self.updated_at > settings.STELLAR_FEE_STALE_AFTER
+        )
+
+    async def refresh(self) -> None:
+        """Fetch /fee_stats once"""
+        stats = await self.service.server.fee_stats().call()
+        charged = stats.get("fee_charged", {})
+        self.base_fee = int(stats.get("last_ledger_base_fee", settings.STELLAR_BASE_FEE))
+        self.percentiles = {
+            name: int(value)
+            for name, value in charged.items()
+            if name.startswith("p") or name == "mode"
+        }
+        self.capacity_usage = float(stats.get("ledger_capacity_usage", 0))
+        self.updated_at = time.monotonic()
+
+    async def _poll(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Fee stats refresh failed: {e}")
+            await asyncio.sleep(settings.STELLAR_FEE_POLL_INTERVAL)
+
+    def start(self) -> None:
+        """Start background polling (called on startup)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._poll())
+
+    async def stop(self) -> None:
+        """Stop background polling (called on shutdown)"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def fee_for(self, urgency: str = "normal") -> int:
+        """
+        Base fee per operation (stroops) for an urgency class
+
+        Args:
+            urgency: "low", "normal", "high" or "urgent"
+
+        Returns:
+            Fee per operation, between the network base fee and STELLAR_MAX_FEE
+        """
+        if urgency not in URGENCY_PERCENTILES:
+            raise ValueError(
+                f"Unknown fee urgency '{urgency}', expected one of {list(URGENCY_PERCENTILES)}"
+            )
+
+        if self.stale:
+            fee = settings.STELLAR_BASE_FEE
+        else:
+            fee = max(
+                self.percentiles.get(URGENCY_PERCENTILES[urgency], self.base_fee), self.base_fee
+            )
+        return min(fee, settings.STELLAR_MAX_FEE)
+
+    def escalate(self, current_fee_per_op: int, replacing: bool = True) -> Optional[int]:
+        """
+        Fee per operation for a fee bump of a transaction offering `current_fee_per_op`
+
+        Args:
+            current_fee_per_op: What the transaction offers now
+            replacing: The transaction may still be queued (timeout), so the
+                       bump must clear Core's 10x replacement rule; False
+                       after an outright rejection (tx_insufficient_fee)
+
+        Returns:
+            The new fee (at most STELLAR_MAX_FEE), or None if that would
+            not beat `current_fee_per_op`
+        """
+        factor = FEE_BUMP_REPLACEMENT_FACTOR if replacing else 2
+        fee = min(
+            max(current_fee_per_op * factor, self.fee_for("urgent")), settings.STELLAR_MAX_FEE
+        )
+        if fee <= current_fee_per_op:
+            logger.warning(
+                f"Fee bump disabled: {current_fee_per_op} stroops/op already at "
+                f"STELLAR_MAX_FEE ({settings.STELLAR_MAX_FEE})"
+            )
+            return None
+        return fee
+
+    def fee_bump(
+        self,
+        envelope: Union[TransactionEnvelope, FeeBumpTransactionEnvelope],
+        fee_source: Keypair,
+        fee_per_op: int,
+    ) -> FeeBumpTransactionEnvelope:
+        """
+        Wrap a signed transaction in a fee bump paid and signed by `fee_source`
+
+        A previous fee bump is unwrapped first: only the inner transaction
+        carries the sequence number and the payment signatures.
+        """
+        bumped = TransactionBuilder.build_fee_bump_transaction(
+            fee_source=fee_source.public_key,
+            base_fee=fee_per_op,
+            inner_transaction_envelope=inner_envelope(envelope),
+            network_passphrase=self.service.network_passphrase,
+        )
+        bumped.sign(fee_source)
+        return bumped
+
+    def get_stats(self) -> dict:
+        """Current fee levels for the metrics snapshot"""
+        return {
+            "stale": self.stale,
+            "base_fee": self.base_fee,
+            "ledger_capacity_usage": self.capacity_usage,
+            "fees": {urgency: self.fee_for(urgency) for urgency in URGENCY_PERCENTILES},
+            "fee_bumps": metrics.get_counter("stellar_fee_bumps_total", result="submitted"),
+        }
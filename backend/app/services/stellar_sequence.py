@@ -0,0 +1,197 @@
+"""
+Wani - Sequence Numbers
+Local sequence-number tracking for transaction source accounts
+
+Building a transaction needs the source account's next sequence number.
+Loading the account from Horizon for every transaction costs a round trip,
+so the manager keeps the last sequence it handed out per account and
+increments it under a per-account lock:
+
+    reserve(account)  -> last + 1     (Horizon only on first use or idle)
+    report(outcome)   -> keep, roll back or resync
+
+The network is the source of truth. The local value is reloaded when:
+- the account is first used (including after a process restart),
+- it has been idle for STELLAR_SEQUENCE_IDLE_TIMEOUT (someone else may
+  have submitted from it), or
+- a submission comes back tx_bad_seq.
+
+A stale value therefore costs at most one rejected submission, which is
+why nothing needs persisting across restarts. A submission with unknown
+outcome (timeout, 5xx) is assumed consumed: it most likely lands, and if
+it expires instead the next one gets tx_bad_seq and resyncs.
+
+This only holds with ONE owner process per source account. Two processes
+reserving from the same account hand out the same numbers, and a resync
+cannot tell a competitor's transaction from one of our own. Accounts owned
+elsewhere are registered with exclude() (the channel pool excludes the
+channels of the other workers) and reserve() refuses them.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, Iterable, Optional, Set
+
+from stellar_sdk import Account
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.integrations.horizon_client import submission_result_code
+
+if TYPE_CHECKING:
+    from app.services.stellar_service import StellarService
+
+logger = logging.getLogger(__name__)
+
+# Transaction result codes for which the source sequence number was consumed
+SEQUENCE_CONSUMED_CODES = frozenset({"tx_success", "tx_failed", "tx_fee_bump_inner_failed"})
+
+
+class SequenceError(Exception):
+    """Raised when a source account's sequence cannot be loaded"""
+
+    pass
+
+
+@dataclass
+class _SequenceState:
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    sequence: Optional[int] = None  # last reserved
+    used_at: float = 0.0
+
+
+class SequenceManager:
+    """
+    Hand out sequence numbers for source accounts without a Horizon round trip
+
+    Args:
+        service: StellarService used to load accounts
+        idle_timeout: Resync after this many idle seconds
+
+    Usage:
+        source = await sequences.source_account(public_key)
+        tx = TransactionBuilder(source, ...)...build()
+        try:
+            response = await service.submit_transaction(tx)
+        except Exception as e:
+            sequences.report(public_key, tx.transaction.sequence, e)
+            raise
+    """
+
+    def __init__(self, service: "StellarService", idle_timeout: Optional[float] = None):
+        self.service = service
+        self.idle_timeout = (
+            settings.STELLAR_SEQUENCE_IDLE_TIMEOUT if idle_timeout is None else idle_timeout
+        )
+        self._states: Dict[str, _SequenceState] = {}
+        self._excluded: Set[str] = set()
+
+    def exclude(self, public_keys: Iterable[str]) -> None:
+        """Refuse to reserve for accounts another process owns"""
+        self._excluded.update(public_keys)
+
+    def _state(self, public_key: str) -> _SequenceState:
+        state = self._states.get(public_key)
+        if state is None:
+            state = self._states[public_key] = _SequenceState()
+        return state
+
+    async def _sync(self, public_key: str, state: _SequenceState, reason: str) -> int:
+        snapshot = await self.service.get_account_snapshot(public_key, fresh=True)
+        if not snapshot.exists or snapshot.sequence is None:
+            raise SequenceError(f"Source account {public_key} does not exist on the network")
+
+        if state.sequence is not None and state.sequence != snapshot.sequence:
+            logger.info(
+                f"Sequence for {public_key} resynced ({reason}): {state.sequence} -> {snapshot.sequence}"
+            )
+        state.sequence = snapshot.sequence
+        metrics.increment("stellar_sequence_syncs_total", reason=reason)
+        return snapshot.sequence
+
+    async def reserve(self, public_key: str) -> int:
+        """
+        Reserve the next sequence number for a source account
+
+        Returns:
+            The sequence number the transaction must carry
+
+        Raises:
+            SequenceError: The account is owned by another process, or missing
+        """
+        if public_key in self._excluded:
+            raise SequenceError(f"Source account {public_key} belongs to another process")
+        state = self._state(public_key)
+        async with state.lock:
+            now = time.monotonic()
+            current = state.sequence
+            if current is None:
+                current = await self._sync(
+                    public_key, state, "initial" if not state.used_at else "invalidated"
+                )
+            elif now - state.used_at > self.idle_timeout:
+                current = await self._sync(public_key, state, "idle")
+            else:
+                metrics.increment("stellar_sequence_syncs_total", reason="local")
+
+            state.sequence = current + 1
+            state.used_at = now
+            return state.sequence
+
+    async def source_account(self, public_key: str) -> Account:
+        """Source for TransactionBuilder, which adds one to the sequence it is given"""
+        return Account(public_key, await self.reserve(public_key) - 1)
+
+    def report(self, public_key: str, sequence: int, error: Optional[Exception] = None) -> None:
+        """
+        Record a submission outcome
+
+        Args:
+            public_key: Transaction source account
+            sequence: Sequence number the transaction carried
+            error: Exception raised by the submission (None = success)
+        """
+        if error is None:
+            return
+        code = submission_result_code(error)
+        if code is None or code in SEQUENCE_CONSUMED_CODES:
+            return
+
+        state = self._state(public_key)
+        if code != "tx_bad_seq" and state.sequence is not None and state.sequence == sequence:
+            # Rejected before the ledger and nothing reserved since: reuse it
+            state.sequence -= 1
+        else:
+            self.invalidate(public_key)
+
+    def release(self, public_key: str, sequence: int) -> None:
+        """Give back a reserved sequence number that was never submitted"""
+        state = self._state(public_key)
+        if state.sequence is not None and state.sequence == sequence:
+            state.sequence -= 1
+        else:
+            self.invalidate(public_key)
+
+    def last_reserved(self, public_key: str) -> Optional[int]:
+        """Last sequence handed out for the account (None = not synced)"""
+        state = self._states.get(public_key)
+        return state.sequence if state else None
+
+    def invalidate(self, public_key: str) -> None:
+        """Reload the account's sequence from Horizon on next use"""
+        self._state(public_key).sequence = None
+
+    def get_stats(self) -> dict:
+        """Tracked accounts and how reservations were served"""
+        return {
+            "accounts": len(self._states),
+            "excluded": len(self._excluded),
+            "synced": sum(1 for state in self._states.values() if state.sequence is not None),
+            "local": metrics.get_counter("stellar_sequence_syncs_total", reason="local"),
+            "resyncs": {
+                reason: metrics.get_counter("stellar_sequence_syncs_total", reason=reason)
+                for reason in ("initial", "idle", "invalidated")
+            },
+        }
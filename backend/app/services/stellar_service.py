@@ -3,21 +3,204 @@ Wani - Stellar Blockchain Service
 Handles all Stellar network operations including wallet creation, payments, and balance queries
 """
 
-from stellar_sdk import Server, Keypair, TransactionBuilder, Network, Account, Asset
+from stellar_sdk import (
+    ServerAsync,
+    Keypair,
+    TransactionBuilder,
+    TransactionEnvelope,
+    FeeBumpTransactionEnvelope,
+    Network,
+    Asset,
+)
 from stellar_sdk.exceptions import (
     NotFoundError,
     BadRequestError,
     BadResponseError,
     ConnectionError as StellarConnectionError
 )
-from typing import Dict, Optional, Tuple
+from dataclasses import dataclass, field, replace
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple, Union
+from contextlib import nullcontext
 from decimal import Decimal
+import asyncio
 import logging
+import time
 
 from app.core.config import settings
+from app.core.local_cache import LocalCache, MISSING
+from app.core.metrics import metrics
+from app.core.single_flight import SingleFlight
+from app.integrations.horizon_client import (
+    HorizonRateLimitError,
+    HttpxClient,
+    TransactionFailedError,
+    submission_result_code,
+)
+from app.integrations.horizon_pool import HorizonEndpointPool
+from app.services.stellar_batcher import PaymentBatcher, PaymentResult
+from app.services.stellar_channels import ChannelAccountPool
+from app.services.stellar_fees import FeeOracle, inner_envelope, inner_fee_per_op
+from app.services.stellar_sequence import SequenceManager
 
 logger = logging.getLogger(__name__)
 
+# Balance key for lumens in AccountSnapshot.balances
+NATIVE = "native"
+
+
+def asset_key(code: str, issuer: str) -> str:
+    """Balance key for a credit asset in AccountSnapshot.balances"""
+    return f"{code}:{issuer}"
+
+
+@dataclass(frozen=True)
+class AccountSnapshot:
+    """
+    Parsed view of a Horizon account record
+
+    balances maps NATIVE / asset_key(code, issuer) to the balance, so
+    assets sharing a code but issued by different accounts stay distinct.
+
+    positions maps the same keys to the stream position (operation id,
+    effect index) the balance already reflects; streamed deltas at or
+    before it are ignored (see StellarService.apply_balance_delta).
+    """
+    public_key: str
+    exists: bool
+    sequence: Optional[int] = None
+    balances: Dict[str, Decimal] = field(default_factory=dict)
+    positions: Dict[str, Tuple[int, int]] = field(default_factory=dict)
+    usdc_key: Optional[str] = None
+    subentry_count: int = 0
+    memo_required: bool = False
+    num_sponsoring: int = 0
+    num_sponsored: int = 0
+    fetched_at: float = 0.0
+
+    @classmethod
+    def from_horizon(cls, public_key: str, record: Optional[Dict], usdc_issuer: str) -> "AccountSnapshot":
+        """Parse a Horizon account record (None = account not found)"""
+        usdc_key = asset_key("USDC", usdc_issuer)
+        if record is None:
+            return cls(public_key=public_key, exists=False, usdc_key=usdc_key, fetched_at=time.time())
+
+        balances = {}
+        positions = {}
+        for balance in record.get("balances", []):
+            if balance["asset_type"] == "native":
+                key = NATIVE
+                ledger = record.get("last_modified_ledger", 0)
+            elif "asset_code" in balance:
+                key = asset_key(balance["asset_code"], balance["asset_issuer"])
+                ledger = balance.get("last_modified_ledger", 0)
+            else:
+                continue  # liquidity pool shares
+            balances[key] = Decimal(balance["balance"])
+            # Every operation id in ledger L is below (L + 1) << 32
+            positions[key] = ((ledger + 1) << 32, 0)
+
+        return cls(
+            public_key=public_key,
+            exists=True,
+            sequence=int(record["sequence"]),
+            balances=balances,
+            positions=positions,
+            usdc_key=usdc_key,
+            subentry_count=record.get("subentry_count", 0),
+            # SEP-29: the account only accepts payments carrying a memo
+            memo_required=(record.get("data") or {}).get("config.memo_required") == "MQ==",
+            num_sponsoring=record.get("num_sponsoring", 0),
+            num_sponsored=record.get("num_sponsored", 0),
+            fetched_at=time.time(),
+        )
+
+    @property
+    def xlm_balance(self) -> Decimal:
+        return self.balances.get(NATIVE, Decimal("0"))
+
+    @property
+    def has_usdc_trustline(self) -> bool:
+        return self.usdc_key in self.balances
+
+    @property
+    def usdc_balance(self) -> Decimal:
+        if self.usdc_key is None:
+            return Decimal("0")
+        return self.balances.get(self.usdc_key, Decimal("0"))
+
+    def balances_by_code(self) -> Dict[str, Decimal]:
+        """Balances keyed by asset code, e.g. {"XLM": ..., "USDC": ...}"""
+        by_code = {}
+        for key, amount in self.balances.items():
+            by_code["XLM" if key == NATIVE else key.split(":", 1)[0]] = amount
+        return by_code
+
+
+@dataclass(frozen=True)
+class BalanceResult:
+    """One account's outcome in a bulk balance lookup"""
+    public_key: str
+    snapshot: Optional[AccountSnapshot] = None
+    error: Optional[str] = None
+    cached: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @property
+    def balances(self) -> Dict[str, Decimal]:
+        """Balances by asset code (empty for failed or unfunded accounts)"""
+        return self.snapshot.balances_by_code() if self.snapshot else {}
+
+
+@dataclass
+class BalanceBatch:
+    """
+    Result of get_balances_many
+
+    balances: accounts found on the network -> balances by asset code
+    missing: accounts that do not exist (not funded)
+    errors: accounts that could not be looked up -> reason
+    """
+    balances: Dict[str, Dict[str, Decimal]] = field(default_factory=dict)
+    missing: List[str] = field(default_factory=list)
+    errors: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def complete(self) -> bool:
+        return not self.errors
+
+
+def _retry_after_seconds(headers: Optional[Dict[str, str]]) -> Optional[float]:
+    """Seconds from a Retry-After header (None if absent or not a number)"""
+    for name, value in (headers or {}).items():
+        if name.lower() == "retry-after":
+            try:
+                return max(float(value), 0.0)
+            except (TypeError, ValueError):
+                return None
+    return None
+
+
+def touched_accounts(envelope: Union[TransactionEnvelope, FeeBumpTransactionEnvelope]) -> List[str]:
+    """Accounts whose state a transaction may change (sources and destinations)"""
+    accounts = []
+    if isinstance(envelope, FeeBumpTransactionEnvelope):
+        accounts.append(envelope.transaction.fee_source.account_id)
+        envelope = envelope.transaction.inner_transaction_envelope
+
+    transaction = envelope.transaction
+    accounts.append(transaction.source.account_id)
+    for operation in transaction.operations:
+        if operation.source is not None:
+            accounts.append(operation.source.account_id)
+        destination = getattr(operation, "destination", None)
+        if destination is not None:
+            accounts.append(getattr(destination, "account_id", destination))
+
+    return list(dict.fromkeys(accounts))
+
 
 class StellarService:
     """
@@ -35,7 +218,13 @@ class StellarService:
         """Initialize Stellar service with Horizon server connection"""
         self.horizon_url = settings.STELLAR_HORIZON_URL
         self.network = settings.STELLAR_NETWORK
-        self.server = Server(horizon_url=self.horizon_url)
+
+        # Async Horizon client over a shared, pooled HTTP client, routed
+        # across STELLAR_HORIZON_URLS when more than one instance is set
+        horizon_urls = settings.get_stellar_horizon_urls()
+        self.horizon_endpoints = HorizonEndpointPool(horizon_urls) if len(horizon_urls) > 1 else None
+        self.http_client = HttpxClient(endpoints=self.horizon_endpoints)
+        self.server = ServerAsync(horizon_url=self.horizon_url, client=self.http_client)
 
         # Set network passphrase based on configuration
         if self.network == "testnet":
@@ -47,11 +236,75 @@ class StellarService:
         self.usdc_issuer = settings.STELLAR_USDC_ISSUER
         self.usdc_asset = Asset("USDC", self.usdc_issuer)
 
+        # Short-lived account snapshots; concurrent misses share one fetch
+        self._snapshots = LocalCache(
+            max_entries=settings.STELLAR_SNAPSHOT_MAX_ENTRIES,
+            default_ttl=settings.STELLAR_SNAPSHOT_TTL,
+        )
+        self._snapshot_flight = SingleFlight()
+        self._snapshot_generation: Dict[str, int] = {}
+
+        # Accounts whose snapshots the balance stream keeps up to date
+        self.streamed_accounts: Set[str] = set()
+
+        # Fee levels from Horizon fee_stats (polled after startup)
+        self.fee_oracle = FeeOracle(self)
+
+        # Locally tracked sequence numbers for transaction source accounts
+        self.sequences = SequenceManager(self)
+
+        # Transaction sources for hot wallet payments (built on first use)
+        self._hot_wallet: Optional[Keypair] = None
+        self._channel_pool: Optional[ChannelAccountPool] = None
+
+        # Micro-batches memo-less payments into multi-op transactions
+        self.payment_batcher = PaymentBatcher(self)
+
         logger.info(
             f"StellarService initialized - Network: {self.network}, "
             f"Horizon: {self.horizon_url}"
         )
 
+    async def startup(self) -> None:
+        """
+        Open the Horizon connection pool
+        Called on application startup
+        """
+        await self.http_client.open()
+        self.fee_oracle.start()
+
+    async def close(self) -> None:
+        """
+        Close the Horizon connection pool
+        Called on application shutdown
+        """
+        await self.payment_batcher.close()
+        await self.fee_oracle.stop()
+        if self._channel_pool is not None:
+            await self._channel_pool.close()
+        await self.http_client.close()
+        logger.info("🔌 Horizon HTTP client closed")
+
+    @property
+    def hot_wallet(self) -> Keypair:
+        """Hot wallet keypair (funds outgoing payments)"""
+        if self._hot_wallet is None:
+            self._hot_wallet = Keypair.from_secret(settings.STELLAR_HOT_WALLET_SECRET)
+        return self._hot_wallet
+
+    @property
+    def channel_pool(self) -> ChannelAccountPool:
+        """Channel accounts sourcing hot wallet transactions"""
+        if self._channel_pool is None:
+            self._channel_pool = ChannelAccountPool(
+                self, self.hot_wallet, settings.get_stellar_channel_secrets(), self.sequences
+            )
+        return self._channel_pool
+
+    def get_channel_stats(self) -> dict:
+        """Channel pool state for the metrics snapshot"""
+        return self._channel_pool.get_stats() if self._channel_pool is not None else {}
+
     async def create_wallet(self) -> Tuple[str, str]:
         """
         Create a new Stellar wallet (keypair)
@@ -75,21 +328,21 @@ class StellarService:
             logger.error(f"Failed to create wallet: {str(e)}")
             raise Exception("Failed to create Stellar wallet") from e
 
-    async def get_account(self, public_key: str) -> Optional[Account]:
+    async def get_account(self, public_key: str) -> Optional[Dict]:
         """
-        Get account details from Stellar network
+        Get account details from Stellar network (uncached)
 
         Args:
             public_key: Stellar public key (G...)
 
         Returns:
-            Account object if exists, None if not found
+            Horizon account record if exists, None if not found
 
         Raises:
             Exception: If network error occurs
         """
         try:
-            account = self.server.accounts().account_id(public_key).call()
+            account: Dict = await self.server.accounts().account_id(public_key).call()
             return account
 
         except NotFoundError:
@@ -100,6 +353,312 @@ class StellarService:
             logger.error(f"Error fetching account {public_key}: {str(e)}")
             raise Exception("Failed to fetch account from Stellar network") from e
 
+    async def get_account_snapshot(self, public_key: str, fresh: bool = False) -> AccountSnapshot:
+        """
+        Get a parsed account snapshot, fetched at most once per TTL
+
+        Concurrent callers for the same account share one Horizon request.
+
+        Args:
+            public_key: Stellar public key
+            fresh: Bypass the cache and refetch
+
+        Returns:
+            AccountSnapshot (exists=False if the account is not on the network)
+
+        Raises:
+            Exception: If network error occurs
+        """
+        if not fresh:
+            cached = self._snapshots.get(public_key)
+            if cached is not MISSING:
+                metrics.increment("stellar_snapshot_lookups_total", result="hit")
+                snapshot: AccountSnapshot = cached
+                return snapshot
+
+        metrics.increment("stellar_snapshot_lookups_total", result="miss")
+        # Keyed by generation: a fetch started before an invalidation is not joined
+        generation = self._snapshot_generation.get(public_key, 0)
+        return await self._snapshot_flight.do(
+            (public_key, generation), lambda: self._fetch_snapshot(public_key, generation)
+        )
+
+    async def _fetch_snapshot(self, public_key: str, generation: int) -> AccountSnapshot:
+        record = await self.get_account(public_key)
+        snapshot = AccountSnapshot.from_horizon(public_key, record, self.usdc_issuer)
+
+        # Don't cache a response that raced with an invalidation
+        if self._snapshot_generation.get(public_key, 0) == generation:
+            self._snapshots.set(public_key, snapshot, ttl=self._snapshot_ttl(public_key))
+        return snapshot
+
+    def _snapshot_ttl(self, public_key: str) -> float:
+        """Streamed accounts are kept coherent by deltas, so they live longer"""
+        if public_key in self.streamed_accounts:
+            return settings.STELLAR_STREAM_SNAPSHOT_TTL
+        return settings.STELLAR_SNAPSHOT_TTL
+
+    def apply_balance_delta(
+        self,
+        public_key: str,
+        balance_key: str,
+        delta: Decimal,
+        position: Tuple[int, int],
+    ) -> bool:
+        """
+        Apply a streamed balance change to the cached snapshot
+
+        Args:
+            public_key: Account whose balance changed
+            balance_key: NATIVE or asset_key(code, issuer)
+            delta: Signed amount
+            position: (operation id, effect index) of the change
+
+        Returns:
+            True if the cached snapshot was updated; False if nothing was
+            cached or it already reflects this change. An unknown balance
+            line (e.g. trustline created after the fetch) invalidates.
+        """
+        snapshot = self._snapshots.get(public_key)
+        if snapshot is MISSING or not snapshot.exists:
+            return False
+
+        if balance_key not in snapshot.balances:
+            self.invalidate_account(public_key)
+            return False
+
+        if position <= snapshot.positions.get(balance_key, (0, 0)):
+            return False
+
+        updated = replace(
+            snapshot,
+            balances={**snapshot.balances, balance_key: snapshot.balances[balance_key] + delta},
+            positions={**snapshot.positions, balance_key: position},
+        )
+        self._snapshots.set(public_key, updated, ttl=self._snapshot_ttl(public_key))
+        self._snapshot_generation[public_key] = self._snapshot_generation.get(public_key, 0) + 1
+        return True
+
+    def invalidate_account(self, *public_keys: str) -> None:
+        """
+        Drop cached snapshots, e.g. after submitting a transaction
+
+        Args:
+            *public_keys: Accounts whose state may have changed
+        """
+        for public_key in public_keys:
+            self._snapshots.delete(public_key)
+            self._snapshot_generation[public_key] = self._snapshot_generation.get(public_key, 0) + 1
+
+    async def submit_transaction(
+        self,
+        envelope: Union[TransactionEnvelope, FeeBumpTransactionEnvelope],
+        skip_memo_required_check: bool = False,
+    ) -> Dict:
+        """
+        Submit a signed transaction and invalidate every account it touches
+
+        Args:
+            envelope: Signed transaction (or fee bump) envelope
+            skip_memo_required_check: The caller already checked SEP-29
+                memo requirements (saves one account load per destination)
+
+        Returns:
+            Horizon submission response
+
+        Raises:
+            stellar_sdk exceptions from the submission
+        """
+        try:
+            return await self.server.submit_transaction(
+                envelope, skip_memo_required_check=skip_memo_required_check
+            )
+        finally:
+            # Even a failed submission consumes the source sequence number
+            self.invalidate_account(*touched_accounts(envelope))
+
+    async def send_usdc_payment(
+        self,
+        destination: str,
+        amount: Decimal,
+        memo: Optional[str] = None,
+        urgency: str = "normal",
+    ) -> Dict:
+        """
+        Send USDC from the hot wallet
+
+        The transaction is sourced from a leased channel account, so
+        payments do not queue behind each other's sequence numbers. A
+        tx_bad_seq rejection is retried once with a resynced sequence.
+
+        Args:
+            destination: Recipient public key (must trust USDC)
+            amount: USDC amount
+            memo: Optional text memo (max 28 bytes)
+            urgency: Fee class ("low", "normal", "high", "urgent")
+
+        Returns:
+            Horizon submission response (includes "hash")
+
+        Raises:
+            ChannelLeaseTimeout: No channel account free
+            stellar_sdk exceptions from the submission
+        """
+        pool = self.channel_pool
+        async with pool.lease() as channel:
+            for attempt in range(2):
+                builder = TransactionBuilder(
+                    await pool.source_account(channel),
+                    self.network_passphrase,
+                    base_fee=self.fee_oracle.fee_for(urgency),
+                ).append_payment_op(
+                    destination, self.usdc_asset, str(amount), source=self.hot_wallet.public_key
+                )
+                if memo:
+                    builder.add_text_memo(memo)
+                transaction = builder.set_timeout(settings.STELLAR_TX_TIMEOUT).build()
+                pool.sign(channel, transaction)
+
+                try:
+                    response = await pool.submit(channel, transaction)
+                    break
+                except Exception as e:
+                    if attempt == 0 and submission_result_code(e) == "tx_bad_seq":
+                        logger.warning(f"Stale sequence for {channel.public_key}, retrying payment")
+                        continue
+                    logger.error(f"USDC payment of {amount} to {destination} failed: {str(e)}")
+                    raise
+
+        logger.info(f"Sent {amount} USDC to {destination} (tx {response.get('hash')})")
+        return response
+
+    async def queue_usdc_payment(self, destination: str, amount: Decimal) -> PaymentResult:
+        """
+        Send USDC from the hot wallet in the next payment batch
+
+        Cheaper than send_usdc_payment under load: up to
+        STELLAR_BATCH_MAX_OPS payments share one transaction. No memo.
+
+        Args:
+            destination: Recipient public key (must trust USDC)
+            amount: USDC amount
+
+        Returns:
+            PaymentResult (transaction hash and operation index)
+
+        Raises:
+            PaymentRejectedError: This payment failed; the rest of its batch did not
+            PaymentOutcomeUnknownError: Its transaction may still land; do not resend
+        """
+        return await self.payment_batcher.pay(destination, amount)
+
+    def pinned_endpoint(self, transaction_hash: str):
+        """
+        Context manager sending Horizon requests about one transaction to
+        the same Horizon instance (no-op with a single STELLAR_HORIZON_URL)
+
+        Instances can lag each other by a ledger; a submission and the
+        lookups deciding its outcome must not see different ledgers.
+        """
+        if self.horizon_endpoints is None:
+            return nullcontext()
+        return self.horizon_endpoints.pinned(transaction_hash)
+
+    async def get_transaction(self, transaction_hash: str) -> Optional[Dict]:
+        """
+        Look up a transaction by hash (also matches the inner hash of a fee bump)
+
+        Returns:
+            Horizon transaction record, or None if it is not in a ledger
+        """
+        try:
+            record: Dict = await self.server.transactions().transaction(transaction_hash).call()
+        except NotFoundError:
+            return None
+        return record
+
+    async def submit_with_fee_bumps(
+        self,
+        envelope: Union[TransactionEnvelope, FeeBumpTransactionEnvelope],
+        skip_memo_required_check: bool = False,
+    ) -> Dict:
+        """
+        Submit a transaction, fee-bumping it while it is stuck on its fee
+
+        On tx_insufficient_fee, or when the submission times out (it may
+        be sitting in the queue under surge pricing), the same signed
+        transaction is wrapped in a fee bump paid by the hot wallet at an
+        escalated fee and resubmitted, up to STELLAR_FEE_BUMP_ATTEMPTS
+        times. It is never rebuilt, so the sequence number is unchanged
+        and it cannot be applied twice.
+
+        After a timeout the inner hash is looked up first: if the
+        transaction landed meanwhile, its record is returned instead of
+        bumping (a bump would only come back tx_bad_seq).
+
+        Args:
+            envelope: Signed transaction (or fee bump) envelope
+            skip_memo_required_check: See submit_transaction
+
+        Returns:
+            Horizon submission response, or the transaction record if a
+            timed-out submission turned out to have succeeded
+
+        Raises:
+            TransactionFailedError: A timed-out submission landed and failed
+            stellar_sdk exceptions from the last submission
+        """
+        inner_hash = inner_envelope(envelope).hash_hex()
+
+        # Submit, bumps and landed checks all go to one Horizon instance
+        with self.pinned_endpoint(inner_hash):
+            current = envelope
+            timed_out_before = False
+
+            for attempt in range(settings.STELLAR_FEE_BUMP_ATTEMPTS + 1):
+                try:
+                    return await self.submit_transaction(current, skip_memo_required_check)
+                except Exception as e:
+                    code = submission_result_code(e)
+                    timed_out = code is None and (
+                        isinstance(e, StellarConnectionError)
+                        or (isinstance(e, BadResponseError) and e.status == 504)
+                    )
+
+                    if timed_out or (code == "tx_bad_seq" and timed_out_before):
+                        landed = await self.get_transaction(inner_hash)
+                        if landed is not None and landed.get("successful"):
+                            return landed
+                        if landed is not None:
+                            raise TransactionFailedError(landed) from e
+                        if code == "tx_bad_seq":
+                            # Sequence consumed, but not visibly by this transaction (yet):
+                            # report unknown so callers do not rebuild and pay twice
+                            raise StellarConnectionError(
+                                f"Outcome of transaction {inner_hash} unknown after timeout"
+                            ) from e
+                    timed_out_before = timed_out_before or timed_out
+
+                    if attempt == settings.STELLAR_FEE_BUMP_ATTEMPTS or not (
+                        code == "tx_insufficient_fee" or timed_out
+                    ):
+                        raise
+
+                    fee = self.fee_oracle.escalate(inner_fee_per_op(current), replacing=timed_out)
+                    if fee is None:
+                        metrics.increment("stellar_fee_bumps_total", result="capped")
+                        raise
+
+                    logger.warning(
+                        f"Transaction {inner_hash} stuck ({code or type(e).__name__}), "
+                        f"fee-bumping to {fee} stroops/op (attempt {attempt + 1})"
+                    )
+                    current = self.fee_oracle.fee_bump(current, self.hot_wallet, fee)
+                    metrics.increment("stellar_fee_bumps_total", result="submitted")
+
+        # The last attempt always returns or raises
+        raise RuntimeError(f"Fee bump attempts exhausted for transaction {inner_hash}")
+
     async def is_account_funded(self, public_key: str) -> bool:
         """
         Check if a Stellar account exists and is funded
@@ -110,8 +669,8 @@ class StellarService:
         Returns:
             bool: True if account exists on network, False otherwise
         """
-        account = await self.get_account(public_key)
-        return account is not None
+        snapshot = await self.get_account_snapshot(public_key)
+        return snapshot.exists
 
     async def get_xlm_balance(self, public_key: str) -> Decimal:
         """
@@ -124,17 +683,8 @@ class StellarService:
             Decimal: XLM balance (0 if account not found)
         """
         try:
-            account = await self.get_account(public_key)
-
-            if not account:
-                return Decimal("0")
-
-            # Find native (XLM) balance
-            for balance in account["balances"]:
-                if balance["asset_type"] == "native":
-                    return Decimal(balance["balance"])
-
-            return Decimal("0")
+            snapshot = await self.get_account_snapshot(public_key)
+            return snapshot.xlm_balance
 
         except Exception as e:
             logger.error(f"Error getting XLM balance for {public_key}: {str(e)}")
@@ -151,21 +701,8 @@ class StellarService:
             Decimal: USDC balance (0 if account not found or no USDC trustline)
         """
         try:
-            account = await self.get_account(public_key)
-
-            if not account:
-                return Decimal("0")
-
-            # Find USDC balance
-            for balance in account["balances"]:
-                if (
-                    balance["asset_type"] != "native"
-                    and balance.get("asset_code") == "USDC"
-                    and balance.get("asset_issuer") == self.usdc_issuer
-                ):
-                    return Decimal(balance["balance"])
-
-            return Decimal("0")
+            snapshot = await self.get_account_snapshot(public_key)
+            return snapshot.usdc_balance
 
         except Exception as e:
             logger.error(f"Error getting USDC balance for {public_key}: {str(e)}")
@@ -183,25 +720,120 @@ class StellarService:
             Example: {"XLM": Decimal("100.50"), "USDC": Decimal("50.00")}
         """
         try:
-            account = await self.get_account(public_key)
+            snapshot = await self.get_account_snapshot(public_key)
+            return snapshot.balances_by_code()
 
-            if not account:
-                return {}
+        except Exception as e:
+            logger.error(f"Error getting balances for {public_key}: {str(e)}")
+            raise
 
-            balances = {}
+    async def iter_balances_many(
+        self,
+        public_keys: Iterable[str],
+        concurrency: Optional[int] = None,
+        fresh: bool = False,
+    ) -> AsyncIterator[BalanceResult]:
+        """
+        Look up many accounts, yielding each result as soon as it is ready
 
-            for balance in account["balances"]:
-                if balance["asset_type"] == "native":
-                    balances["XLM"] = Decimal(balance["balance"])
-                else:
-                    asset_code = balance.get("asset_code", "UNKNOWN")
-                    balances[asset_code] = Decimal(balance["balance"])
+        Cached snapshots are yielded first without a request; the rest are
+        fetched by at most `concurrency` workers over the shared Horizon
+        client, whose per-host rate limiter paces them (a lookup it turns
+        away for waiting too long is retried). A failed account
+        yields a BalanceResult with `error` set and does not stop the rest.
+        Closing the iterator early cancels outstanding fetches.
 
-            return balances
+        Args:
+            public_keys: Stellar public keys (duplicates are looked up once)
+            concurrency: Max requests in flight (default STELLAR_BULK_CONCURRENCY)
+            fresh: Bypass the snapshot cache
 
-        except Exception as e:
-            logger.error(f"Error getting balances for {public_key}: {str(e)}")
-            raise
+        Yields:
+            BalanceResult per distinct key, in completion order
+        """
+        pending = []
+        for public_key in dict.fromkeys(public_keys):
+            if not self.validate_public_key(public_key):
+                metrics.increment("stellar_bulk_lookups_total", result="invalid")
+                yield BalanceResult(public_key, error="Invalid Stellar public key")
+                continue
+
+            snapshot = MISSING if fresh else self._snapshots.get(public_key)
+            if snapshot is MISSING:
+                pending.append(public_key)
+            else:
+                metrics.increment("stellar_bulk_lookups_total", result="cached")
+                yield BalanceResult(public_key, snapshot=snapshot, cached=True)
+
+        if not pending:
+            return
+
+        queue = iter(pending)
+        results: asyncio.Queue = asyncio.Queue()
+
+        async def worker() -> None:
+            for public_key in queue:
+                try:
+                    while True:
+                        try:
+                            snapshot = await self.get_account_snapshot(public_key, fresh=fresh)
+                            break
+                        except Exception as e:
+                            if not isinstance(e.__cause__ or e, HorizonRateLimitError):
+                                raise
+                            # Host saturated: bulk work waits its turn rather than failing
+                            await asyncio.sleep(self.http_client.rate_limiter.max_wait)
+                    metrics.increment("stellar_bulk_lookups_total", result="fetched")
+                    await results.put(BalanceResult(public_key, snapshot=snapshot))
+                except Exception as e:
+                    metrics.increment("stellar_bulk_lookups_total", result="error")
+                    cause = e.__cause__ or e
+                    await results.put(BalanceResult(public_key, error=f"{type(cause).__name__}: {cause}"))
+
+        workers = [
+            asyncio.create_task(worker())
+            for _ in range(min(concurrency or settings.STELLAR_BULK_CONCURRENCY, len(pending)))
+        ]
+        try:
+            for _ in range(len(pending)):
+                yield await results.get()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    async def get_balances_many(
+        self,
+        public_keys: Iterable[str],
+        concurrency: Optional[int] = None,
+        fresh: bool = False,
+    ) -> BalanceBatch:
+        """
+        Get balances for many accounts, reporting failures per account
+
+        Args:
+            public_keys: Stellar public keys
+            concurrency: Max requests in flight (default STELLAR_BULK_CONCURRENCY)
+            fresh: Bypass the snapshot cache
+
+        Returns:
+            BalanceBatch with balances, unfunded accounts and per-account errors
+        """
+        batch = BalanceBatch()
+        async for result in self.iter_balances_many(public_keys, concurrency, fresh):
+            if result.error is not None or result.snapshot is None:
+                batch.errors[result.public_key] = result.error or "no snapshot"
+            elif not result.snapshot.exists:
+                batch.missing.append(result.public_key)
+            else:
+                batch.balances[result.public_key] = result.balances
+
+        if batch.errors:
+            logger.warning(
+                f"Bulk balance lookup: {len(batch.errors)} of "
+                f"{len(batch.errors) + len(batch.balances) + len(batch.missing)} accounts failed"
+            )
+        return batch
 
     async def has_usdc_trustline(self, public_key: str) -> bool:
         """
@@ -214,20 +846,8 @@ class StellarService:
             bool: True if USDC trustline exists
         """
         try:
-            account = await self.get_account(public_key)
-
-            if not account:
-                return False
-
-            for balance in account["balances"]:
-                if (
-                    balance["asset_type"] != "native"
-                    and balance.get("asset_code") == "USDC"
-                    and balance.get("asset_issuer") == self.usdc_issuer
-                ):
-                    return True
-
-            return False
+            snapshot = await self.get_account_snapshot(public_key)
+            return snapshot.has_usdc_trustline
 
         except Exception as e:
             logger.error(f"Error checking USDC trustline for {public_key}: {str(e)}")
@@ -269,6 +889,12 @@ class StellarService:
         """
         Fund a testnet account using Friendbot (TESTNET ONLY)
 
+        Goes through the shared Horizon HTTP client. Rate limits (429),
+        timeouts and 5xx are retried up to STELLAR_FRIENDBOT_RETRIES times
+        with exponential backoff (or Retry-After). Friendbot often times out
+        after funding, so the account is looked up before each retry, and an
+        account that already exists counts as funded.
+
         Args:
             public_key: Stellar public key to fund
 
@@ -281,15 +907,45 @@ class StellarService:
         if self.network != "testnet":
             raise Exception("Friendbot only available on testnet")
 
+        backoff = 1.0
         try:
-            import requests
-            friendbot_url = f"https://friendbot.stellar.org?addr={public_key}"
-            response = requests.get(friendbot_url)
-            response.raise_for_status()
-            logger.info(f"Funded testnet account: {public_key}")
-            return True
+            for attempt in range(settings.STELLAR_FRIENDBOT_RETRIES + 1):
+                retry_after = None
+                try:
+                    response = await self.http_client.get(
+                        settings.STELLAR_FRIENDBOT_URL, params={"addr": public_key}
+                    )
+                except StellarConnectionError as e:
+                    error = f"Friendbot request failed: {e}"
+                else:
+                    if response.status_code < 400 or "op_already_exists" in response.text:
+                        self.invalidate_account(public_key)
+                        metrics.increment("stellar_friendbot_requests_total", result="funded")
+                        logger.info(f"Funded testnet account: {public_key}")
+                        return True
+                    error = f"Friendbot returned {response.status_code}: {response.text}"
+                    if response.status_code != 429 and response.status_code < 500:
+                        raise Exception(error)
+                    retry_after = _retry_after_seconds(response.headers)
+
+                if attempt == settings.STELLAR_FRIENDBOT_RETRIES:
+                    raise Exception(error)
+
+                # The previous request may have funded it before failing
+                if retry_after is None and (await self.get_account_snapshot(public_key, fresh=True)).exists:
+                    metrics.increment("stellar_friendbot_requests_total", result="funded")
+                    logger.info(f"Funded testnet account: {public_key}")
+                    return True
+
+                delay = retry_after or backoff
+                metrics.increment("stellar_friendbot_requests_total", result="retried")
+                logger.warning(f"{error}; retrying funding of {public_key} in {delay}s")
+                await asyncio.sleep(delay)
+                backoff = min(backoff * 2, 30.0)
 
+            raise Exception(f"Friendbot retries exhausted for {public_key}")
         except Exception as e:
+            metrics.increment("stellar_friendbot_requests_total", result="failed")
             logger.error(f"Failed to fund testnet account {public_key}: {str(e)}")
             raise Exception("Failed to fund testnet account") from e
 
@@ -304,9 +960,9 @@ class StellarService:
             Dict with account details including balances, sequence, etc.
         """
         try:
-            account = await self.get_account(public_key)
+            snapshot = await self.get_account_snapshot(public_key)
 
-            if not account:
+            if not snapshot.exists:
                 return {
                     "exists": False,
                     "public_key": public_key,
@@ -314,18 +970,15 @@ class StellarService:
                     "sequence": None
                 }
 
-            balances = await self.get_all_balances(public_key)
-            has_usdc = await self.has_usdc_trustline(public_key)
-
             return {
                 "exists": True,
                 "public_key": public_key,
-                "balances": balances,
-                "sequence": account.get("sequence"),
-                "has_usdc_trustline": has_usdc,
-                "subentry_count": account.get("subentry_count", 0),
-                "num_sponsoring": account.get("num_sponsoring", 0),
-                "num_sponsored": account.get("num_sponsored", 0)
+                "balances": snapshot.balances_by_code(),
+                "sequence": str(snapshot.sequence),
+                "has_usdc_trustline": snapshot.has_usdc_trustline,
+                "subentry_count": snapshot.subentry_count,
+                "num_sponsoring": snapshot.num_sponsoring,
+                "num_sponsored": snapshot.num_sponsored
             }
 
         except Exception as e:
@@ -335,3 +988,10 @@ class StellarService:
 
 # Create singleton instance
 stellar_service = StellarService()
+
+metrics.register_collector("stellar_channels", stellar_service.get_channel_stats)
+metrics.register_collector("stellar_sequences", stellar_service.sequences.get_stats)
+metrics.register_collector("stellar_batches", stellar_service.payment_batcher.get_stats)
+metrics.register_collector("stellar_fees", stellar_service.fee_oracle.get_stats)
+if stellar_service.horizon_endpoints is not None:
+    metrics.register_collector("horizon_endpoints", stellar_service.horizon_endpoints.get_stats)
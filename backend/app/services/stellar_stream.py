@@ -0,0 +1,283 @@
+"""
+Wani - Balance Streaming
+Keeps StellarService account snapshots current from Horizon's effects stream
+
+Polling Horizon per wallet costs one request per account per TTL. Instead
+one connection follows the network-wide `effects` stream and filters it
+against the set of watched accounts (the hot wallet plus whatever callers
+watch()), so the cost no longer grows with the number of users:
+
+    account_credited        -> delta applied to the cached balance
+    any other effect        -> snapshot invalidated and refetched
+                               (debits, trades, trustline/account changes)
+
+Deltas carry their stream position (operation id, effect index) and
+AccountSnapshot records the position each balance already reflects, so
+replayed or out-of-order events are ignored rather than double-counted.
+
+While connected, watched snapshots live for STELLAR_STREAM_SNAPSHOT_TTL
+instead of STELLAR_SNAPSHOT_TTL. Transaction fees produce no effects, so
+that TTL bounds the drift from fees paid by transactions we did not submit
+(our own submissions invalidate via StellarService.submit_transaction).
+When the stream drops, watched snapshots are invalidated and fall back to
+the short TTL until it is back.
+
+The cursor is persisted in Redis so a restart resumes where the last
+process stopped. Point STELLAR_HORIZON_URL at a local SSE server to run it
+without a network.
+"""
+
+import asyncio
+import functools
+import logging
+import time
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, Optional, Set, Tuple
+
+from stellar_sdk import Keypair
+from stellar_sdk.exceptions import ConnectionError
+
+from app.core.cache import cache_get, cache_set, get_stream_cursor_key
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.integrations.horizon_client import HorizonStreamError
+from app.services.stellar_service import NATIVE, StellarService, asset_key, stellar_service
+
+logger = logging.getLogger(__name__)
+
+STREAM_NAME = "effects"
+
+
+def effect_position(effect: Dict[str, Any]) -> Optional[Tuple[int, int]]:
+    """(operation id, effect index) from a paging token such as '1234-1'"""
+    try:
+        operation_id, _, index = effect["paging_token"].partition("-")
+        return int(operation_id), int(index or 0)
+    except (KeyError, AttributeError, ValueError):
+        return None
+
+
+def effect_balance_key(effect: Dict[str, Any]) -> Optional[str]:
+    """Snapshot balance key for the asset an effect refers to"""
+    if effect.get("asset_type") == "native":
+        return NATIVE
+    if effect.get("asset_code") and effect.get("asset_issuer"):
+        return asset_key(effect["asset_code"], effect["asset_issuer"])
+    return None
+
+
+class BalanceStreamer:
+    """
+    Applies Horizon effects for watched accounts to the snapshot cache
+
+    Args:
+        service: StellarService whose snapshots are kept current
+
+    Usage:
+        balance_streamer.watch(wallet_public_key)
+        balance_streamer.start()
+        ...
+        await balance_streamer.stop()
+    """
+
+    def __init__(self, service: StellarService):
+        self.service = service
+        self.watched: Set[str] = set()
+        self.cursor: Optional[str] = None
+        self.connected = False
+        self.last_event_at: Optional[float] = None
+
+        self._task: Optional[asyncio.Task] = None
+        self._refreshes: Dict[str, asyncio.Task] = {}
+        self._cursor_flushed_at = 0.0
+        self._cursor_dirty = False
+
+    def watch(self, *public_keys: str) -> None:
+        """Follow these accounts' balances"""
+        self.watched.update(public_keys)
+        if self.connected:
+            self.service.streamed_accounts.update(public_keys)
+
+    def unwatch(self, *public_keys: str) -> None:
+        """Stop following these accounts (their snapshots revert to the short TTL)"""
+        for public_key in public_keys:
+            self.watched.discard(public_key)
+            self.service.streamed_accounts.discard(public_key)
+
+    def _watch_hot_wallet(self) -> None:
+        try:
+            self.watch(Keypair.from_secret(settings.STELLAR_HOT_WALLET_SECRET).public_key)
+        except Exception:
+            logger.warning(
+                "Hot wallet secret is not a plain Stellar seed; not streaming its balance"
+            )
+
+    def _set_connected(self, connected: bool) -> None:
+        if connected == self.connected:
+            return
+        self.connected = connected
+        if connected:
+            self.service.streamed_accounts.update(self.watched)
+        else:
+            # Events are no longer arriving: cached balances may go stale
+            self.service.streamed_accounts.clear()
+            self.service.invalidate_account(*self.watched)
+
+    async def _load_cursor(self) -> str:
+        if self.cursor is None:
+            self.cursor = await cache_get(get_stream_cursor_key(STREAM_NAME))
+        return self.cursor or "now"
+
+    async def _flush_cursor(self, force: bool = False) -> None:
+        if not self._cursor_dirty or self.cursor is None:
+            return
+        now = time.monotonic()
+        if (
+            not force
+            and now - self._cursor_flushed_at < settings.STELLAR_STREAM_CURSOR_FLUSH_INTERVAL
+        ):
+            return
+        self._cursor_flushed_at = now
+        if await cache_set(get_stream_cursor_key(STREAM_NAME), self.cursor):
+            self._cursor_dirty = False
+
+    def _refresh(self, public_key: str) -> None:
+        """Refetch an invalidated watched snapshot in the background"""
+        task = self._refreshes.get(public_key)
+        if task is not None and not task.done():
+            return
+        task = asyncio.get_running_loop().create_task(self.service.get_account_snapshot(public_key))
+        task.add_done_callback(functools.partial(self._refresh_done, public_key))
+        self._refreshes[public_key] = task
+
+    def _refresh_done(self, public_key: str, task: asyncio.Task) -> None:
+        if self._refreshes.get(public_key) is task:
+            del self._refreshes[public_key]
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Balance refresh failed for {public_key}: {task.exception()}")
+
+    def handle_effect(self, effect: Dict[str, Any]) -> str:
+        """
+        Apply one effect to the snapshot cache
+
+        Args:
+            effect: Effect record from Horizon
+
+        Returns:
+            "skipped" (not watched), "applied", "ignored" (already
+            reflected or not cached) or "invalidated"
+        """
+        if effect.get("paging_token"):
+            self.cursor = effect["paging_token"]
+            self._cursor_dirty = True
+
+        public_key = effect.get("account")
+        if public_key not in self.watched:
+            return "skipped"
+
+        position = effect_position(effect)
+        balance_key = effect_balance_key(effect)
+        if effect.get("type") == "account_credited" and position and balance_key:
+            try:
+                amount = Decimal(effect["amount"])
+            except (KeyError, InvalidOperation):
+                amount = None
+            if amount is not None:
+                applied = self.service.apply_balance_delta(
+                    public_key, balance_key, amount, position
+                )
+                return "applied" if applied else "ignored"
+
+        self.service.invalidate_account(public_key)
+        self._refresh(public_key)
+        return "invalidated"
+
+    async def _consume(self) -> None:
+        """Read the stream until it closes or fails"""
+        url = f"{self.service.horizon_url.rstrip('/')}/{STREAM_NAME}"
+        params = {"cursor": await self._load_cursor()}
+
+        async for effect in self.service.http_client.stream(url, params, reconnect=False):
+            self._set_connected(True)
+            result = self.handle_effect(effect)
+            self.last_event_at = time.monotonic()
+            if result != "skipped":
+                metrics.increment("stellar_stream_events_total", result=result)
+            await self._flush_cursor()
+
+    async def _run(self) -> None:
+        """Consume the stream, reconnecting with exponential backoff"""
+        backoff = 1.0
+        while True:
+            last_event_at = self.last_event_at
+            try:
+                await self._consume()
+            except asyncio.CancelledError:
+                raise
+            except HorizonStreamError as e:
+                if e.status_code < 500:
+                    # Usually a cursor older than Horizon's history: start over
+                    logger.warning(f"Horizon rejected the effects stream, restarting from now: {e}")
+                    self.cursor = "now"
+                    self._cursor_dirty = True
+                else:
+                    logger.warning(
+                        f"Horizon effects stream unavailable, reconnecting in {backoff}s: {e}"
+                    )
+            except ConnectionError as e:
+                logger.warning(f"Horizon effects stream dropped, reconnecting in {backoff}s: {e}")
+            except Exception as e:
+                logger.error(
+                    f"Horizon effects stream error, reconnecting in {backoff}s: {e}", exc_info=True
+                )
+            finally:
+                self._set_connected(False)
+
+            if self.last_event_at != last_event_at:
+                backoff = 1.0  # The connection was healthy for a while
+
+            metrics.increment("stellar_stream_reconnects_total")
+            await self._flush_cursor(force=True)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, settings.STELLAR_STREAM_MAX_BACKOFF)
+
+    def start(self) -> None:
+        """
+        Start following the effects stream
+        Called on application startup when STELLAR_STREAM_ENABLED is set
+        """
+        if self._task is None or self._task.done():
+            self._watch_hot_wallet()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            logger.info(f"📡 Streaming Horizon balances for {len(self.watched)} account(s)")
+
+    async def stop(self) -> None:
+        """
+        Stop the stream and persist the cursor
+        Called on application shutdown
+        """
+        tasks = [t for t in (self._task, *self._refreshes.values()) if t is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+        self._set_connected(False)
+        await self._flush_cursor(force=True)
+
+    def get_stats(self) -> dict:
+        """Stream state for the metrics snapshot"""
+        return {
+            "enabled": settings.STELLAR_STREAM_ENABLED,
+            "connected": self.connected,
+            "cursor": self.cursor,
+            "watched": len(self.watched),
+            "seconds_since_event": (
+                round(time.monotonic() - self.last_event_at, 1) if self.last_event_at else None
+            ),
+            "reconnects": metrics.get_counter("stellar_stream_reconnects_total"),
+        }
+
+
+balance_streamer = BalanceStreamer(stellar_service)
+
+metrics.register_collector("stellar_stream", balance_streamer.get_stats)
@@ -0,0 +1,603 @@
+"""
+Wani - Submission Pipeline
+Idempotent USDC payments that survive Horizon timeouts and restarts
+
+A submission that times out (504, dropped connection) may still land, so
+retrying it with a freshly built transaction can pay twice. The pipeline
+never builds a second transaction while the first one could still be
+applied:
+
+    build    sign the transaction, compute its hash
+    persist  store intent + envelope + hash (stellar_submissions)
+    submit   send it (fee-bumped if stuck, see submit_with_fee_bumps)
+    confirm  outcome unknown: poll transactions/{hash} until it shows
+             up or its time bounds (max_time) have passed
+
+Only a transaction that provably cannot land any more (rejected before
+the ledger with tx_bad_seq/tx_too_late on its first submission, or
+expired unseen) is rebuilt, with a new sequence number and a new hash,
+up to STELLAR_SUBMIT_MAX_ATTEMPTS times. A stored envelope resent after
+a restart may already have landed, which Horizon also answers with
+tx_bad_seq, so there those codes only send it to confirm.
+
+Callers pass an idempotency key (e.g. the transfer id): asking again for
+the same key returns the existing submission instead of paying again.
+Work runs in background tasks, at most STELLAR_SUBMIT_CONCURRENCY at a
+time; open submissions left by a previous process are picked up again by
+recover() on startup.
+
+Several processes (replicas, workers) may pick up the same row: a retried
+request landing elsewhere, or recover() on a replica that starts while
+another is still working. Before building, a process claims the row with
+a conditional UPDATE (pending -> building, attempts + 1, matched on the
+status and attempts it read). Only the winner builds and signs; its
+envelope is stored only while its claim still holds, so a claimer that
+lost the row never submits. Every later status change is conditional the
+same way. A claim not followed by a stored envelope within
+STELLAR_SUBMIT_CLAIM_TIMEOUT (the process died) can be taken over.
+Resending a stored envelope needs no claim: it is the same transaction.
+"""
+
+import asyncio
+import functools
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Callable, Dict, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from stellar_sdk import TransactionBuilder, TransactionEnvelope
+
+from app.core.config import settings
+from app.core.database import get_session_factory
+from app.core.metrics import metrics
+from app.integrations.horizon_client import operation_result_codes, submission_result_code
+from app.models.stellar_submission import (
+    OPEN_SUBMISSION_STATUSES,
+    SUBMISSION_BUILDING,
+    SUBMISSION_FAILED,
+    SUBMISSION_PENDING,
+    SUBMISSION_SUBMITTED,
+    SUBMISSION_SUCCEEDED,
+    StellarSubmission,
+)
+from app.services.stellar_sequence import SEQUENCE_CONSUMED_CODES
+from app.services.stellar_service import StellarService, stellar_service
+
+logger = logging.getLogger(__name__)
+
+# Rejected before reaching the ledger: the transaction can never apply
+REBUILD_CODES = frozenset({"tx_bad_seq", "tx_too_late"})
+
+# Stage latency buckets (milliseconds)
+_STAGE_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000, 120000)
+
+# Submit/confirm outcomes
+_SUCCEEDED = "succeeded"
+_FAILED = "failed"
+_REBUILD = "rebuild"
+_UNKNOWN = "unknown"
+_CLAIM_LOST = "claim_lost"
+
+
+class SubmissionError(Exception):
+    """Base exception for submission pipeline errors"""
+
+    pass
+
+
+class SubmissionConflictError(SubmissionError):
+    """Raised when an idempotency key is reused for a different payment"""
+
+    pass
+
+
+class _Stage:
+    """Times one pipeline stage into stellar_submit_stage_ms"""
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self) -> "_Stage":
+        self.started = time.monotonic()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        metrics.observe(
+            "stellar_submit_stage_ms",
+            (time.monotonic() - self.started) * 1000,
+            _STAGE_BUCKETS_MS,
+            stage=self.stage,
+        )
+
+
+def _max_time(envelope: TransactionEnvelope) -> Optional[datetime]:
+    """Upper time bound of a transaction (None = no bound)"""
+    time_bounds = (
+        envelope.transaction.preconditions.time_bounds
+        if envelope.transaction.preconditions
+        else None
+    )
+    if time_bounds is None or not time_bounds.max_time:
+        return None
+    return datetime.fromtimestamp(time_bounds.max_time, tz=timezone.utc)
+
+
+def _as_utc(moment: Optional[datetime]) -> Optional[datetime]:
+    """Treat naive timestamps read back from the database as UTC"""
+    if moment is not None and moment.tzinfo is None:
+        return moment.replace(tzinfo=timezone.utc)
+    return moment
+
+
+class SubmissionPipeline:
+    """
+    Persist, submit and confirm hot wallet USDC payments
+
+    Args:
+        service: StellarService providing channels, fees and Horizon access
+        session_factory: Async session factory (default: the app's)
+        concurrency: Submissions processed at once
+
+    Usage:
+        submission = await submission_pipeline.submit_usdc_payment(
+            f"transfer:{transfer.id}", destination, Decimal("12.50")
+        )
+        submission.status, submission.tx_hash
+    """
+
+    def __init__(
+        self,
+        service: StellarService,
+        session_factory: Optional[Callable] = None,
+        concurrency: Optional[int] = None,
+    ):
+        self.service = service
+        self._session_factory = session_factory
+        self.concurrency = concurrency or settings.STELLAR_SUBMIT_CONCURRENCY
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._tasks: Dict[UUID, asyncio.Task] = {}
+
+    @property
+    def session_factory(self) -> Callable:
+        if self._session_factory is None:
+            self._session_factory = get_session_factory()
+        return self._session_factory
+
+    async def submit_usdc_payment(
+        self,
+        idempotency_key: str,
+        destination: str,
+        amount: Decimal,
+        memo: Optional[str] = None,
+        urgency: str = "normal",
+        wait: bool = True,
+    ) -> StellarSubmission:
+        """
+        Pay USDC from the hot wallet, at most once per idempotency key
+
+        Args:
+            idempotency_key: Caller-chosen key identifying this payment
+            destination: Recipient public key (must trust USDC)
+            amount: USDC amount
+            memo: Optional text memo (max 28 bytes)
+            urgency: Fee class ("low", "normal", "high", "urgent")
+            wait: Wait for the final outcome; otherwise return once the
+                  intent is stored (status "pending")
+
+        Returns:
+            The submission row (status "succeeded" or "failed" when waited for)
+
+        Raises:
+            SubmissionConflictError: The key was used for a different payment
+        """
+        amount = Decimal(amount)
+        with _Stage("persist"):
+            submission = await self._create(idempotency_key, destination, amount, memo, urgency)
+
+        task = self._schedule(submission)
+        if task is None or not wait:
+            return submission
+        # Shielded: a cancelled caller must not cancel a payment that may land
+        return await asyncio.shield(task)
+
+    async def get_submission(self, idempotency_key: str) -> Optional[StellarSubmission]:
+        """Current state of the submission for a key (None = never requested)"""
+        async with self.session_factory() as session:
+            result = await session.execute(
+                select(StellarSubmission).where(
+                    StellarSubmission.idempotency_key == idempotency_key
+                )
+            )
+            submission: Optional[StellarSubmission] = result.scalar_one_or_none()
+        return submission
+
+    async def recover(self) -> int:
+        """
+        Resume submissions left open by a previous process
+        Called on application startup
+
+        Returns:
+            Number of submissions resumed
+        """
+        async with self.session_factory() as session:
+            result = await session.execute(
+                select(StellarSubmission).where(
+                    StellarSubmission.status.in_(OPEN_SUBMISSION_STATUSES)
+                )
+            )
+            submissions = result.scalars().all()
+
+        for submission in submissions:
+            self._schedule(submission)
+        if submissions:
+            logger.info(f"Resuming {len(submissions)} open Stellar submission(s)")
+        return len(submissions)
+
+    async def close(self) -> None:
+        """
+        Stop in-flight work (called on shutdown)
+
+        Rows stay open and recover() finishes them on the next start; the
+        stored hash makes that safe whatever was already sent.
+        """
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _create(
+        self,
+        idempotency_key: str,
+        destination: str,
+        amount: Decimal,
+        memo: Optional[str],
+        urgency: str,
+    ) -> StellarSubmission:
+        """Store the intent, or return the existing one for the key"""
+        async with self.session_factory() as session:
+            submission = StellarSubmission(
+                idempotency_key=idempotency_key,
+                destination=destination,
+                amount=amount,
+                memo=memo,
+                urgency=urgency,
+                status=SUBMISSION_PENDING,
+                attempts=0,
+            )
+            session.add(submission)
+            try:
+                await session.commit()
+                metrics.increment("stellar_submissions_total", result="created")
+                return submission
+            except IntegrityError:
+                await session.rollback()
+
+        existing = await self.get_submission(idempotency_key)
+        if existing is None:
+            raise SubmissionError(f"Could not store submission '{idempotency_key}'")
+        if (
+            existing.destination != destination
+            or Decimal(existing.amount) != amount
+            or existing.memo != memo
+        ):
+            raise SubmissionConflictError(
+                f"Idempotency key '{idempotency_key}' was already used for "
+                f"{existing.amount} USDC to {existing.destination}"
+            )
+        metrics.increment("stellar_submissions_total", result="duplicate")
+        return existing
+
+    def _schedule(
+        self, submission: StellarSubmission
+    ) -> Optional["asyncio.Task[StellarSubmission]"]:
+        """Process a submission in the background (one task per submission)"""
+        if submission.status not in OPEN_SUBMISSION_STATUSES:
+            return None
+        task = self._tasks.get(submission.id)
+        if task is None or task.done():
+            task = asyncio.get_running_loop().create_task(self._process(submission.id))
+            self._tasks[submission.id] = task
+            task.add_done_callback(functools.partial(self._task_done, submission.id))
+        return task
+
+    def _task_done(self, submission_id: UUID, task: asyncio.Task) -> None:
+        if self._tasks.get(submission_id) is task:
+            del self._tasks[submission_id]
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Stellar submission {submission_id} stopped: {task.exception()}")
+
+    async def _load(self, submission_id: UUID) -> StellarSubmission:
+        async with self.session_factory() as session:
+            submission: Optional[StellarSubmission] = await session.get(
+                StellarSubmission, submission_id
+            )
+        if submission is None:
+            raise SubmissionError(f"Submission {submission_id} not found")
+        return submission
+
+    async def _transition(self, submission: StellarSubmission, **values: Any) -> bool:
+        """
+        Update the row only if it is still in the state `submission` was read in
+
+        Returns:
+            False if another process changed it first (nothing written)
+        """
+        async with self.session_factory() as session:
+            result = await session.execute(
+                update(StellarSubmission)
+                .where(
+                    StellarSubmission.id == submission.id,
+                    StellarSubmission.status == submission.status,
+                    StellarSubmission.attempts == submission.attempts,
+                )
+                .values(**values)
+            )
+            await session.commit()
+        return bool(result.rowcount == 1)
+
+    async def _claim(self, submission: StellarSubmission) -> bool:
+        """Take the submission for building; False if another process got it first"""
+        now = datetime.now(timezone.utc)
+        claimed = await self._transition(
+            submission,
+            status=SUBMISSION_BUILDING,
+            attempts=submission.attempts + 1,
+            updated_at=now,
+            error=None,
+        )
+        if not claimed:
+            metrics.increment("stellar_submissions_total", result="claim_lost")
+            return False
+        submission.status = SUBMISSION_BUILDING
+        submission.attempts += 1
+        submission.updated_at = now
+        return True
+
+    @staticmethod
+    def _claim_expired(submission: StellarSubmission) -> bool:
+        """A building claim whose process never stored an envelope in time"""
+        claimed_at = _as_utc(submission.updated_at)
+        cutoff = datetime.now(timezone.utc) - timedelta(
+            seconds=settings.STELLAR_SUBMIT_CLAIM_TIMEOUT
+        )
+        return claimed_at is None or claimed_at < cutoff
+
+    async def _process(self, submission_id: UUID) -> StellarSubmission:
+        """Drive one submission to a final status"""
+        async with self._semaphore:
+            while True:
+                submission = await self._load(submission_id)
+                if submission.status not in OPEN_SUBMISSION_STATUSES:
+                    return submission
+
+                if submission.status == SUBMISSION_BUILDING and not self._claim_expired(submission):
+                    # Another process is building it: wait for its envelope
+                    await asyncio.sleep(settings.STELLAR_SUBMIT_POLL_INTERVAL)
+                    continue
+
+                if submission.status == SUBMISSION_SUBMITTED:
+                    # Envelope stored by an earlier run or another process:
+                    # resending it is harmless (same hash, same sequence)
+                    outcome, detail = await self._resend(submission)
+                else:
+                    outcome, detail = await self._send_new(submission)
+                    if outcome == _CLAIM_LOST:
+                        continue
+
+                if outcome == _UNKNOWN:
+                    with _Stage("confirm"):
+                        outcome, detail = await self._confirm(submission)
+
+                await self._record(submission, outcome, detail)
+
+    async def _send_new(self, submission: StellarSubmission) -> Tuple[str, Any]:
+        """Claim the intent, then build, persist and submit a new transaction for it"""
+        pool = self.service.channel_pool
+        persisted = False
+        try:
+            async with pool.lease() as channel:
+                # Claimed once a channel is free, so the claim only spans build and persist
+                if not await self._claim(submission):
+                    return _CLAIM_LOST, None
+
+                with _Stage("build"):
+                    builder = TransactionBuilder(
+                        await pool.source_account(channel),
+                        self.service.network_passphrase,
+                        base_fee=self.service.fee_oracle.fee_for(submission.urgency),
+                    ).append_payment_op(
+                        submission.destination,
+                        self.service.usdc_asset,
+                        str(submission.amount),
+                        source=self.service.hot_wallet.public_key,
+                    )
+                    if submission.memo:
+                        builder.add_text_memo(submission.memo)
+                    transaction = builder.set_timeout(settings.STELLAR_TX_TIMEOUT).build()
+                    pool.sign(channel, transaction)
+
+                with _Stage("persist"):
+                    # Written before submitting: from here on the hash decides the outcome
+                    persisted = await self._transition(
+                        submission,
+                        status=SUBMISSION_SUBMITTED,
+                        tx_hash=transaction.hash_hex(),
+                        envelope_xdr=transaction.to_xdr(),
+                        source_account=channel.public_key,
+                        sequence=transaction.transaction.sequence,
+                        max_time=_max_time(transaction),
+                    )
+                if not persisted:
+                    # Claim taken over while building: the other process pays
+                    self.service.sequences.release(
+                        channel.public_key, transaction.transaction.sequence
+                    )
+                    logger.warning(
+                        f"Submission {submission.idempotency_key}: claim lost, not submitting"
+                    )
+                    return _CLAIM_LOST, None
+                submission.status = SUBMISSION_SUBMITTED
+                submission.tx_hash = transaction.hash_hex()
+                submission.source_account = channel.public_key
+                submission.max_time = _max_time(transaction)
+
+                with _Stage("submit"):
+                    try:
+                        response = await pool.submit(channel, transaction)
+                    except Exception as e:
+                        return self._classify(e)
+                return _SUCCEEDED, response
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if persisted:
+                # Failed after the hash was stored (e.g. leaving the lease):
+                # the submission may have gone out
+                return _UNKNOWN, e
+            # Nothing was signed or sent: cannot have paid
+            return _FAILED, e
+
+    async def _resend(self, submission: StellarSubmission) -> Tuple[str, Any]:
+        """Submit the stored envelope again (after a restart)"""
+        max_time = _as_utc(submission.max_time)
+        if max_time is not None and datetime.now(timezone.utc) > max_time:
+            return _UNKNOWN, None  # Too late to send; confirm decides
+
+        if submission.envelope_xdr is None:
+            return _UNKNOWN, None
+        envelope = TransactionEnvelope.from_xdr(
+            submission.envelope_xdr, self.service.network_passphrase
+        )
+        with _Stage("submit"):
+            try:
+                response = await self.service.submit_with_fee_bumps(envelope)
+            except Exception as e:
+                outcome, detail = self._classify(e)
+                if outcome == _REBUILD:
+                    # This envelope may have landed before the restart, which
+                    # also answers tx_bad_seq (or tx_too_late): confirm decides
+                    return _UNKNOWN, e
+                return outcome, detail
+        return _SUCCEEDED, response
+
+    @staticmethod
+    def _classify(error: Exception) -> Tuple[str, Any]:
+        """Map a submission error to an outcome"""
+        code = submission_result_code(error)
+        if code is None:
+            return _UNKNOWN, error  # Timeout, 5xx, connection: it may still land
+        if code in REBUILD_CODES:
+            return _REBUILD, error
+        return _FAILED, error
+
+    async def _confirm(self, submission: StellarSubmission) -> Tuple[str, Any]:
+        """
+        Poll for the transaction until it is found or has expired
+
+        Expiry is only concluded from a lookup made after max_time (plus
+        STELLAR_SUBMIT_EXPIRY_MARGIN for ledger close lag) that did not
+        find it.
+        """
+        transaction_hash = submission.tx_hash
+        if transaction_hash is None:
+            return _REBUILD, None  # Nothing was ever stored, so nothing was sent
+        deadline = None
+        max_time = _as_utc(submission.max_time)
+        if max_time is not None:
+            deadline = max_time.timestamp() + settings.STELLAR_SUBMIT_EXPIRY_MARGIN
+
+        with self.service.pinned_endpoint(transaction_hash):
+            while True:
+                checked_at = time.time()
+                try:
+                    record = await self.service.get_transaction(transaction_hash)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning(f"Lookup of transaction {transaction_hash} failed: {e}")
+                else:
+                    if record is not None:
+                        return (_SUCCEEDED if record.get("successful") else _FAILED), record
+                    if deadline is not None and checked_at > deadline:
+                        return _REBUILD, None
+
+                await asyncio.sleep(settings.STELLAR_SUBMIT_POLL_INTERVAL)
+
+    async def _record(self, submission: StellarSubmission, outcome: str, detail: Any) -> None:
+        """Store an outcome; rebuilds go back to pending while attempts remain"""
+        if outcome == _SUCCEEDED:
+            if not await self._transition(
+                submission,
+                status=SUBMISSION_SUCCEEDED,
+                ledger=detail.get("ledger"),
+                result_code=None,
+                error=None,
+            ):
+                return  # Recorded by another process
+            metrics.increment("stellar_submissions_total", result="succeeded")
+            logger.info(
+                f"Submission {submission.idempotency_key}: {submission.amount} USDC to "
+                f"{submission.destination} in tx {submission.tx_hash}"
+            )
+            return
+
+        if outcome == _REBUILD:
+            if submission.source_account:
+                # Its sequence number was not consumed
+                self.service.sequences.invalidate(submission.source_account)
+            reason = (
+                submission_result_code(detail) if isinstance(detail, Exception) else "tx_expired"
+            )
+            if submission.attempts < settings.STELLAR_SUBMIT_MAX_ATTEMPTS:
+                logger.warning(
+                    f"Submission {submission.idempotency_key}: tx {submission.tx_hash} cannot land "
+                    f"({reason}), rebuilding"
+                )
+                if not await self._transition(
+                    submission, status=SUBMISSION_PENDING, result_code=reason
+                ):
+                    return
+                metrics.increment("stellar_submissions_total", result="rebuilt")
+                return
+            outcome, detail = _FAILED, reason
+
+        if isinstance(detail, Exception):
+            code = submission_result_code(detail) or type(detail).__name__
+            op_codes = [c for c in operation_result_codes(detail) if c != "op_success"]
+            result_code = op_codes[0] if code in SEQUENCE_CONSUMED_CODES and op_codes else code
+            error = str(detail)
+        elif isinstance(detail, dict):
+            result_code, error = (
+                "tx_failed",
+                f"Transaction {submission.tx_hash} failed in the ledger",
+            )
+        else:
+            result_code, error = detail, f"Gave up after {submission.attempts} attempt(s)"
+
+        if not await self._transition(
+            submission, status=SUBMISSION_FAILED, result_code=result_code, error=error
+        ):
+            return
+        metrics.increment("stellar_submissions_total", result="failed")
+        logger.error(f"Submission {submission.idempotency_key} failed ({result_code}): {error}")
+
+    def get_stats(self) -> dict:
+        """Pipeline state for the metrics snapshot"""
+        return {
+            "concurrency": self.concurrency,
+            "open": len(self._tasks),
+            "succeeded": metrics.get_counter("stellar_submissions_total", result="succeeded"),
+            "failed": metrics.get_counter("stellar_submissions_total", result="failed"),
+            "rebuilt": metrics.get_counter("stellar_submissions_total", result="rebuilt"),
+            "duplicates": metrics.get_counter("stellar_submissions_total", result="duplicate"),
+        }
+
+
+submission_pipeline = SubmissionPipeline(stellar_service)
+
+metrics.register_collector("stellar_submissions", submission_pipeline.get_stats)
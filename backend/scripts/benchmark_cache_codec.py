@@ -0,0 +1,118 @@
+"""
+Wani - Cache Codec Benchmark
+Compares the legacy cache serialization path against app.core.cache_codec
+
+Legacy path (before the codec layer):
+    set: json.dumps() for dict/list, str() for everything else
+    get: json.loads() with a fallback to the raw string
+
+Usage:
+    python scripts/benchmark_cache_codec.py [iterations]
+"""
+
+import json
+import sys
+import timeit
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+from pathlib import Path
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core import cache_codec
+
+
+def legacy_encode(value):
+    """Serialization used by cache_set before the codec layer"""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str).encode()
+    return str(value).encode()
+
+
+def legacy_decode(data):
+    """Deserialization used by cache_get before the codec layer"""
+    text = data.decode()
+    try:
+        return json.loads(text)
+    except (json.JSONDecodeError, TypeError):
+        return text
+
+
+def build_payloads():
+    """Representative cache values"""
+    now = datetime.now(timezone.utc)
+    account = {
+        "public_key": "G" + "A" * 55,
+        "sequence": "123456789012345",
+        "balances": {"XLM": Decimal("100.5000000"), "USDC": Decimal("42.1234567")},
+        "fetched_at": now,
+    }
+    session = {
+        "user_id": uuid.uuid4(),
+        "email": "user@example.com",
+        "kyc_level": 1,
+        "issued_at": now,
+    }
+    history = [
+        {
+            "id": uuid.uuid4(),
+            "amount": Decimal("12.50"),
+            "status": "completed",
+            "created_at": now,
+            "memo": "remittance to family",
+        }
+        for _ in range(200)
+    ]
+    return {
+        "decimal balance": Decimal("1234.5678901"),
+        "session dict": session,
+        "account snapshot": account,
+        "200-item history": history,
+    }
+
+
+def bench(fn, number):
+    """Best-of-3 time per call in microseconds"""
+    return min(timeit.repeat(fn, number=number, repeat=3)) / number * 1e6
+
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    codecs = [cache_codec.get_codec(name) for name in ("msgpack", "json")]
+
+    print("=" * 96)
+    print("WANI - CACHE CODEC BENCHMARK")
+    print("=" * 96)
+    print(f"Iterations per measurement: {number}")
+    print(f"Compression threshold: {cache_codec.settings.CACHE_COMPRESSION_THRESHOLD} bytes")
+    print()
+    print(
+        f"{'payload':<20} {'path':<9} {'size (B)':>9} {'encode (us)':>12} "
+        f"{'decode (us)':>12} {'round-trips types':>19}"
+    )
+    print("-" * 96)
+
+    for label, value in build_payloads().items():
+        data = legacy_encode(value)
+        print(
+            f"{label:<20} {'legacy':<9} {len(data):>9} "
+            f"{bench(lambda: legacy_encode(value), number):>12.2f} "
+            f"{bench(lambda: legacy_decode(data), number):>12.2f} "
+            f"{str(legacy_decode(data) == value):>19}"
+        )
+
+        for codec in codecs:
+            data = cache_codec.encode(value, codec)
+            print(
+                f"{'':<20} {codec.name:<9} {len(data):>9} "
+                f"{bench(lambda: cache_codec.encode(value, codec), number):>12.2f} "
+                f"{bench(lambda: cache_codec.decode(data), number):>12.2f} "
+                f"{str(cache_codec.decode(data) == value):>19}"
+            )
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Wani - Horizon Load Benchmark
+Payments and balance lookups through StellarService against the Horizon emulator
+
+Starts scripts/horizon_emulator.py in-process on a free port, seeds a hot
+wallet (with USDC), channel accounts and funded destinations, then points
+StellarService at it and measures:
+
+    send     send_usdc_payment, one transaction per payment (channels)
+    queue    queue_usdc_payment, micro-batched multi-op transactions
+    balances get_balances_many over every destination
+
+Needs no network. The usual app environment (.env) must be present.
+
+Usage:
+    python scripts/benchmark_horizon.py [--payments 200] [--channels 5]
+        [--latency-ms 20] [--fail-rate 0.0]
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import sys
+import time
+from decimal import Decimal
+from pathlib import Path
+from typing import List
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+import uvicorn
+from horizon_emulator import EmulatorConfig, Ledger, create_app
+from stellar_sdk import Keypair
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def report(name: str, latencies: List[float], elapsed: float, errors: int) -> None:
+    """One result line: throughput and latency percentiles (ms)"""
+    if latencies:
+        ordered = sorted(latencies)
+        p95 = ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)]
+        print(
+            f"   {name:<9} {len(latencies) / elapsed:8.1f}/s   p50 {statistics.median(ordered) * 1000:7.1f} ms"
+            f"   p95 {p95 * 1000:7.1f} ms   errors {errors}"
+        )
+    else:
+        print(f"   {name:<9} no successful calls, errors {errors}")
+
+
+async def timed(calls) -> tuple:
+    """Run coroutines concurrently; (latencies, elapsed, errors)"""
+    latencies = []
+    errors = 0
+
+    async def run(call):
+        nonlocal errors
+        started = time.perf_counter()
+        try:
+            await call
+            latencies.append(time.perf_counter() - started)
+        except Exception:
+            errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run(call) for call in calls))
+    return latencies, time.perf_counter() - started, errors
+
+
+async def benchmark(args: argparse.Namespace) -> None:
+    port = free_port()
+    config = EmulatorConfig(
+        latency_ms=args.latency_ms, jitter_ms=args.latency_ms / 2, fail_rate=args.fail_rate
+    )
+    ledger = Ledger(config)
+    server = uvicorn.Server(
+        uvicorn.Config(create_app(config, ledger), port=port, log_level="warning")
+    )
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    issuer, hot_wallet = Keypair.random(), Keypair.random()
+    channels = [Keypair.random() for _ in range(args.channels)]
+    usdc = f"USDC:{issuer.public_key}"
+    ledger.seed(issuer.public_key)
+    ledger.seed(hot_wallet.public_key, assets={usdc: "1000000"})
+    for channel in channels:
+        ledger.seed(channel.public_key)
+
+    # Settings are read on import: point the app at the emulator first
+    os.environ.update(
+        {
+            "STELLAR_NETWORK": "testnet",
+            "STELLAR_HORIZON_URL": f"http://127.0.0.1:{port}",
+            "STELLAR_FRIENDBOT_URL": f"http://127.0.0.1:{port}/friendbot",
+            "STELLAR_HOT_WALLET_SECRET": hot_wallet.secret,
+            "STELLAR_CHANNEL_SECRETS": ",".join(channel.secret for channel in channels),
+            "STELLAR_USDC_ISSUER": issuer.public_key,
+            "STELLAR_HTTP_RATE_LIMIT": "0",
+        }
+    )
+    from app.services.stellar_fixtures import FixtureBuilder
+    from app.services.stellar_service import stellar_service
+
+    await stellar_service.startup()
+    try:
+        print("=" * 60)
+        print("WANI - HORIZON LOAD BENCHMARK (emulator)")
+        print(
+            f"   payments: {args.payments}, channels: {args.channels}, "
+            f"latency: {args.latency_ms} ms, fail rate: {args.fail_rate}"
+        )
+        print("=" * 60)
+
+        started = time.perf_counter()
+        destinations = await FixtureBuilder(stellar_service).create_accounts(args.destinations)
+        print(
+            f"   fixtures  {args.destinations} accounts funded + trusted in "
+            f"{time.perf_counter() - started:.2f}s"
+        )
+
+        keys = [account.public_key for account in destinations]
+        amount = Decimal("1.25")
+
+        report(
+            "send",
+            *await timed(
+                stellar_service.send_usdc_payment(keys[i % len(keys)], amount)
+                for i in range(args.payments)
+            ),
+        )
+        report(
+            "queue",
+            *await timed(
+                stellar_service.queue_usdc_payment(keys[i % len(keys)], amount)
+                for i in range(args.payments)
+            ),
+        )
+        report(
+            "balances",
+            *await timed(stellar_service.get_balances_many(keys, fresh=True) for _ in range(10)),
+        )
+
+        print(f"   ledgers closed: {ledger.sequence}, transactions: {len(ledger.transactions)}")
+    finally:
+        await stellar_service.close()
+        server.should_exit = True
+        await server_task
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="StellarService load benchmark against the Horizon emulator"
+    )
+    parser.add_argument("--payments", type=int, default=200)
+    parser.add_argument("--destinations", type=int, default=20)
+    parser.add_argument("--channels", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    asyncio.run(benchmark(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,651 @@
+"""
+Wani - Horizon Emulator
+In-memory stand-in for Horizon + Friendbot, for offline tests and benchmarks
+
+Serves the endpoints StellarService uses, backed by a small ledger model:
+
+    GET  /accounts/{id}         account record (balances, sequence, data)
+    GET  /transactions/{hash}   transaction record (also by fee bump inner hash)
+    POST /transactions          submit (sequence, time bounds, fee, balance,
+                                trustline and destination checks; result codes
+                                like Horizon's)
+    GET  /fee_stats             fee percentiles from the configured base fee
+    GET  /effects               effects page, or SSE stream with cursor (400
+                                for a cursor older than the kept history)
+    GET  /friendbot?addr=       create an account with 10000 XLM
+
+Every accepted transaction closes one ledger. Signatures are not verified.
+
+Latency and failures can be injected: each request waits latency_ms (plus
+up to jitter_ms), a fraction of requests gets 429 (rate_limit_rate) and a
+fraction of submissions gets 504 (fail_rate), of which timeout_applies are
+still applied, like a real timeout. The settings can be changed while
+running through /_emulator/config; /_emulator/accounts seeds balances.
+
+Usage:
+    python scripts/horizon_emulator.py --port 8001 --latency-ms 50 --fail-rate 0.05
+
+    STELLAR_HORIZON_URL=http://localhost:8001
+    STELLAR_FRIENDBOT_URL=http://localhost:8001/friendbot
+
+In-process (no socket): httpx.ASGITransport(app=create_app())
+"""
+
+import argparse
+import asyncio
+import copy
+import json
+import random
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from stellar_sdk import Asset, FeeBumpTransactionEnvelope, Network
+from stellar_sdk.helpers import parse_transaction_envelope_from_xdr
+from stellar_sdk.operation import BumpSequence, ChangeTrust, CreateAccount, Payment
+
+NATIVE = "native"
+BASE_RESERVE = Decimal("0.5")
+STROOPS_PER_XLM = Decimal("10000000")
+FRIENDBOT_XLM = Decimal("10000")
+
+
+@dataclass
+class EmulatorConfig:
+    """Behaviour knobs (all changeable at runtime)"""
+
+    network_passphrase: str = Network.TESTNET_NETWORK_PASSPHRASE
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    fail_rate: float = 0.0
+    timeout_applies: float = 0.5
+    rate_limit_rate: float = 0.0
+    base_fee: int = 100
+    capacity_usage: float = 0.5
+
+
+class SubmissionRejected(Exception):
+    """Horizon 400 for a submission, with its result codes"""
+
+    def __init__(self, transaction_code: str, operation_codes: Optional[List[str]] = None):
+        super().__init__(transaction_code)
+        self.transaction_code = transaction_code
+        self.operation_codes = operation_codes
+
+
+def asset_id(asset: Asset) -> str:
+    """Balance key: "native" or "CODE:ISSUER" """
+    return NATIVE if asset.is_native() else f"{asset.code}:{asset.issuer}"
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _problem(status: int, title: str, extras: Optional[Dict] = None) -> JSONResponse:
+    body = {
+        "type": f"https://stellar.org/horizon-errors/{title.lower().replace(' ', '_')}",
+        "title": title,
+        "status": status,
+    }
+    if extras is not None:
+        body["extras"] = extras
+    return JSONResponse(body, status_code=status)
+
+
+class Ledger:
+    """
+    Accounts, transactions and effects of the emulated network
+
+    accounts[id] = {"sequence", "balances": {asset_id: Decimal},
+                    "last_modified": {asset_id: ledger}, "data", "last_modified_ledger"}
+    """
+
+    def __init__(self, config: EmulatorConfig):
+        self.config = config
+        self.reset()
+
+    def reset(self) -> None:
+        self.sequence = 2  # ledger number
+        self.accounts: Dict[str, Dict[str, Any]] = {}
+        self.transactions: Dict[str, Dict[str, Any]] = {}
+        self.effects: List[Dict[str, Any]] = []
+        self.pruned_until: Tuple[int, int] = (0, 0)
+        self._changed = asyncio.Condition()
+
+    # Accounts
+
+    def create_account(self, account_id: str, xlm: Decimal = FRIENDBOT_XLM) -> Dict[str, Any]:
+        account = {
+            "sequence": self.sequence << 32,
+            "balances": {NATIVE: Decimal(xlm)},
+            "last_modified": {NATIVE: self.sequence},
+            "data": {},
+            "last_modified_ledger": self.sequence,
+        }
+        self.accounts[account_id] = account
+        return account
+
+    def fund(self, account_id: str) -> bool:
+        """Friendbot: create the account with 10000 XLM (False if it exists)"""
+        if account_id in self.accounts:
+            return False
+        self.sequence += 1
+        self.create_account(account_id)
+        operation_id = (self.sequence << 32) | (1 << 12) | 1
+        self.effects.append(
+            {
+                "id": f"{operation_id:019d}-0000000001",
+                "paging_token": f"{operation_id}-1",
+                "account": account_id,
+                "type": "account_created",
+                "starting_balance": f"{FRIENDBOT_XLM:.7f}",
+                "created_at": _now(),
+            }
+        )
+        self._notify()
+        return True
+
+    def seed(
+        self,
+        account_id: str,
+        xlm: Optional[str] = None,
+        assets: Optional[Dict[str, str]] = None,
+        data: Optional[Dict[str, str]] = None,
+    ) -> None:
+        """Create or overwrite an account's balances (test setup)"""
+        account = self.accounts.get(account_id) or self.create_account(
+            account_id, Decimal(xlm or FRIENDBOT_XLM)
+        )
+        if xlm is not None:
+            account["balances"][NATIVE] = Decimal(xlm)
+        for key, amount in (assets or {}).items():
+            account["balances"][key] = Decimal(amount)
+            account["last_modified"][key] = self.sequence
+        account["data"].update(data or {})
+
+    def account_record(self, account_id: str) -> Optional[Dict[str, Any]]:
+        account = self.accounts.get(account_id)
+        if account is None:
+            return None
+        balances = []
+        for key, amount in account["balances"].items():
+            if key == NATIVE:
+                balances.append({"asset_type": "native", "balance": f"{amount:.7f}"})
+            else:
+                code, issuer = key.split(":")
+                balances.append(
+                    {
+                        "asset_type": "credit_alphanum4" if len(code) <= 4 else "credit_alphanum12",
+                        "asset_code": code,
+                        "asset_issuer": issuer,
+                        "balance": f"{amount:.7f}",
+                        "limit": "922337203685.4775807",
+                        "last_modified_ledger": account["last_modified"].get(key, self.sequence),
+                    }
+                )
+        return {
+            "id": account_id,
+            "account_id": account_id,
+            "sequence": str(account["sequence"]),
+            "subentry_count": len(account["balances"]) - 1 + len(account["data"]),
+            "last_modified_ledger": account["last_modified_ledger"],
+            "num_sponsoring": 0,
+            "num_sponsored": 0,
+            "thresholds": {"low_threshold": 0, "med_threshold": 0, "high_threshold": 0},
+            "flags": {"auth_required": False, "auth_revocable": False, "auth_immutable": False},
+            "balances": balances,
+            "signers": [{"key": account_id, "weight": 1, "type": "ed25519_public_key"}],
+            "data": dict(account["data"]),
+            "paging_token": account_id,
+        }
+
+    # Transactions
+
+    def submit(self, xdr: str) -> Dict[str, Any]:
+        """
+        Validate and apply a transaction envelope
+
+        Returns:
+            The transaction record
+
+        Raises:
+            SubmissionRejected: With Horizon's transaction/operation result codes
+        """
+        try:
+            envelope = parse_transaction_envelope_from_xdr(xdr, self.config.network_passphrase)
+        except Exception:
+            raise SubmissionRejected("tx_malformed")
+
+        if isinstance(envelope, FeeBumpTransactionEnvelope):
+            inner = envelope.transaction.inner_transaction_envelope
+            fee_account = envelope.transaction.fee_source.account_id
+            fee_per_op = envelope.transaction.base_fee
+        else:
+            inner = envelope
+            fee_account = inner.transaction.source.account_id
+            fee_per_op = inner.transaction.fee // max(len(inner.transaction.operations), 1)
+
+        transaction = inner.transaction
+        source_id = transaction.source.account_id
+        source = self.accounts.get(source_id)
+        if source is None or fee_account not in self.accounts:
+            raise SubmissionRejected("tx_no_source_account")
+
+        time_bounds = transaction.preconditions.time_bounds if transaction.preconditions else None
+        if time_bounds is not None:
+            now = int(time.time())
+            if time_bounds.max_time and now > time_bounds.max_time:
+                raise SubmissionRejected("tx_too_late")
+            if time_bounds.min_time and now < time_bounds.min_time:
+                raise SubmissionRejected("tx_too_early")
+
+        if fee_per_op < self.config.base_fee:
+            raise SubmissionRejected("tx_insufficient_fee")
+        if transaction.sequence != source["sequence"] + 1:
+            raise SubmissionRejected("tx_bad_seq")
+
+        operations = len(transaction.operations)
+        fee_charged = self.config.base_fee * (operations + (1 if fee_account != source_id else 0))
+        fee_xlm = Decimal(fee_charged) / STROOPS_PER_XLM
+        if self.accounts[fee_account]["balances"][NATIVE] < fee_xlm:
+            raise SubmissionRejected("tx_insufficient_balance")
+
+        # Fee and sequence are consumed even if the operations fail
+        self.sequence += 1
+        self.accounts[fee_account]["balances"][NATIVE] -= fee_xlm
+        source["sequence"] = transaction.sequence
+
+        staged = copy.deepcopy(self.accounts)
+        effects: List[Dict[str, Any]] = []
+        codes = []
+        for index, operation in enumerate(transaction.operations):
+            op_source = operation.source.account_id if operation.source else source_id
+            operation_id = (self.sequence << 32) | (1 << 12) | (index + 1)
+            codes.append(self._apply(staged, op_source, operation, operation_id, effects))
+
+        successful = all(code == "op_success" for code in codes)
+        if successful:
+            self.accounts = staged
+            self.effects.extend(effects)
+
+        record = {
+            "id": envelope.hash_hex(),
+            "hash": envelope.hash_hex(),
+            "paging_token": str((self.sequence << 32) | (1 << 12)),
+            "successful": successful,
+            "ledger": self.sequence,
+            "created_at": _now(),
+            "source_account": source_id,
+            "source_account_sequence": str(transaction.sequence),
+            "fee_account": fee_account,
+            "fee_charged": str(fee_charged),
+            "max_fee": str(fee_per_op * operations),
+            "operation_count": operations,
+            "envelope_xdr": xdr,
+            "memo_type": transaction.memo.__class__.__name__.replace("Memo", "").lower() or "none",
+        }
+        self.transactions[envelope.hash_hex()] = record
+        self.transactions[inner.hash_hex()] = record
+        self._notify()
+
+        if not successful:
+            code = "tx_fee_bump_inner_failed" if inner is not envelope else "tx_failed"
+            raise SubmissionRejected(code, codes)
+        return record
+
+    def _apply(
+        self,
+        accounts: Dict[str, Dict],
+        source_id: str,
+        operation: Any,
+        operation_id: int,
+        effects: List[Dict[str, Any]],
+    ) -> str:
+        """Apply one operation to `accounts`; returns its result code"""
+        source = accounts.get(source_id)
+        if source is None:
+            return "op_no_source_account"
+
+        def effect(account: str, kind: str, **fields: Any) -> None:
+            index = sum(1 for e in effects if e["paging_token"].startswith(f"{operation_id}-")) + 1
+            effects.append(
+                {
+                    "id": f"{operation_id:019d}-{index:010d}",
+                    "paging_token": f"{operation_id}-{index}",
+                    "account": account,
+                    "type": kind,
+                    "created_at": _now(),
+                    **fields,
+                }
+            )
+
+        def asset_fields(key: str) -> Dict[str, str]:
+            if key == NATIVE:
+                return {"asset_type": "native"}
+            code, issuer = key.split(":")
+            return {
+                "asset_type": "credit_alphanum4" if len(code) <= 4 else "credit_alphanum12",
+                "asset_code": code,
+                "asset_issuer": issuer,
+            }
+
+        if isinstance(operation, CreateAccount):
+            amount = Decimal(operation.starting_balance)
+            if operation.destination in accounts:
+                return "op_already_exists"
+            if source["balances"][NATIVE] - amount < BASE_RESERVE * 2:
+                return "op_underfunded"
+            source["balances"][NATIVE] -= amount
+            accounts[operation.destination] = {
+                "sequence": self.sequence << 32,
+                "balances": {NATIVE: amount},
+                "last_modified": {NATIVE: self.sequence},
+                "data": {},
+                "last_modified_ledger": self.sequence,
+            }
+            effect(operation.destination, "account_created", starting_balance=f"{amount:.7f}")
+            effect(source_id, "account_debited", amount=f"{amount:.7f}", **asset_fields(NATIVE))
+            return "op_success"
+
+        if isinstance(operation, Payment):
+            key = asset_id(operation.asset)
+            amount = Decimal(operation.amount)
+            destination_id = operation.destination.account_id
+            destination = accounts.get(destination_id)
+            issuer = None if key == NATIVE else key.split(":")[1]
+            if destination is None:
+                return "op_no_destination"
+            if key not in destination["balances"] and destination_id != issuer:
+                return "op_no_trust"
+            if source_id != issuer:
+                if key not in source["balances"]:
+                    return "op_src_no_trust"
+                if source["balances"][key] < amount:
+                    return "op_underfunded"
+                source["balances"][key] -= amount
+                source["last_modified"][key] = self.sequence
+            if destination_id != issuer:
+                destination["balances"][key] += amount
+                destination["last_modified"][key] = self.sequence
+            source["last_modified_ledger"] = destination["last_modified_ledger"] = self.sequence
+            effect(destination_id, "account_credited", amount=f"{amount:.7f}", **asset_fields(key))
+            effect(source_id, "account_debited", amount=f"{amount:.7f}", **asset_fields(key))
+            return "op_success"
+
+        if isinstance(operation, ChangeTrust):
+            key = asset_id(operation.asset)
+            if Decimal(operation.limit) == 0:
+                if source["balances"].get(key):
+                    return "op_invalid_limit"
+                source["balances"].pop(key, None)
+                effect(source_id, "trustline_removed", limit="0.0000000", **asset_fields(key))
+                return "op_success"
+            if key not in source["balances"]:
+                source["balances"][key] = Decimal("0")
+                source["last_modified"][key] = self.sequence
+                effect(source_id, "trustline_created", limit=operation.limit, **asset_fields(key))
+            return "op_success"
+
+        if isinstance(operation, BumpSequence):
+            if operation.bump_to > source["sequence"]:
+                source["sequence"] = operation.bump_to
+            return "op_success"
+
+        return "op_not_supported"
+
+    # Effects
+
+    def _notify(self) -> None:
+        async def wake() -> None:
+            async with self._changed:
+                self._changed.notify_all()
+
+        try:
+            asyncio.get_running_loop().create_task(wake())
+        except RuntimeError:
+            pass  # No loop (direct use from sync code)
+
+    def prune_history(self) -> None:
+        """Forget the effects so far, like Horizon's history retention"""
+        if self.effects:
+            self.pruned_until = _token_position(self.effects[-1]["paging_token"])
+        self.effects.clear()
+
+    def effects_after(self, cursor: Optional[str]) -> int:
+        """
+        Index of the first effect after a paging token ("now" = the end)
+
+        Raises:
+            ValueError: The cursor points into pruned history
+        """
+        if cursor == "now":
+            return len(self.effects)
+        if not cursor:
+            return 0
+        position = _token_position(cursor)
+        if position < self.pruned_until:
+            raise ValueError(f"cursor {cursor} is older than the history kept")
+        for index, effect in enumerate(self.effects):
+            if _token_position(effect["paging_token"]) > position:
+                return index
+        return len(self.effects)
+
+    async def wait_for_change(self, timeout: float) -> None:
+        async with self._changed:
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+
+def _token_position(token: str) -> Tuple[int, int]:
+    operation_id, _, index = token.partition("-")
+    try:
+        return int(operation_id), int(index or 0)
+    except ValueError:
+        return 0, 0
+
+
+def create_app(config: Optional[EmulatorConfig] = None, ledger: Optional[Ledger] = None) -> FastAPI:
+    """Build the emulator app (ledger exposed as app.state.ledger)"""
+    config = config or EmulatorConfig()
+    ledger = ledger or Ledger(config)
+    app = FastAPI(title="Horizon Emulator")
+    app.state.ledger = ledger
+    app.state.config = config
+
+    @app.middleware("http")
+    async def inject(request: Request, call_next):
+        if request.url.path.startswith("/_emulator"):
+            return await call_next(request)
+        delay = config.latency_ms + random.uniform(0, config.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        if config.rate_limit_rate and random.random() < config.rate_limit_rate:
+            response = _problem(429, "Rate Limit Exceeded")
+            response.headers["Retry-After"] = "1"
+            return response
+        return await call_next(request)
+
+    @app.get("/")
+    async def root():
+        return {
+            "horizon_version": "emulator",
+            "network_passphrase": config.network_passphrase,
+            "history_latest_ledger": ledger.sequence,
+            "core_latest_ledger": ledger.sequence,
+        }
+
+    @app.get("/accounts/{account_id}")
+    async def get_account(account_id: str):
+        record = ledger.account_record(account_id)
+        if record is None:
+            return _problem(404, "Resource Missing")
+        return record
+
+    @app.get("/transactions/{transaction_hash}")
+    async def get_transaction(transaction_hash: str):
+        record = ledger.transactions.get(transaction_hash)
+        if record is None:
+            return _problem(404, "Resource Missing")
+        return record
+
+    @app.post("/transactions")
+    async def submit_transaction(request: Request):
+        form = await request.form()
+        xdr = form.get("tx")
+        if not xdr:
+            return _problem(400, "Bad Request")
+
+        timed_out = config.fail_rate and random.random() < config.fail_rate
+        if timed_out and random.random() >= config.timeout_applies:
+            return _problem(504, "Timeout")
+        try:
+            record = ledger.submit(xdr)
+        except SubmissionRejected as e:
+            if timed_out:
+                return _problem(504, "Timeout")
+            result_codes = {"transaction": e.transaction_code}
+            if e.operation_codes is not None:
+                if e.transaction_code == "tx_fee_bump_inner_failed":
+                    result_codes["inner_transaction"] = "tx_failed"
+                result_codes["operations"] = e.operation_codes
+            return _problem(
+                400, "Transaction Failed", {"envelope_xdr": xdr, "result_codes": result_codes}
+            )
+        if timed_out:
+            return _problem(504, "Timeout")
+        return record
+
+    @app.get("/fee_stats")
+    async def fee_stats():
+        # Surge pricing once ledgers are nearly full: higher percentiles bid more
+        base = config.base_fee
+        surge = config.capacity_usage > 0.9
+        charged = {
+            f"p{p}": str(base * (1 + p // 10) if surge else base)
+            for p in (10, 20, 30, 40, 50, 60, 70, 80, 90, 95, 99)
+        }
+        charged.update({"max": charged["p99"], "min": str(base), "mode": str(base)})
+        return {
+            "last_ledger": str(ledger.sequence),
+            "last_ledger_base_fee": str(base),
+            "ledger_capacity_usage": f"{config.capacity_usage:.2f}",
+            "fee_charged": charged,
+            "max_fee": charged,
+        }
+
+    @app.get("/friendbot")
+    async def friendbot(addr: str):
+        if not ledger.fund(addr):
+            return _problem(
+                400,
+                "Transaction Failed",
+                {"result_codes": {"transaction": "tx_failed", "operations": ["op_already_exists"]}},
+            )
+        return {"hash": f"{ledger.sequence:064x}", "ledger": ledger.sequence, "successful": True}
+
+    @app.get("/effects")
+    async def effects(
+        request: Request, cursor: Optional[str] = None, limit: int = 10, order: str = "asc"
+    ):
+        try:
+            start = ledger.effects_after(cursor)
+        except ValueError as e:
+            return _problem(400, "Bad Request", {"invalid_field": "cursor", "reason": str(e)})
+        if "text/event-stream" not in request.headers.get("accept", ""):
+            records = ledger.effects[start:][:limit]
+            if order == "desc":
+                records = list(reversed(ledger.effects))[:limit]
+            return {"_embedded": {"records": records}}
+
+        async def events():
+            position = start
+            yield 'retry: 1000\nevent: open\ndata: "hello"\n\n'
+            while not await request.is_disconnected():
+                while position < len(ledger.effects):
+                    effect = ledger.effects[position]
+                    position += 1
+                    yield f"id: {effect['paging_token']}\ndata: {json.dumps(effect)}\n\n"
+                await ledger.wait_for_change(timeout=5.0)
+                yield ": keep-alive\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/_emulator/config")
+    async def get_config():
+        return asdict(config)
+
+    @app.post("/_emulator/config")
+    async def update_config(values: Dict[str, Any]):
+        for name, value in values.items():
+            if hasattr(config, name):
+                setattr(config, name, type(getattr(config, name))(value))
+        return asdict(config)
+
+    @app.post("/_emulator/accounts")
+    async def seed_account(values: Dict[str, Any]):
+        """{"account_id": "G...", "xlm": "100", "assets": {"USDC:G...": "500"}, "data": {...}}"""
+        ledger.seed(
+            values["account_id"], values.get("xlm"), values.get("assets"), values.get("data")
+        )
+        return ledger.account_record(values["account_id"])
+
+    @app.post("/_emulator/reset")
+    async def reset():
+        ledger.reset()
+        return {"ledger": ledger.sequence}
+
+    return app
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="In-memory Horizon + Friendbot stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Added to every request")
+    parser.add_argument(
+        "--jitter-ms", type=float, default=0.0, help="Random extra latency, up to this"
+    )
+    parser.add_argument(
+        "--fail-rate", type=float, default=0.0, help="Fraction of submissions answered 504"
+    )
+    parser.add_argument(
+        "--timeout-applies",
+        type=float,
+        default=0.5,
+        help="Fraction of those 504s whose transaction is still applied",
+    )
+    parser.add_argument(
+        "--rate-limit-rate", type=float, default=0.0, help="Fraction of requests answered 429"
+    )
+    parser.add_argument(
+        "--base-fee", type=int, default=100, help="Base fee per operation (stroops)"
+    )
+    parser.add_argument("--public", action="store_true", help="Use the public network passphrase")
+    args = parser.parse_args()
+
+    config = EmulatorConfig(
+        network_passphrase=Network.PUBLIC_NETWORK_PASSPHRASE
+        if args.public
+        else Network.TESTNET_NETWORK_PASSPHRASE,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        fail_rate=args.fail_rate,
+        timeout_applies=args.timeout_applies,
+        rate_limit_rate=args.rate_limit_rate,
+        base_fee=args.base_fee,
+    )
+    print(f"Horizon emulator on http://{args.host}:{args.port} ({config})")
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
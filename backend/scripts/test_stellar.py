@@ -17,8 +17,12 @@ if sys.platform == "win32":
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from app.services.stellar_service import stellar_service
+from app.services.stellar_fixtures import FixtureBuilder
 from app.core.config import settings
 
+# Accounts created at once by the bulk fixture test
+FIXTURE_ACCOUNTS = 5
+
 
 async def test_stellar_connection():
     """
@@ -158,6 +162,26 @@ async def test_stellar_connection():
             return False
         print()
 
+        # Test 9b: Bulk fixtures (funded concurrently, trustlines batched)
+        print(f"📋 Test 9b: Bulk Fixtures ({FIXTURE_ACCOUNTS} accounts)")
+        try:
+            accounts = await FixtureBuilder().create_accounts(FIXTURE_ACCOUNTS)
+            trusted = 0
+            for account in accounts:
+                if await stellar_service.has_usdc_trustline(account.public_key):
+                    trusted += 1
+            print(f"   Funded: {sum(a.funded for a in accounts)}, USDC trustlines: {trusted}")
+
+            if trusted == FIXTURE_ACCOUNTS:
+                print("   ✅ Bulk fixtures created successfully")
+            else:
+                print("   ❌ Some fixture accounts are missing their trustline")
+                return False
+        except Exception as e:
+            print(f"   ❌ Failed to create fixtures: {str(e)}")
+            return False
+        print()
+
     else:
         print("📋 Test 5-9: Skipped (Not on testnet)")
         print("   ℹ️  Additional tests require testnet")
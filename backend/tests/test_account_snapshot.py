@@ -0,0 +1,116 @@
+"""AccountSnapshot parsing and the cached snapshot lookups against the Horizon emulator"""
+
+import asyncio
+from decimal import Decimal
+from typing import List
+
+import pytest
+from stellar_sdk import Keypair
+
+from app.services.stellar_service import NATIVE, AccountSnapshot, asset_key
+
+ISSUER = Keypair.random().public_key
+OTHER_ISSUER = Keypair.random().public_key
+USDC = asset_key("USDC", ISSUER)
+
+
+def account_record(**fields) -> dict:
+    record = {
+        "sequence": "1234",
+        "last_modified_ledger": 10,
+        "subentry_count": 2,
+        "balances": [
+            {"asset_type": "native", "balance": "12.5000000"},
+            {
+                "asset_type": "credit_alphanum4",
+                "asset_code": "USDC",
+                "asset_issuer": ISSUER,
+                "balance": "3.0000000",
+                "last_modified_ledger": 7,
+            },
+            {
+                "asset_type": "credit_alphanum4",
+                "asset_code": "USDC",
+                "asset_issuer": OTHER_ISSUER,
+                "balance": "99.0000000",
+                "last_modified_ledger": 8,
+            },
+            {"asset_type": "liquidity_pool_shares", "balance": "1.0000000"},
+        ],
+    }
+    record.update(fields)
+    return record
+
+
+@pytest.fixture
+def fetches(stellar, monkeypatch) -> List[str]:
+    """Accounts requested from Horizon"""
+    requested = []
+    get_account = stellar.get_account
+
+    async def counting(public_key: str):
+        requested.append(public_key)
+        return await get_account(public_key)
+
+    monkeypatch.setattr(stellar, "get_account", counting)
+    return requested
+
+
+def test_from_horizon_keys_balances_by_code_and_issuer():
+    snapshot = AccountSnapshot.from_horizon("GABC", account_record(), ISSUER)
+
+    assert snapshot.exists
+    assert snapshot.sequence == 1234
+    assert snapshot.subentry_count == 2
+    assert snapshot.xlm_balance == Decimal("12.5")
+    assert snapshot.usdc_balance == Decimal("3")
+    assert snapshot.balances[asset_key("USDC", OTHER_ISSUER)] == Decimal("99")
+    assert len(snapshot.balances) == 3  # Pool shares are skipped
+    assert snapshot.positions[NATIVE] == (11 << 32, 0)
+    assert snapshot.positions[USDC] == (8 << 32, 0)
+    assert not snapshot.memo_required
+
+
+def test_from_horizon_reads_memo_required_and_missing_accounts():
+    record = account_record(data={"config.memo_required": "MQ=="}, balances=[])
+    snapshot = AccountSnapshot.from_horizon("GABC", record, ISSUER)
+    assert snapshot.memo_required
+    assert not snapshot.has_usdc_trustline
+
+    missing = AccountSnapshot.from_horizon("GABC", None, ISSUER)
+    assert not missing.exists
+    assert missing.usdc_key == USDC
+    assert missing.xlm_balance == Decimal("0")
+
+
+async def test_snapshot_is_fetched_once_per_ttl(stellar, ledger, usdc, fetches):
+    account = Keypair.random().public_key
+    ledger.seed(account, assets={usdc: "5"})
+
+    snapshots = await asyncio.gather(*(stellar.get_account_snapshot(account) for _ in range(3)))
+    cached = await stellar.get_account_snapshot(account)
+
+    assert fetches == [account]
+    assert all(snapshot is cached for snapshot in snapshots)
+    assert cached.usdc_balance == Decimal("5")
+
+
+async def test_fresh_and_invalidated_lookups_refetch(stellar, ledger, fetches):
+    account = Keypair.random().public_key
+    ledger.fund(account)
+    await stellar.get_account_snapshot(account)
+    ledger.accounts[account]["balances"][NATIVE] = Decimal("1")
+
+    assert (await stellar.get_account_snapshot(account, fresh=True)).xlm_balance == Decimal("1")
+    stellar.invalidate_account(account)
+    await stellar.get_account_snapshot(account)
+
+    assert fetches == [account] * 3
+
+
+async def test_missing_accounts_are_cached_as_not_found(stellar, fetches):
+    account = Keypair.random().public_key
+
+    assert not (await stellar.get_account_snapshot(account)).exists
+    assert not (await stellar.get_account_snapshot(account)).exists
+    assert fetches == [account]
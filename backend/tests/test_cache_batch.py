@@ -0,0 +1,60 @@
+"""Batched cache helpers and cache_pipeline through fakeredis"""
+
+from decimal import Decimal
+
+import pytest
+
+from app.core.cache import (
+    cache_delete_many,
+    cache_get_many,
+    cache_pipeline,
+    cache_set,
+    cache_set_many,
+)
+
+
+async def test_get_many_returns_found_keys_only(fake_redis):
+    await cache_set_many({"a": {"x": 1}, "b": Decimal("2.50")})
+
+    assert await cache_get_many(["a", "missing", "b"]) == {"a": {"x": 1}, "b": Decimal("2.50")}
+    assert await cache_get_many([]) == {}
+
+
+async def test_set_many_applies_the_expiration_to_every_key(fake_redis):
+    await cache_set_many({"a": 1, "b": 2}, expire=60)
+    await cache_set_many({"c": 3})
+
+    assert 0 < await fake_redis.ttl("a") <= 60
+    assert 0 < await fake_redis.ttl("b") <= 60
+    assert await fake_redis.ttl("c") == -1
+
+
+async def test_delete_many_counts_deleted_keys(fake_redis):
+    await cache_set_many({"a": 1, "b": 2})
+
+    assert await cache_delete_many(["a", "b", "missing"]) == 2
+    assert await cache_delete_many([]) == 0
+    assert await cache_get_many(["a", "b"]) == {}
+
+
+async def test_pipeline_decodes_its_gets_and_passes_other_commands_through(fake_redis):
+    await cache_set("existing", {"role": "admin"})
+
+    async with cache_pipeline() as pipe:
+        pipe.set("a", {"x": 1}, expire=60)
+        pipe.incrby("counter", 5)
+        pipe.get("existing")
+        pipe.get("a")
+        pipe.get("missing")
+
+    assert pipe.results == [True, 5, {"role": "admin"}, {"x": 1}, None]
+    assert 0 < await fake_redis.ttl("a") <= 60
+
+
+async def test_pipeline_sends_nothing_if_the_block_raises(fake_redis):
+    with pytest.raises(RuntimeError):
+        async with cache_pipeline(transaction=True) as pipe:
+            pipe.set("a", 1)
+            raise RuntimeError("abandon")
+
+    assert await fake_redis.exists("a") == 0
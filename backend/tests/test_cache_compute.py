@@ -0,0 +1,104 @@
+"""cache_get_or_compute stampede protection and SingleFlight through fakeredis"""
+
+import asyncio
+from typing import Optional
+
+import pytest
+
+from app.core import cache
+from app.core.cache import cache_delete, cache_get_or_compute
+from app.core.single_flight import SingleFlight
+
+KEY = "fx:usd:mxn"
+
+
+def counting(value, calls: list, gate: Optional[asyncio.Event] = None):
+    """Loader returning `value`, counting its calls; waits for `gate` if given"""
+
+    async def load():
+        calls.append(value)
+        if gate is not None:
+            await gate.wait()
+        return value
+
+    return load
+
+
+async def drain_refreshes() -> None:
+    await asyncio.gather(*cache._background_refreshes)
+
+
+async def test_concurrent_misses_share_one_loader_call(fake_redis):
+    calls = []
+    gate = asyncio.Event()
+    load = counting("quote", calls, gate)
+
+    waiters = [asyncio.create_task(cache_get_or_compute(KEY, load, ttl=30)) for _ in range(5)]
+    await asyncio.sleep(0.01)
+    gate.set()
+
+    assert await asyncio.gather(*waiters) == ["quote"] * 5
+    assert calls == ["quote"]
+    assert await cache_get_or_compute(KEY, counting("other", calls), ttl=30) == "quote"
+
+
+async def test_expired_value_is_served_while_one_refresh_runs(fake_redis):
+    calls = []
+    await cache_get_or_compute(KEY, counting("v1", calls), ttl=0, stale_ttl=60)
+    gate = asyncio.Event()
+    refresh = counting("v2", calls, gate)
+
+    served = [await cache_get_or_compute(KEY, refresh, ttl=30, beta=0) for _ in range(3)]
+    gate.set()
+    await drain_refreshes()
+
+    assert served == ["v1"] * 3
+    assert calls == ["v1", "v2"]
+    assert await cache_get_or_compute(KEY, refresh, ttl=30, beta=0) == "v2"
+
+
+async def test_miss_during_a_refresh_does_not_join_it(fake_redis):
+    calls = []
+    await cache_get_or_compute(KEY, counting("v1", calls), ttl=0, stale_ttl=60)
+    gate = asyncio.Event()
+    assert await cache_get_or_compute(KEY, counting("v2", calls, gate), ttl=30) == "v1"
+    await cache_delete(KEY)
+
+    # The refresh holds the compute lock, so the miss waits for its result;
+    # joining the refresh's flight would have returned None instead
+    miss = asyncio.create_task(cache_get_or_compute(KEY, counting("v3", calls), ttl=30))
+    await asyncio.sleep(0.01)
+    gate.set()
+
+    assert await miss == "v2"
+    assert calls == ["v1", "v2"]
+
+
+async def test_loader_errors_reach_callers_only_when_nothing_can_be_served(fake_redis):
+    async def fail():
+        raise RuntimeError("upstream down")
+
+    with pytest.raises(RuntimeError):
+        await cache_get_or_compute(KEY, fail, ttl=30)
+
+    await cache_get_or_compute(KEY, counting("v1", []), ttl=0, stale_ttl=60)
+    assert await cache_get_or_compute(KEY, fail, ttl=30) == "v1"
+    await drain_refreshes()
+
+
+async def test_cancelling_one_waiter_leaves_the_flight_running():
+    flight = SingleFlight()
+    gate = asyncio.Event()
+    calls = []
+    load = counting("value", calls, gate)
+
+    first = asyncio.create_task(flight.do("k", load))
+    second = asyncio.create_task(flight.do("k", load))
+    await asyncio.sleep(0)
+    first.cancel()
+    gate.set()
+
+    assert await second == "value"
+    assert first.cancelled()
+    assert calls == ["value"]
+    assert not flight.in_flight("k")
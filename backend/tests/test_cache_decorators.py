@@ -0,0 +1,70 @@
+"""@cached keys, hits and tag invalidation through fakeredis"""
+
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+
+from app.core.cache_decorators import cached, invalidate_tags
+
+
+@pytest.fixture
+def profile(fake_redis):
+    """A @cached function that counts its real calls"""
+    calls = []
+
+    @cached(ttl=60, tags=["user:{user_id}"])
+    async def get_profile(user_id, currency="USD"):
+        calls.append((user_id, currency))
+        return {"user_id": user_id, "currency": currency}
+
+    get_profile.calls = calls
+    return get_profile
+
+
+async def test_repeated_calls_are_served_from_redis(profile):
+    assert await profile("u1") == await profile("u1")
+    await profile("u1", currency="EUR")
+
+    assert profile.calls == [("u1", "USD"), ("u1", "EUR")]
+
+
+async def test_invalidating_a_tag_recomputes_only_its_entries(profile):
+    await profile("u1")
+    await profile("u2")
+
+    await invalidate_tags("user:u1")
+    await profile("u1")
+    await profile("u2")
+
+    assert profile.calls == [("u1", "USD"), ("u2", "USD"), ("u1", "USD")]
+
+
+def test_default_key_is_the_same_for_equal_primitive_arguments(profile):
+    user_id = uuid.uuid4()
+    args = (Decimal("1.50"), datetime(2026, 1, 1, tzinfo=timezone.utc), ("a", 1))
+
+    assert profile.cache_key(user_id, args) == profile.cache_key(uuid.UUID(str(user_id)), args)
+    assert profile.cache_key(user_id, args) != profile.cache_key(user_id, "USD")
+
+
+async def test_default_key_refuses_arguments_without_a_stable_repr(profile):
+    with pytest.raises(TypeError, match="currency"):
+        profile.cache_key("u1", currency=object())
+    with pytest.raises(TypeError, match="currency"):
+        await profile("u1", currency=("USD", object()))
+
+    assert profile.calls == []
+
+
+async def test_explicit_key_accepts_any_argument(fake_redis):
+    class Account:
+        id = "acct-1"
+
+    @cached(ttl=60, key=lambda account: f"account:{account.id}")
+    async def get_balance(account):
+        return 1
+
+    assert get_balance.cache_key(Account()) == "cached:account:acct-1"
+    assert await get_balance(Account()) == 1
@@ -0,0 +1,77 @@
+"""Per-prefix cache metrics and the sampled hot-key report"""
+
+from app.core import cache
+from app.core.cache import (
+    HotKeySampler,
+    cache_get,
+    cache_set,
+    get_cache_prefix_stats,
+    hot_key_digest,
+    key_prefix,
+)
+
+
+def test_key_prefix_is_the_first_segment_without_hash_tags():
+    assert key_prefix("session:+5215550001111") == "session"
+    assert key_prefix("{user:42}:balance") == "user"
+    assert key_prefix(":empty") == "other"
+
+
+def test_key_prefix_cardinality_is_bounded(monkeypatch):
+    monkeypatch.setattr(cache, "_known_prefixes", {"session"})
+    monkeypatch.setattr(cache, "_MAX_PREFIXES", 2)
+
+    assert key_prefix("otp:1") == "otp"
+    assert key_prefix("lock:1") == "other"
+    assert key_prefix("session:1") == "session"
+
+
+def test_sampler_keeps_heavy_keys_when_full():
+    sampler = HotKeySampler(capacity=2, sample_rate=1.0)
+    for _ in range(5):
+        sampler.record("session:heavy", 100)
+    sampler.record("otp:a")
+    sampler.record("otp:b")  # Replaces otp:a and inherits its count
+
+    assert set(sampler._counts) == {"session:heavy", "otp:b"}
+    assert sampler._counts["otp:b"][0] == 2
+    assert [entry["estimated_accesses"] for entry in sampler.top()] == [5, 2]
+
+
+def test_report_identifies_keys_by_prefix_and_digest_only():
+    sampler = HotKeySampler(capacity=10, sample_rate=0.5)
+    sampler._counts["session:+5215550001111"] = [3, 300]
+
+    assert sampler.top() == [
+        {
+            "prefix": "session",
+            "digest": hot_key_digest("session:+5215550001111"),
+            "estimated_accesses": 6,
+            "avg_bytes": 100,
+        }
+    ]
+    assert "5215550001111" not in str(sampler.top())
+
+
+def test_sampler_is_disabled_at_rate_zero():
+    sampler = HotKeySampler(capacity=10, sample_rate=0)
+    sampler.record("session:1")
+
+    assert sampler.top() == []
+
+
+async def test_prefix_stats_report_hit_ratios(fake_redis, monkeypatch):
+    monkeypatch.setattr(cache, "hot_keys", HotKeySampler(capacity=10, sample_rate=1.0))
+    await cache_set("hotkeytest:1", "value")
+    before = get_cache_prefix_stats()["prefixes"].get("hotkeytest", {"hits": 0, "misses": 0})
+
+    for key in ("hotkeytest:1", "hotkeytest:1", "hotkeytest:1", "hotkeytest:missing"):
+        await cache_get(key)
+
+    stats = get_cache_prefix_stats()
+    prefix = stats["prefixes"]["hotkeytest"]
+    assert prefix["hits"] - before["hits"] == 3
+    assert prefix["misses"] - before["misses"] == 1
+    assert 0 < prefix["hit_ratio"] <= 1
+    assert stats["hot_keys"][0]["digest"] == hot_key_digest("hotkeytest:1")
+    assert stats["hot_keys"][0]["estimated_accesses"] == 4  # The set and three gets
@@ -0,0 +1,83 @@
+"""Registered Lua scripts and the helpers built on them, through fakeredis"""
+
+import pytest
+
+from app.core.cache import (
+    cache_compare_and_set,
+    cache_get,
+    cache_incr_with_ttl,
+    cache_rate_limit,
+    cache_set,
+    load_scripts,
+    redis_breaker,
+    register_script,
+    release_lock_script,
+)
+from app.core.metrics import metrics
+
+
+async def test_rate_limit_counts_hits_within_one_window(fake_redis):
+    results = [await cache_rate_limit("ratelimit:ip:1", limit=2, window=60) for _ in range(3)]
+
+    assert [(allowed, count) for allowed, count, _ in results] == [(True, 1), (True, 2), (False, 3)]
+    assert all(0 < reset <= 60 for _, _, reset in results)
+    assert 0 < await fake_redis.pttl("ratelimit:ip:1") <= 60000
+
+
+async def test_rate_limit_fails_open_without_redis(fake_redis, monkeypatch):
+    monkeypatch.setattr(redis_breaker, "allow_request", lambda: False)
+
+    assert await cache_rate_limit("ratelimit:ip:1", limit=1, window=60) == (True, 0, 0.0)
+
+
+async def test_compare_and_set_replaces_only_the_expected_value(fake_redis):
+    await cache_set("session:1", {"token": "a"}, expire=300)
+
+    assert not await cache_compare_and_set("session:1", {"token": "b"}, {"token": "c"})
+    assert await cache_compare_and_set("session:1", {"token": "a"}, {"token": "c"})
+    assert not await cache_compare_and_set("session:1", {"token": "a"}, {"token": "d"})
+    assert await cache_get("session:1") == {"token": "c"}
+
+
+async def test_compare_and_set_keeps_the_ttl_unless_given_one(fake_redis):
+    await cache_set("session:1", "a", expire=300)
+
+    await cache_compare_and_set("session:1", "a", "b")
+    assert 0 < await fake_redis.ttl("session:1") <= 300
+
+    await cache_compare_and_set("session:1", "b", "c", expire=30)
+    assert 0 < await fake_redis.ttl("session:1") <= 30
+
+
+async def test_incr_with_ttl_sets_the_ttl_once(fake_redis):
+    assert await cache_incr_with_ttl("otp:attempts:1", ttl=60) == 1
+    await fake_redis.expire("otp:attempts:1", 10)
+
+    assert await cache_incr_with_ttl("otp:attempts:1", ttl=60, amount=2) == 3
+    assert 0 < await fake_redis.ttl("otp:attempts:1") <= 10
+
+
+async def test_script_is_reloaded_after_a_flush(fake_redis):
+    assert await load_scripts(fake_redis) > 0
+    await fake_redis.script_flush()
+    reloaded = metrics.get_counter(
+        "redis_script_calls_total", script="release_lock", result="reloaded"
+    )
+
+    await fake_redis.set("lock:payout", "token")
+    assert await release_lock_script(keys=["lock:payout"], args=["token"]) == 1
+    assert await fake_redis.exists("lock:payout") == 0
+    assert (
+        metrics.get_counter("redis_script_calls_total", script="release_lock", result="reloaded")
+        == reloaded + 1
+    )
+
+
+def test_register_script_rejects_a_different_body_under_the_same_name():
+    assert register_script("release_lock", release_lock_script.source) is release_lock_script
+
+    with pytest.raises(ValueError):
+        register_script("release_lock", "return 1")
+    assert (
+        register_script("release_lock", release_lock_script.source).sha == release_lock_script.sha
+    )
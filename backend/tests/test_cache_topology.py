@@ -0,0 +1,99 @@
+"""Redis client selection per REDIS_MODE and hash-tag co-location of keys"""
+
+import pytest
+import redis.asyncio as redis
+from redis.asyncio.cluster import RedisCluster
+from redis.asyncio.sentinel import SentinelConnectionPool, SentinelManagedSSLConnection
+from redis.crc import key_slot
+
+from app.core import cache
+from app.core.config import settings
+from app.core.distributed_lock import get_fence_key
+
+
+@pytest.fixture
+def build_client(monkeypatch):
+    """_build_client() for a mode, without leaking its pool into the module"""
+    monkeypatch.setattr(cache, "redis_pool", None)
+
+    def build(mode: str, url: str = "redis://localhost:6379/0"):
+        monkeypatch.setattr(settings, "REDIS_MODE", mode)
+        monkeypatch.setattr(settings, "REDIS_URL", url)
+        return cache._build_client()
+
+    return build
+
+
+def slot(key: str) -> int:
+    return key_slot(key.encode())
+
+
+def test_standalone_uses_one_bounded_pool(build_client):
+    client = build_client("standalone")
+
+    assert type(client) is redis.Redis
+    assert client.connection_pool is cache.redis_pool
+    assert cache.redis_pool.max_connections == settings.REDIS_MAX_CONNECTIONS
+    assert not cache.is_cluster(client)
+
+
+def test_sentinel_discovers_the_master_with_credentials_from_the_url(build_client, monkeypatch):
+    monkeypatch.setattr(settings, "REDIS_SENTINELS", "sentinel-1:26379, sentinel-2:26380")
+    monkeypatch.setattr(settings, "REDIS_SENTINEL_MASTER", "wani")
+
+    client = build_client("sentinel", "rediss://:secret@ignored:6379/2")
+    pool = client.connection_pool
+
+    assert isinstance(pool, SentinelConnectionPool)
+    assert pool is cache.redis_pool
+    assert pool.service_name == "wani"
+    assert pool.connection_class is SentinelManagedSSLConnection
+    assert pool.connection_kwargs["password"] == "secret"
+    assert pool.connection_kwargs["db"] == 2
+    assert "host" not in pool.connection_kwargs
+    assert [
+        (s.connection_pool.connection_kwargs["host"], s.connection_pool.connection_kwargs["port"])
+        for s in pool.sentinel_manager.sentinels
+    ] == [("sentinel-1", 26379), ("sentinel-2", 26380)]
+
+
+def test_cluster_builds_a_cluster_client_without_a_shared_pool(build_client):
+    client = build_client("cluster", "redis://seed:7000/0")
+
+    assert isinstance(client, RedisCluster)
+    assert cache.redis_pool is None
+    assert cache.is_cluster(client)
+
+
+def test_cluster_pipelines_are_never_transactional(build_client):
+    cluster = build_client("cluster", "redis://seed:7000/0")
+    standalone = build_client("standalone")
+
+    assert cache.open_pipeline(cluster, transaction=True).__class__.__name__ == "ClusterPipeline"
+    assert cache.open_pipeline(standalone, transaction=True).is_transaction
+
+
+def test_keys_of_one_user_share_a_slot():
+    user_id = "7f1c9c1e-0000-4000-8000-000000000001"
+    keys = [
+        cache.get_user_key(user_id, "profile"),
+        cache.get_user_key(user_id, "balances", "usdc"),
+        cache.get_user_session_key(user_id),
+    ]
+
+    assert len({slot(key) for key in keys}) == 1
+    assert slot(cache.get_user_session_key("someone-else")) != slot(keys[0])
+
+
+def test_rate_limit_keys_of_one_caller_share_a_slot():
+    keys = [
+        cache.get_rate_limit_key("203.0.113.7", endpoint) for endpoint in ("login", "otp", "send")
+    ]
+
+    assert len({slot(key) for key in keys}) == 1
+
+
+def test_lock_and_fence_keys_share_a_slot():
+    lock_key = cache.get_transaction_lock_key("tx-42")
+
+    assert slot(get_fence_key(lock_key)) == slot(lock_key)
@@ -0,0 +1,86 @@
+"""CircuitBreaker transitions and how redis_operation reports to it"""
+
+import asyncio
+
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+from redis.exceptions import ResponseError
+
+from app.core import cache
+from app.core.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+@pytest.fixture
+def breaker(monkeypatch) -> CircuitBreaker:
+    breaker = CircuitBreaker("test", failure_threshold=2, recovery_timeout=0, success_threshold=2)
+    monkeypatch.setattr(cache, "redis_breaker", breaker)
+    return breaker
+
+
+def half_open(breaker: CircuitBreaker) -> None:
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    assert breaker.allow_request()  # recovery_timeout=0: the first probe
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_half_open_probes_double_with_each_success(breaker):
+    half_open(breaker)
+    assert not breaker.allow_request()
+
+    breaker.record_success()
+    assert breaker.allow_request() and breaker.allow_request()
+    assert not breaker.allow_request()
+
+    breaker.record_success()
+    assert breaker.is_closed
+
+
+def test_failed_probe_reopens(monkeypatch):
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=60)
+    breaker.record_failure()
+    assert not breaker.allow_request()
+
+    monkeypatch.setattr(breaker, "recovery_timeout", 0)
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+async def test_connectivity_errors_open_the_redis_breaker(breaker, fake_redis):
+    breaker.recovery_timeout = 60
+    for _ in range(2):
+        with pytest.raises(RedisConnectionError):
+            async with cache.redis_operation():
+                raise RedisConnectionError("refused")
+
+    with pytest.raises(CircuitOpenError):
+        async with cache.redis_operation():
+            pass
+
+
+@pytest.mark.parametrize("error", [asyncio.CancelledError, ResponseError, ValueError])
+async def test_other_exits_neither_succeed_nor_fail(breaker, fake_redis, error):
+    breaker.record_failure()
+
+    with pytest.raises(error):
+        async with cache.redis_operation():
+            raise error()
+
+    assert breaker.failures == 1  # Not reset by a success, not one more failure
+
+
+async def test_cancelled_probe_frees_its_slot_without_closing(breaker, fake_redis):
+    half_open(breaker)
+    breaker.record_success()  # Two probes allowed, none in flight
+
+    with pytest.raises(asyncio.CancelledError):
+        async with cache.redis_operation():
+            raise asyncio.CancelledError
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.half_open_successes == 1
+    assert breaker.half_open_in_flight == 0
+    async with cache.redis_operation() as redis:
+        await redis.ping()
+    assert breaker.is_closed
@@ -0,0 +1,67 @@
+"""Client-side cache reads, their metrics, and the tracking connection"""
+
+import pytest
+
+from app.core import client_cache
+from app.core.cache import cache_set
+from app.core.metrics import metrics
+
+KEY = "principal:{user:1}"
+
+
+def gets(result: str) -> float:
+    return metrics.get_counter("cache_ops_total", op="get", prefix="principal", result=result)
+
+
+@pytest.fixture
+def tracking(fake_redis, monkeypatch):
+    """Pretend the tracking connection is subscribed"""
+    monkeypatch.setattr(client_cache, "_tracking_active", True)
+    client_cache.tracked_cache.clear()
+    yield
+    client_cache.tracked_cache.clear()
+
+
+async def test_redis_reads_are_recorded_like_cache_get(fake_redis):
+    hits, misses = gets("hit"), gets("miss")
+    await cache_set(KEY, {"role": "admin"})
+
+    assert await client_cache.cache_get_tracked(KEY) == {"role": "admin"}
+    assert await client_cache.cache_get_tracked("principal:{user:2}") is None
+    assert (gets("hit"), gets("miss")) == (hits + 1, misses + 1)
+
+
+async def test_tracked_keys_are_served_locally_until_invalidated(tracking, fake_redis):
+    await cache_set(KEY, "v1")
+    assert await client_cache.cache_get_tracked(KEY) == "v1"
+    redis_hits = gets("hit")
+
+    await fake_redis.set(KEY, b"not read")
+    assert await client_cache.cache_get_tracked(KEY) == "v1"
+    assert gets("hit") == redis_hits
+
+    await cache_set(KEY, "v2")
+    client_cache._apply_invalidation([KEY.encode()])
+    assert await client_cache.cache_get_tracked(KEY) == "v2"
+
+
+async def test_tracking_connection_is_not_taken_from_the_pool(fake_redis, monkeypatch):
+    monkeypatch.setattr(client_cache, "_tracking_supported", True)
+    pool = fake_redis.connection_pool
+    opened = []
+    make_connection = pool.make_connection
+
+    def record():
+        connection = make_connection()
+        opened.append(connection)
+        return connection
+
+    monkeypatch.setattr(pool, "make_connection", record)
+
+    # fakeredis rejects CLIENT TRACKING, which ends the task
+    await client_cache._run_tracking_connection()
+
+    assert len(opened) == 1
+    assert opened[0] not in pool._in_use_connections
+    assert opened[0] not in pool._available_connections
+    assert client_cache._tracking_supported is False
@@ -0,0 +1,64 @@
+"""HostRateLimiter pacing, its maximum wait, and the default Horizon budget split"""
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.integrations.horizon_client import HorizonRateLimitError, HostRateLimiter
+
+HOST = "horizon.example"
+URL = f"https://{HOST}/accounts/G"
+
+
+def test_requests_beyond_the_burst_are_paced():
+    limiter = HostRateLimiter(rate=10, burst=2, max_wait=1.0)
+
+    waits = [limiter._reserve(HOST) for _ in range(4)]
+
+    assert waits[:2] == [0.0, 0.0]
+    assert waits[2:] == pytest.approx([0.1, 0.2], abs=0.01)
+
+
+def test_request_that_would_wait_too_long_fails_without_taking_a_token():
+    limiter = HostRateLimiter(rate=10, burst=1, max_wait=0.15)
+    limiter._reserve(HOST)
+    limiter._reserve(HOST)  # 0.1s of debt
+
+    with pytest.raises(HorizonRateLimitError):
+        limiter._reserve(HOST)
+    assert limiter._bucket(HOST)[0] == pytest.approx(-1, abs=0.01)
+
+
+def test_hosts_have_their_own_buckets():
+    limiter = HostRateLimiter(rate=10, burst=1, max_wait=0.0)
+    limiter._reserve(HOST)
+
+    assert limiter._reserve("other.example") == 0.0
+    with pytest.raises(HorizonRateLimitError):
+        limiter._reserve(HOST)
+
+
+async def test_host_paused_by_a_429_beyond_the_max_wait_fails_fast():
+    limiter = HostRateLimiter(rate=10, burst=5, max_wait=1.0)
+    limiter.observe(URL, httpx.Response(429, headers={"Retry-After": "30"}))
+
+    with pytest.raises(HorizonRateLimitError):
+        await limiter.acquire(URL)
+
+
+async def test_unlimited_rate_never_waits():
+    limiter = HostRateLimiter(rate=0, burst=1, max_wait=0.0)
+
+    for _ in range(100):
+        await limiter.acquire(URL)
+
+
+def test_default_rate_splits_the_hourly_budget_across_processes(monkeypatch):
+    monkeypatch.setattr(settings, "STELLAR_HTTP_RATE_LIMIT", None)
+    monkeypatch.setattr(settings, "STELLAR_HTTP_RATE_BUDGET", 3600)
+    monkeypatch.setattr(settings, "STELLAR_HTTP_RATE_PROCESSES", 4)
+
+    assert settings.get_stellar_http_rate_limit() == 0.25
+
+    monkeypatch.setattr(settings, "STELLAR_HTTP_RATE_LIMIT", 0.0)
+    assert settings.get_stellar_http_rate_limit() == 0.0
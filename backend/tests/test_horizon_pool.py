@@ -0,0 +1,157 @@
+"""HorizonEndpointPool routing: latency EWMA, breaker failover and pinning"""
+
+import asyncio
+from typing import Dict, List
+
+import httpx
+import pytest
+
+from app.core.circuit_breaker import CircuitBreaker
+from app.core.config import settings
+from app.integrations.horizon_client import HttpxClient
+from app.integrations.horizon_pool import HorizonEndpointPool
+
+A = "https://horizon-a.example"
+B = "https://horizon-b.example"
+
+
+@pytest.fixture
+def pool(monkeypatch) -> HorizonEndpointPool:
+    monkeypatch.setattr(settings, "STELLAR_HORIZON_BREAKER_FAILURES", 2)
+    monkeypatch.setattr(settings, "STELLAR_HORIZON_BREAKER_RECOVERY", 60.0)
+    return HorizonEndpointPool([A, B], alpha=0.5, explore_rate=0)
+
+
+@pytest.fixture
+def status() -> Dict[str, int]:
+    """Status code each host answers with (default 200)"""
+    return {}
+
+
+@pytest.fixture
+async def client(pool, status):
+    """HttpxClient routed through the pool; `client.sent` lists the hosts it sent to"""
+    sent: List[str] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        sent.append(f"https://{request.url.host}")
+        return httpx.Response(status.get(sent[-1], 200), json={})
+
+    http = HttpxClient(rate_limit=0, endpoints=pool)
+    http._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    http.sent = sent
+    yield http
+    await http.close()
+
+
+def endpoint(pool: HorizonEndpointPool, url: str):
+    return next(e for e in pool.endpoints if e.url == url)
+
+
+def test_latency_is_an_ewma_and_the_fastest_endpoint_wins(pool):
+    a, b = pool.endpoints
+    pool.record(a, ok=True, seconds=0.1)
+    pool.record(b, ok=True, seconds=0.3)
+    pool.record(b, ok=True, seconds=0.1)
+
+    assert b.latency == pytest.approx(0.2)
+    assert pool.choose() is a
+
+    pool.record(a, ok=True, seconds=0.5)
+    assert a.latency == pytest.approx(0.3)
+    assert pool.choose() is b
+
+
+def test_unmeasured_endpoints_are_tried_first(pool):
+    pool.record(endpoint(pool, A), ok=True, seconds=0.01)
+
+    assert pool.choose().url == B
+
+
+async def test_failed_get_is_retried_on_the_next_endpoint(pool, client, status):
+    status[A] = 503
+
+    response = await client.get(f"{A}/ledgers")
+
+    assert response.status_code == 200
+    assert client.sent == [A, B]
+    assert endpoint(pool, A).failures == 1
+
+
+async def test_open_breaker_takes_the_endpoint_out_of_rotation(pool, client, status):
+    status[A] = 503
+    for _ in range(2):
+        await client.get(f"{A}/ledgers")
+    client.sent.clear()
+
+    await client.get(f"{A}/ledgers")
+
+    assert endpoint(pool, A).breaker.state == CircuitBreaker.OPEN
+    assert client.sent == [B]
+
+
+async def test_submissions_do_not_fail_over(pool, client, status):
+    status[A] = 503
+
+    response = await client.post(f"{A}/transactions", data={"tx": "AAAA"})
+
+    assert response.status_code == 503
+    assert client.sent == [A]
+
+
+async def test_pinned_requests_stay_on_their_endpoint(pool, client):
+    pool.record(endpoint(pool, A), ok=True, seconds=0.5)
+    pool.record(endpoint(pool, B), ok=True, seconds=0.01)
+
+    with pool.pinned("tx-1") as pinned:
+        assert pinned.url == B
+    pool.record(endpoint(pool, B), ok=True, seconds=5.0)  # B is now the slow one
+
+    with pool.pinned("tx-1"):
+        await client.get(f"{A}/transactions/tx-1")
+        await client.post(f"{A}/transactions", data={"tx": "AAAA"})
+    await client.get(f"{A}/ledgers")
+
+    assert client.sent == [B, B, A]
+
+
+async def test_pin_on_an_open_endpoint_is_replaced(pool, client):
+    with pool.pinned("tx-1") as pinned:
+        assert pinned.url == A
+    for _ in range(2):
+        pool.record(endpoint(pool, A), ok=False)
+
+    with pool.pinned("tx-1"):
+        await client.get(f"{A}/transactions/tx-1")
+        await client.get(f"{A}/transactions/tx-1")
+
+    assert client.sent == [B, B]
+
+
+async def test_cancelled_request_frees_the_half_open_probe(pool):
+    a = endpoint(pool, A)
+    for _ in range(2):
+        pool.record(a, ok=False)
+        pool.record(endpoint(pool, B), ok=False)
+    a.breaker.recovery_timeout = 0
+    started = asyncio.Event()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        started.set()
+        await asyncio.Event().wait()
+        raise AssertionError("never answered")
+
+    http = HttpxClient(rate_limit=0, endpoints=pool)
+    http._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    with pool.pinned("tx-1"):
+        request = asyncio.create_task(http.get(f"{A}/transactions/tx-1"))
+    await started.wait()
+    assert a.breaker.half_open_in_flight == 1
+
+    request.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await request
+    await http.close()
+
+    assert a.breaker.state == CircuitBreaker.HALF_OPEN
+    assert a.breaker.half_open_in_flight == 0
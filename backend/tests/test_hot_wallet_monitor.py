@@ -0,0 +1,167 @@
+"""HotWalletMonitor levels, hysteresis, alerts and the cached balance checks"""
+
+import asyncio
+from decimal import Decimal
+from typing import List
+
+import pytest
+
+from app.core.config import settings
+from app.services.hot_wallet_monitor import (
+    LEVEL_CRITICAL,
+    LEVEL_HIGH,
+    LEVEL_LOW,
+    LEVEL_OK,
+    HotWalletMonitor,
+    ThresholdBand,
+)
+
+XLM = Decimal("500")
+
+
+class RecordingAlerter:
+    """Stands in for TelegramAlerter"""
+
+    enabled = False
+
+    def __init__(self):
+        self.sent: List[str] = []
+
+    async def send(self, text: str) -> bool:
+        self.sent.append(text)
+        return True
+
+    async def close(self) -> None:
+        pass
+
+
+@pytest.fixture
+def alerter() -> RecordingAlerter:
+    return RecordingAlerter()
+
+
+@pytest.fixture
+def monitor(stellar, alerter, monkeypatch) -> HotWalletMonitor:
+    """Thresholds: critical < 20000 <= low < 30000 <= ok <= 100000 < high, margin 2000"""
+    monkeypatch.setattr(settings, "HOT_WALLET_MIN_BALANCE", 20000)
+    monkeypatch.setattr(settings, "HOT_WALLET_MAX_BALANCE", 100000)
+    monkeypatch.setattr(settings, "HOT_WALLET_ALERT_THRESHOLD", 0.3)
+    monkeypatch.setattr(settings, "HOT_WALLET_ALERT_HYSTERESIS", 0.02)
+    monkeypatch.setattr(settings, "HOT_WALLET_MIN_XLM", 100.0)
+    return HotWalletMonitor(stellar, alerter=alerter, interval=10)
+
+
+async def observe(monitor: HotWalletMonitor, usdc: str, xlm: Decimal = XLM) -> None:
+    monitor.observe(Decimal(usdc), xlm)
+    await asyncio.sleep(0)  # Let the alert tasks run
+
+
+def test_band_leaves_ok_at_the_threshold_and_returns_only_past_the_margin():
+    band = ThresholdBand(
+        [LEVEL_CRITICAL, LEVEL_LOW, LEVEL_OK, LEVEL_HIGH],
+        [Decimal("20"), Decimal("30"), Decimal("100")],
+        Decimal("2"),
+    )
+
+    assert band.update(Decimal("50")) == ""
+    assert band.update(Decimal("29.99")) == LEVEL_OK
+    assert band.level == LEVEL_LOW
+    assert band.update(Decimal("30")) is None  # Back at the threshold: not clear of it yet
+    assert band.update(Decimal("31.99")) is None
+    assert band.update(Decimal("32")) == LEVEL_LOW
+    assert band.level == LEVEL_OK
+
+    assert band.update(Decimal("100.01")) == LEVEL_OK
+    assert band.update(Decimal("99")) is None
+    assert band.update(Decimal("98")) is None
+    assert band.update(Decimal("97.99")) == LEVEL_HIGH
+    assert band.level == LEVEL_OK
+
+
+def test_band_skips_levels_in_one_reading():
+    band = ThresholdBand([LEVEL_CRITICAL, LEVEL_LOW, LEVEL_OK], [Decimal("20"), Decimal("30")], 2)
+    band.update(Decimal("10"))
+
+    assert band.update(Decimal("40")) == LEVEL_CRITICAL
+    assert band.level == LEVEL_OK
+
+
+async def test_healthy_first_reading_does_not_alert(monitor, alerter):
+    await observe(monitor, "50000")
+
+    assert alerter.sent == []
+    assert monitor.levels == {"USDC": LEVEL_OK, "XLM": LEVEL_OK}
+
+
+async def test_every_level_change_alerts_once(monitor, alerter):
+    await observe(monitor, "50000")
+
+    for usdc in ("29000", "29500", "28000", "19000", "19500", "23000", "33000", "120000"):
+        await observe(monitor, usdc)
+
+    assert [text.split(":")[0] for text in alerter.sent] == [
+        "🟠 Hot wallet USDC low",
+        "🔴 Hot wallet USDC critical",
+        "🟠 Hot wallet USDC low",
+        "🟢 Hot wallet USDC ok",
+        "🔵 Hot wallet USDC high",
+    ]
+    assert "(was critical)" in alerter.sent[2]
+    assert "refill from the cold wallet now" in alerter.sent[1]
+
+
+async def test_balance_hovering_at_a_threshold_alerts_once(monitor, alerter):
+    await observe(monitor, "50000")
+
+    for usdc in ("29999", "30001", "29999", "31000", "29999"):
+        await observe(monitor, usdc)
+
+    assert len(alerter.sent) == 1
+
+
+async def test_low_xlm_alerts_independently_of_usdc(monitor, alerter):
+    await observe(monitor, "50000")
+
+    await observe(monitor, "50000", Decimal("99"))
+    await observe(monitor, "50000", Decimal("105"))
+    await observe(monitor, "50000", Decimal("110"))
+
+    assert [text.split(":")[0] for text in alerter.sent] == [
+        "🔴 Hot wallet XLM critical",
+        "🟢 Hot wallet XLM ok",
+    ]
+
+
+async def test_can_pay_uses_the_last_fresh_reading(monitor, monkeypatch):
+    assert monitor.stale
+    assert not monitor.can_pay(Decimal("1"))
+
+    await observe(monitor, "50000")
+    assert monitor.can_pay(Decimal("50000"))
+    assert not monitor.can_pay(Decimal("50000.01"))
+
+    monkeypatch.setattr(monitor, "updated_at", monitor.updated_at - 31)  # Three intervals
+    assert monitor.stale
+    assert not monitor.can_pay(Decimal("1"))
+
+
+async def test_refresh_reads_the_hot_wallet_snapshot(monitor, alerter, usdc):
+    await monitor.refresh()
+    await asyncio.sleep(0)
+
+    assert monitor.usdc_balance == Decimal("1000")
+    assert monitor.levels["USDC"] == LEVEL_CRITICAL
+    assert len(alerter.sent) == 1
+
+
+def test_monitor_runs_by_default_only_with_telegram(monkeypatch):
+    monkeypatch.setattr(settings, "HOT_WALLET_MONITOR_ENABLED", None)
+    monkeypatch.setattr(settings, "TELEGRAM_BOT_TOKEN", None)
+    monkeypatch.setattr(settings, "TELEGRAM_CHAT_ID", "-1")
+    assert not settings.is_hot_wallet_monitor_enabled()
+
+    monkeypatch.setattr(settings, "TELEGRAM_BOT_TOKEN", "123:abc")
+    assert settings.is_hot_wallet_monitor_enabled()
+
+    monkeypatch.setattr(settings, "HOT_WALLET_MONITOR_ENABLED", False)
+    assert not settings.is_hot_wallet_monitor_enabled()
@@ -0,0 +1,106 @@
+"""LimitService volume counters and their day/month rollover upsert"""
+
+import uuid
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core.config import settings
+from app.models.transfer_volume import UserTransferVolume
+from app.models.user import User
+from app.services.limit_service import LimitService, TransferLimitExceededError
+
+
+@pytest.fixture
+async def db():
+    """
+    A SQLite session for the Postgres upsert
+
+    SQLite has INSERT ... ON CONFLICT DO UPDATE ... RETURNING but no
+    greatest(); a Python max() stands in for it.
+    """
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def add_greatest(connection, _record) -> None:
+        connection.create_function("greatest", -1, max)
+
+    async with engine.begin() as connection:
+        await connection.run_sync(UserTransferVolume.__table__.create)
+    async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+        yield session
+    await engine.dispose()
+
+
+@pytest.fixture
+def user() -> User:
+    return User(id=uuid.uuid4(), kyc_level=1)
+
+
+def now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+async def test_transfers_on_the_same_day_add_up(db, user):
+    await LimitService.record_transfer(db, user, Decimal("10"))
+    usage = await LimitService.record_transfer(db, user, Decimal("5.5"))
+
+    assert (usage.daily_amount, usage.daily_count) == (Decimal("15.5"), 2)
+    assert (usage.monthly_amount, usage.monthly_count) == (Decimal("15.5"), 2)
+    assert await LimitService.get_usage(db, user.id) == usage
+
+
+async def test_new_day_resets_the_daily_window_only(db, user):
+    today = now()
+    if today.day == 1:
+        pytest.skip("yesterday was in another month")
+    await LimitService.record_transfer(db, user, Decimal("10"), today - timedelta(days=1))
+
+    usage = await LimitService.record_transfer(db, user, Decimal("3"), today)
+
+    assert (usage.daily_amount, usage.daily_count) == (Decimal("3"), 1)
+    assert (usage.monthly_amount, usage.monthly_count) == (Decimal("13"), 2)
+
+
+async def test_new_month_resets_both_windows(db, user):
+    await LimitService.record_transfer(db, user, Decimal("10"), now() - timedelta(days=40))
+
+    usage = await LimitService.record_transfer(db, user, Decimal("3"))
+
+    assert (usage.daily_amount, usage.daily_count) == (Decimal("3"), 1)
+    assert (usage.monthly_amount, usage.monthly_count) == (Decimal("3"), 1)
+
+
+async def test_late_event_for_a_rolled_over_window_keeps_the_newer_counters(db, user):
+    await LimitService.record_transfer(db, user, Decimal("10"))
+
+    await LimitService.record_transfer(
+        db, user, Decimal("7"), now() - timedelta(days=40), enforce_limits=False
+    )
+    usage = await LimitService.get_usage(db, user.id)
+
+    assert (usage.daily_amount, usage.daily_count) == (Decimal("10"), 1)
+    assert (usage.monthly_amount, usage.monthly_count) == (Decimal("10"), 1)
+
+
+async def test_reversal_never_goes_below_zero(db, user):
+    await LimitService.record_transfer(db, user, Decimal("10"))
+
+    usage = await LimitService.reverse_transfer(db, user.id, Decimal("25"), now())
+
+    assert (usage.daily_amount, usage.daily_count) == (Decimal("0"), 0)
+    assert (usage.monthly_amount, usage.monthly_count) == (Decimal("0"), 0)
+
+
+async def test_transfer_over_the_daily_limit_is_refused(db, user):
+    limit = Decimal(settings.KYC_APPROVED_DAILY_LIMIT)
+    await LimitService.record_transfer(db, user, limit)
+
+    with pytest.raises(TransferLimitExceededError) as exc_info:
+        await LimitService.record_transfer(db, user, Decimal("1"))
+
+    assert exc_info.value.period == "daily"
+    assert exc_info.value.used == limit
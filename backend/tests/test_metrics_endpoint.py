@@ -0,0 +1,35 @@
+"""/metrics is internal: disabled without METRICS_TOKEN, bearer token otherwise"""
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.main import app
+
+
+@pytest.fixture
+async def client():
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://wani.test"
+    ) as client:
+        yield client
+
+
+async def test_metrics_are_disabled_without_a_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", None)
+
+    response = await client.get("/metrics", headers={"Authorization": "Bearer anything"})
+
+    assert response.status_code == 404
+
+
+async def test_metrics_require_the_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "s3cret")
+
+    assert (await client.get("/metrics")).status_code == 401
+    wrong = await client.get("/metrics", headers={"Authorization": "Bearer guess"})
+    assert wrong.status_code == 401
+
+    response = await client.get("/metrics", headers={"Authorization": "Bearer s3cret"})
+    assert response.status_code == 200
+    assert response.json()["success"] is True
@@ -0,0 +1,48 @@
+"""PaymentBatcher against the Horizon emulator"""
+
+import asyncio
+from decimal import Decimal
+
+from app.services.stellar_batcher import PaymentRejectedError
+from tests.conftest import trusting_account
+
+
+async def test_failed_op_is_rejected_and_the_rest_resubmitted(stellar, ledger, usdc):
+    first, lost_trust, last = (trusting_account(ledger, usdc) for _ in range(3))
+    # Screened with a trustline (cached snapshot) that is gone by submission
+    await stellar.get_account_snapshot(lost_trust)
+    del ledger.accounts[lost_trust]["balances"][usdc]
+
+    results = await asyncio.gather(
+        stellar.queue_usdc_payment(first, Decimal("10")),
+        stellar.queue_usdc_payment(lost_trust, Decimal("20")),
+        stellar.queue_usdc_payment(last, Decimal("30")),
+        return_exceptions=True,
+    )
+
+    assert isinstance(results[1], PaymentRejectedError)
+    assert results[1].code == "op_no_trust"
+    assert results[0].hash == results[2].hash
+    assert (results[0].batch_size, results[0].operation_index, results[2].operation_index) == (
+        2,
+        0,
+        1,
+    )
+    assert ledger.accounts[first]["balances"][usdc] == Decimal("10")
+    assert ledger.accounts[last]["balances"][usdc] == Decimal("30")
+    assert ledger.accounts[stellar.hot_wallet.public_key]["balances"][usdc] == Decimal("960")
+
+
+async def test_timed_out_submission_that_landed_is_not_resent(
+    stellar, ledger, usdc, emulator_config
+):
+    destination = trusting_account(ledger, usdc)
+    # Every submission answers 504 but is applied anyway
+    emulator_config.fail_rate = 1.0
+    emulator_config.timeout_applies = 1.0
+
+    result = await stellar.queue_usdc_payment(destination, Decimal("5"))
+
+    assert result.hash in ledger.transactions
+    assert len(ledger.transactions) == 1
+    assert ledger.accounts[destination]["balances"][usdc] == Decimal("5")
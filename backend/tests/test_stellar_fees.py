@@ -0,0 +1,88 @@
+"""FeeOracle.escalate near STELLAR_MAX_FEE, and fee-bumped submissions that time out"""
+
+import pytest
+from stellar_sdk import Account, TransactionBuilder, xdr
+
+from app.core.config import settings
+from app.integrations.horizon_client import (
+    TransactionFailedError,
+    operation_result_codes,
+    submission_result_code,
+    transaction_result_codes,
+)
+from app.services.stellar_fees import FeeOracle
+from app.services.stellar_submission import SubmissionPipeline
+from tests.conftest import trusting_account
+
+
+def test_escalate_bids_ten_times_when_replacing(stellar, monkeypatch):
+    monkeypatch.setattr(settings, "STELLAR_MAX_FEE", 100000)
+    assert FeeOracle(stellar).escalate(200, replacing=True) == 2000
+
+
+def test_escalate_caps_the_bid_at_max_fee(stellar, monkeypatch):
+    monkeypatch.setattr(settings, "STELLAR_MAX_FEE", 10000)
+    oracle = FeeOracle(stellar)
+
+    assert oracle.escalate(2000, replacing=True) == 10000
+    assert oracle.escalate(9000, replacing=False) == 10000
+
+
+def test_escalate_gives_up_at_max_fee(stellar, monkeypatch):
+    monkeypatch.setattr(settings, "STELLAR_MAX_FEE", 10000)
+    assert FeeOracle(stellar).escalate(10000, replacing=True) is None
+
+
+async def test_timed_out_transaction_that_failed_in_the_ledger_raises_its_result_codes(
+    stellar, ledger, usdc, emulator_config
+):
+    hot_wallet = stellar.hot_wallet.public_key
+    destination = trusting_account(ledger, usdc)
+    transaction = (
+        TransactionBuilder(
+            Account(hot_wallet, ledger.accounts[hot_wallet]["sequence"]),
+            stellar.network_passphrase,
+            base_fee=100,
+        )
+        .append_payment_op(destination, stellar.usdc_asset, "5000")  # Holds 1000
+        .set_timeout(60)
+        .build()
+    )
+    transaction.sign(stellar.hot_wallet)
+    emulator_config.fail_rate = 1.0
+    emulator_config.timeout_applies = 1.0
+
+    with pytest.raises(TransactionFailedError) as exc_info:
+        await stellar.submit_with_fee_bumps(transaction)
+
+    assert submission_result_code(exc_info.value) == "tx_failed"
+    assert exc_info.value.record["hash"] == transaction.hash_hex()
+    assert SubmissionPipeline._classify(exc_info.value)[0] == "failed"
+
+
+def test_result_codes_are_decoded_from_the_record_result_xdr():
+    def operation(code: xdr.PaymentResultCode) -> xdr.OperationResult:
+        return xdr.OperationResult(
+            xdr.OperationResultCode.opINNER,
+            xdr.OperationResultTr(
+                xdr.OperationType.PAYMENT, payment_result=xdr.PaymentResult(code)
+            ),
+        )
+
+    results = [
+        operation(xdr.PaymentResultCode.PAYMENT_SUCCESS),
+        operation(xdr.PaymentResultCode.PAYMENT_UNDERFUNDED),
+        xdr.OperationResult(xdr.OperationResultCode.opNO_ACCOUNT),
+    ]
+    result = xdr.TransactionResult(
+        xdr.Int64(200),
+        xdr.TransactionResultResult(xdr.TransactionResultCode.txFAILED, results=results),
+        xdr.TransactionResultExt(0),
+    )
+    record = {"hash": "ab" * 32, "ledger": 7, "result_xdr": result.to_xdr()}
+
+    error = TransactionFailedError(record)
+
+    assert submission_result_code(error) == "tx_failed"
+    assert operation_result_codes(error) == ["op_success", "op_underfunded", "op_no_source_account"]
+    assert transaction_result_codes({"hash": "ab" * 32}) == {"transaction": "tx_failed"}
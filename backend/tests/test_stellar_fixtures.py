@@ -0,0 +1,20 @@
+"""FixtureBuilder against the Horizon emulator"""
+
+from app.services.stellar_fixtures import FixtureBuilder
+
+
+async def test_create_accounts_funds_and_trusts_usdc(stellar, ledger):
+    accounts = await FixtureBuilder(stellar, concurrency=4).create_accounts(25)
+
+    assert len({account.public_key for account in accounts}) == 25
+    assert all(account.funded and account.usdc_trustline for account in accounts)
+    for account in accounts:
+        assert account.public_key in ledger.accounts
+        assert await stellar.has_usdc_trustline(account.public_key)
+
+
+async def test_fund_testnet_account_counts_existing_account_as_funded(stellar, ledger):
+    accounts = await FixtureBuilder(stellar).create_accounts(1, usdc_trustline=False)
+
+    assert await stellar.fund_testnet_account(accounts[0].public_key) is True
+    assert not accounts[0].usdc_trustline
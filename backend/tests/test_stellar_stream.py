@@ -0,0 +1,165 @@
+"""BalanceStreamer against the Horizon emulator's effects stream"""
+
+import asyncio
+import time
+from decimal import Decimal
+
+import pytest
+from stellar_sdk import Keypair
+from stellar_sdk.exceptions import ConnectionError
+
+from app.core.cache import get_stream_cursor_key
+from app.core.cache_codec import decode, encode
+from app.core.config import settings
+from app.core.local_cache import MISSING
+from app.core.metrics import metrics
+from app.services import stellar_stream
+from app.services.stellar_service import NATIVE
+from app.services.stellar_stream import STREAM_NAME, BalanceStreamer
+
+CURSOR_KEY = get_stream_cursor_key(STREAM_NAME)
+
+
+@pytest.fixture
+def streamer(stellar, fake_redis) -> BalanceStreamer:
+    return BalanceStreamer(stellar)
+
+
+@pytest.fixture
+async def streaming(stellar, streamer, emulator_url):
+    """Start the streamer against the emulator; yields the effects it handled"""
+    stellar.horizon_url = emulator_url
+    seen = []
+    handle_effect = streamer.handle_effect
+
+    def record(effect):
+        seen.append(effect["paging_token"])
+        return handle_effect(effect)
+
+    streamer.handle_effect = record
+    yield seen
+    await streamer.stop()
+
+
+def funded(ledger) -> str:
+    public_key = Keypair.random().public_key
+    ledger.fund(public_key)
+    return public_key
+
+
+def credit(account: str, amount: str, token: str) -> dict:
+    return {
+        "type": "account_credited",
+        "account": account,
+        "asset_type": "native",
+        "amount": amount,
+        "paging_token": token,
+    }
+
+
+async def wait_for(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.02)
+
+
+async def test_credit_is_applied_to_the_cached_snapshot_once(stellar, streamer, ledger):
+    account = funded(ledger)
+    streamer.watch(account)
+    before = (await stellar.get_account_snapshot(account)).xlm_balance
+    token = f"{(ledger.sequence + 1) << 32}-1"
+
+    assert streamer.handle_effect(credit(account, "2.5", token)) == "applied"
+    assert streamer.handle_effect(credit(account, "2.5", token)) == "ignored"
+    assert (await stellar.get_account_snapshot(account)).xlm_balance == before + Decimal("2.5")
+    assert streamer.cursor == token
+
+
+async def test_other_effects_invalidate_and_refetch_the_snapshot(stellar, streamer, ledger):
+    account = funded(ledger)
+    streamer.watch(account)
+    await stellar.get_account_snapshot(account)
+    ledger.accounts[account]["balances"][NATIVE] = Decimal("1")
+
+    debit = {**credit(account, "9999", "999-1"), "type": "account_debited"}
+    assert streamer.handle_effect(debit) == "invalidated"
+    assert stellar._snapshots.get(account) is MISSING
+
+    await asyncio.gather(*streamer._refreshes.values())
+    assert stellar._snapshots.get(account).xlm_balance == Decimal("1")
+
+
+async def test_unwatched_accounts_only_move_the_cursor(stellar, streamer, ledger):
+    account = funded(ledger)
+
+    assert streamer.handle_effect(credit(account, "1", "42-1")) == "skipped"
+    assert streamer.cursor == "42-1"
+
+
+async def test_stream_resumes_from_the_cursor_in_redis(streamer, streaming, ledger, fake_redis):
+    for _ in range(3):
+        funded(ledger)
+    tokens = [effect["paging_token"] for effect in ledger.effects]
+    await fake_redis.set(CURSOR_KEY, encode(tokens[0]))
+
+    streamer.start()
+    await wait_for(lambda: len(streaming) == 2)
+    await streamer.stop()
+
+    assert streaming == tokens[1:]
+    assert decode(await fake_redis.get(CURSOR_KEY)) == tokens[2]
+
+
+async def test_stale_cursor_restarts_the_stream_from_now(streamer, streaming, ledger, fake_redis):
+    funded(ledger)
+    stale = ledger.effects[0]["paging_token"]
+    funded(ledger)
+    ledger.prune_history()
+    await fake_redis.set(CURSOR_KEY, encode(stale))
+    reconnects = metrics.get_counter("stellar_stream_reconnects_total")
+
+    streamer.start()
+    await wait_for(lambda: metrics.get_counter("stellar_stream_reconnects_total") > reconnects)
+    assert streamer.cursor == "now"
+    missed = funded(ledger)  # While reconnecting: "now" starts after it
+    deadline = time.monotonic() + 5.0
+    while not streaming:
+        assert time.monotonic() < deadline, "timed out"
+        funded(ledger)
+        await asyncio.sleep(0.1)
+
+    accounts = {effect["paging_token"]: effect["account"] for effect in ledger.effects}
+    assert stale not in streaming
+    assert missed not in {accounts[token] for token in streaming}
+
+
+async def test_reconnect_backs_off_and_resets_after_events(stellar, streamer, monkeypatch):
+    monkeypatch.setattr(settings, "STELLAR_STREAM_MAX_BACKOFF", 5.0)
+    account = Keypair.random().public_key
+    streamer.watch(account)
+    attempts = []
+    delays = []
+
+    async def consume() -> None:
+        attempts.append(len(attempts))
+        if len(attempts) == 5:
+            # A healthy connection: one event, then it drops
+            streamer._set_connected(True)
+            streamer.last_event_at = time.monotonic()
+        raise ConnectionError("dropped")
+
+    async def sleep(delay: float) -> None:
+        delays.append(delay)
+        if len(delays) == 7:
+            raise asyncio.CancelledError
+
+    monkeypatch.setattr(streamer, "_consume", consume)
+    monkeypatch.setattr(stellar_stream.asyncio, "sleep", sleep)
+
+    with pytest.raises(asyncio.CancelledError):
+        await streamer._run()
+
+    assert delays == [1.0, 2.0, 4.0, 5.0, 1.0, 2.0, 4.0]
+    assert not streamer.connected
+    assert account not in stellar.streamed_accounts
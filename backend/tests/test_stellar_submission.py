@@ -0,0 +1,243 @@
+"""SubmissionPipeline against the Horizon emulator and a SQLite database"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from stellar_sdk import Account, TransactionBuilder
+
+from app.core.config import settings
+from app.models.stellar_submission import (
+    SUBMISSION_BUILDING,
+    SUBMISSION_SUBMITTED,
+    SUBMISSION_SUCCEEDED,
+    StellarSubmission,
+)
+from app.services.stellar_submission import SubmissionConflictError, SubmissionPipeline, _max_time
+from tests.conftest import trusting_account
+
+
+@pytest.fixture
+async def session_factory(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'submissions.db'}")
+    async with engine.begin() as connection:
+        await connection.run_sync(StellarSubmission.__table__.create)
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await engine.dispose()
+
+
+@pytest.fixture
+def pipeline(stellar, session_factory, monkeypatch) -> SubmissionPipeline:
+    monkeypatch.setattr(settings, "STELLAR_SUBMIT_POLL_INTERVAL", 0.05)
+    monkeypatch.setattr(settings, "STELLAR_SUBMIT_EXPIRY_MARGIN", 0.0)
+    return SubmissionPipeline(stellar, session_factory)
+
+
+def paid(ledger, destination: str, usdc: str) -> Decimal:
+    return ledger.accounts[destination]["balances"][usdc]
+
+
+def signed_payment(stellar, ledger, destination: str, amount: str):
+    """A hot wallet payment built outside the pipeline (as a crashed process did)"""
+    hot_wallet = stellar.hot_wallet.public_key
+    transaction = (
+        TransactionBuilder(
+            Account(hot_wallet, ledger.accounts[hot_wallet]["sequence"]),
+            stellar.network_passphrase,
+            base_fee=100,
+        )
+        .append_payment_op(destination, stellar.usdc_asset, amount)
+        .set_timeout(60)
+        .build()
+    )
+    transaction.sign(stellar.hot_wallet)
+    return transaction
+
+
+async def store(session_factory, **values) -> StellarSubmission:
+    async with session_factory() as session:
+        submission = StellarSubmission(urgency="normal", **values)
+        session.add(submission)
+        await session.commit()
+    return submission
+
+
+async def test_same_key_pays_once(pipeline, ledger, usdc):
+    destination = trusting_account(ledger, usdc)
+
+    first, second = await asyncio.gather(
+        pipeline.submit_usdc_payment("transfer:1", destination, Decimal("10")),
+        pipeline.submit_usdc_payment("transfer:1", destination, Decimal("10")),
+    )
+
+    assert first.id == second.id
+    assert first.status == second.status == SUBMISSION_SUCCEEDED
+    assert paid(ledger, destination, usdc) == Decimal("10")
+
+
+async def test_key_reused_for_another_payment_conflicts(pipeline, ledger, usdc):
+    destination = trusting_account(ledger, usdc)
+    await pipeline.submit_usdc_payment("transfer:1", destination, Decimal("10"))
+
+    with pytest.raises(SubmissionConflictError):
+        await pipeline.submit_usdc_payment("transfer:1", destination, Decimal("11"))
+    assert paid(ledger, destination, usdc) == Decimal("10")
+
+
+async def test_two_processes_racing_for_one_key_pay_once(stellar, session_factory, ledger, usdc):
+    destination = trusting_account(ledger, usdc)
+    replicas = [SubmissionPipeline(stellar, session_factory) for _ in range(2)]
+
+    results = await asyncio.gather(
+        *(
+            replica.submit_usdc_payment("transfer:1", destination, Decimal("10"))
+            for replica in replicas
+        )
+    )
+
+    assert {result.status for result in results} == {SUBMISSION_SUCCEEDED}
+    assert {result.tx_hash for result in results} == {results[0].tx_hash}
+    assert paid(ledger, destination, usdc) == Decimal("10")
+
+
+async def test_timeout_that_landed_is_confirmed_not_rebuilt(
+    pipeline, ledger, usdc, emulator_config
+):
+    destination = trusting_account(ledger, usdc)
+    emulator_config.fail_rate = 1.0
+    emulator_config.timeout_applies = 1.0
+
+    submission = await pipeline.submit_usdc_payment("transfer:1", destination, Decimal("10"))
+
+    assert submission.status == SUBMISSION_SUCCEEDED
+    assert submission.attempts == 1
+    assert paid(ledger, destination, usdc) == Decimal("10")
+
+
+async def test_timeout_that_expired_unseen_is_rebuilt_once(
+    stellar, pipeline, ledger, usdc, emulator_config, monkeypatch
+):
+    destination = trusting_account(ledger, usdc)
+    monkeypatch.setattr(settings, "STELLAR_TX_TIMEOUT", 1)
+    monkeypatch.setattr(settings, "STELLAR_FEE_BUMP_ATTEMPTS", 0)
+    # The first submission times out and is dropped; later ones go through
+    emulator_config.fail_rate = 1.0
+    emulator_config.timeout_applies = 0.0
+
+    async def recover_after_first_submission(response) -> None:
+        if response.request.method == "POST" and response.request.url.path == "/transactions":
+            emulator_config.fail_rate = 0.0
+
+    stellar.http_client._client.event_hooks["response"].append(recover_after_first_submission)
+
+    submission = await pipeline.submit_usdc_payment("transfer:1", destination, Decimal("10"))
+
+    assert submission.status == SUBMISSION_SUCCEEDED
+    assert submission.attempts == 2
+    assert submission.result_code is None
+    assert paid(ledger, destination, usdc) == Decimal("10")
+    assert len({record["hash"] for record in ledger.transactions.values()}) == 1
+
+
+async def test_restart_after_landed_submission_does_not_pay_again(
+    stellar, pipeline, session_factory, ledger, usdc
+):
+    destination = trusting_account(ledger, usdc)
+    # The previous process stored and sent the envelope, which landed, then died
+    transaction = signed_payment(stellar, ledger, destination, "10")
+    ledger.submit(transaction.to_xdr())
+    await store(
+        session_factory,
+        idempotency_key="transfer:1",
+        destination=destination,
+        amount=Decimal("10"),
+        status=SUBMISSION_SUBMITTED,
+        attempts=1,
+        tx_hash=transaction.hash_hex(),
+        envelope_xdr=transaction.to_xdr(),
+        source_account=stellar.hot_wallet.public_key,
+        sequence=transaction.transaction.sequence,
+        max_time=_max_time(transaction),
+    )
+
+    # Resending answers tx_bad_seq: the hash, not a rebuild, decides
+    assert await pipeline.recover() == 1
+    submission = await pipeline.submit_usdc_payment("transfer:1", destination, Decimal("10"))
+
+    assert submission.status == SUBMISSION_SUCCEEDED
+    assert submission.tx_hash == transaction.hash_hex()
+    assert submission.attempts == 1
+    assert paid(ledger, destination, usdc) == Decimal("10")
+
+
+async def test_restart_resends_a_stored_envelope_that_never_left(
+    stellar, pipeline, session_factory, ledger, usdc
+):
+    destination = trusting_account(ledger, usdc)
+    transaction = signed_payment(stellar, ledger, destination, "10")
+    await store(
+        session_factory,
+        idempotency_key="transfer:1",
+        destination=destination,
+        amount=Decimal("10"),
+        status=SUBMISSION_SUBMITTED,
+        attempts=1,
+        tx_hash=transaction.hash_hex(),
+        envelope_xdr=transaction.to_xdr(),
+        source_account=stellar.hot_wallet.public_key,
+        sequence=transaction.transaction.sequence,
+        max_time=_max_time(transaction),
+    )
+
+    await pipeline.recover()
+    submission = await pipeline.submit_usdc_payment("transfer:1", destination, Decimal("10"))
+
+    assert submission.status == SUBMISSION_SUCCEEDED
+    assert submission.tx_hash == transaction.hash_hex()
+    assert paid(ledger, destination, usdc) == Decimal("10")
+
+
+async def test_abandoned_claim_is_taken_over(pipeline, session_factory, ledger, usdc, monkeypatch):
+    destination = trusting_account(ledger, usdc)
+    monkeypatch.setattr(settings, "STELLAR_SUBMIT_CLAIM_TIMEOUT", 1.0)
+    # Claimed by a process that died before storing an envelope
+    await store(
+        session_factory,
+        idempotency_key="transfer:1",
+        destination=destination,
+        amount=Decimal("10"),
+        status=SUBMISSION_BUILDING,
+        attempts=1,
+        updated_at=datetime.now(timezone.utc) - timedelta(seconds=5),
+    )
+
+    await pipeline.recover()
+    submission = await pipeline.submit_usdc_payment("transfer:1", destination, Decimal("10"))
+
+    assert submission.status == SUBMISSION_SUCCEEDED
+    assert submission.attempts == 2
+    assert paid(ledger, destination, usdc) == Decimal("10")
+
+
+async def test_live_claim_is_left_to_its_owner(pipeline, session_factory, ledger, usdc):
+    destination = trusting_account(ledger, usdc)
+    await store(
+        session_factory,
+        idempotency_key="transfer:1",
+        destination=destination,
+        amount=Decimal("10"),
+        status=SUBMISSION_BUILDING,
+        attempts=1,
+        updated_at=datetime.now(timezone.utc),
+    )
+
+    await pipeline.recover()
+    await asyncio.sleep(0.2)
+    submission = await pipeline.get_submission("transfer:1")
+    await pipeline.close()
+
+    assert submission.status == SUBMISSION_BUILDING
+    assert submission.attempts == 1
+    assert paid(ledger, destination, usdc) == Decimal("0")